@@ -0,0 +1,345 @@
+"""
+Moduł przybliżonego wyszukiwania najbliższych sąsiadów (ANN)
+
+Zawiera:
+- Wektory cech filmów (gatunki multi-hot, rok, ocena) lub czynniki ukryte z modelu faktoryzacji
+- Indeks LSH z losowymi hiperpłaszczyznami (podobieństwo kosinusowe) w czystym NumPy
+- Parametr probes do wyboru kompromisu między trafnością a czasem zapytania
+- Zapisywanie i wczytywanie indeksu z pliku .npz
+- Porównanie z wyszukiwaniem dokładnym (brute force)
+
+Benchmark z linii poleceń (na lokalnym katalogu lub danych syntetycznych):
+    python ann.py
+"""
+
+import time
+import numpy as np
+from typing import List, Tuple
+from config import ANN_INDEX_FILE
+from scoring import encode_genres, top_k
+
+# Wagi grup cech w wektorze filmu
+GENRE_FEATURE_WEIGHT = 1.0
+YEAR_FEATURE_WEIGHT = 0.5
+RATING_FEATURE_WEIGHT = 0.5
+
+
+def movie_features(movies) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Buduje wektory cech filmów: gatunki (multi-hot), rok i średnia ocena
+
+    Args:
+        movies: Lista obiektów Movie
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Tablica ID filmów oraz macierz cech (filmy x cechy)
+    """
+    movies = list(movies)
+    genres, genre_counts = encode_genres(movies)
+
+    # Gatunki ważone tak, by film z wieloma gatunkami nie dominował
+    genres *= GENRE_FEATURE_WEIGHT / np.sqrt(np.maximum(genre_counts, 1))[:, None]
+    years = np.array([movie.year for movie in movies], dtype=float)
+    ratings = np.array([movie.avg_rating or 0.0 for movie in movies], dtype=float)
+
+    features = np.column_stack((
+        genres,
+        YEAR_FEATURE_WEIGHT * (np.clip(years, 1900, 2030) - 1965) / 65,
+        RATING_FEATURE_WEIGHT * (ratings - 5) / 5
+    ))
+    movie_ids = np.array([movie.movie_id for movie in movies], dtype=np.int64)
+    return movie_ids, features.astype(np.float32)
+
+
+def factor_features(mf_model) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Zwraca czynniki ukryte filmów z modelu faktoryzacji jako wektory cech
+
+    Args:
+        mf_model: Obiekt MatrixFactorization
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Tablica ID filmów oraz macierz czynników
+    """
+    return np.asarray(mf_model.item_ids), np.asarray(mf_model.item_factors, dtype=np.float32)
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    """Normalizuje wiersze do długości 1 (podobieństwo kosinusowe jako iloczyn skalarny)"""
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1)
+
+
+class LSHIndex:
+    """
+    Indeks LSH z losowymi hiperpłaszczyznami
+    Każda tablica dzieli przestrzeń n_bits hiperpłaszczyznami, a film trafia do kubełka
+    wyznaczonego przez znaki rzutów. Kandydaci z kubełków są sortowani dokładnym podobieństwem.
+    Atrybut features zapamiętuje rodzaj wektorów ("movie" - movie_features, "factors" - factor_features),
+    bo tylko wektor tego samego rodzaju można porównywać z wektorami w indeksie.
+    """
+
+    def __init__(self, movie_ids: np.ndarray, vectors: np.ndarray, planes: np.ndarray,
+                 sorted_codes: np.ndarray, bucket_order: np.ndarray, features: str = None):
+        """
+        Inicjalizacja indeksu z gotowych tablic
+
+        Args:
+            movie_ids: ID filmów w indeksie
+            vectors: Znormalizowane wektory filmów
+            planes: Hiperpłaszczyzny (tablice x bity x wymiar)
+            sorted_codes: Posortowane kody kubełków dla każdej tablicy (tablice x filmy)
+            bucket_order: Pozycje filmów w kolejności posortowanych kodów (tablice x filmy)
+            features: Rodzaj wektorów ("movie", "factors" lub None, gdy nieznany)
+        """
+        self.features = features
+        self.movie_ids = movie_ids
+        self.vectors = vectors
+        self.planes = planes
+        self.sorted_codes = sorted_codes
+        self.bucket_order = bucket_order
+        self._positions = {movie_id: position for position, movie_id in enumerate(movie_ids.tolist())}
+
+    @classmethod
+    def build(cls, movie_ids: np.ndarray, vectors: np.ndarray, n_tables: int = 8, n_bits: int = 14,
+              seed: int = 0, features: str = None) -> "LSHIndex":
+        """
+        Buduje indeks dla podanych wektorów
+
+        Args:
+            movie_ids: ID filmów
+            vectors: Macierz wektorów (filmy x wymiar)
+            n_tables: Liczba niezależnych tablic (więcej = wyższa trafność, większy indeks)
+            n_bits: Liczba hiperpłaszczyzn na tablicę (więcej = mniejsze kubełki)
+            seed: Ziarno generatora liczb losowych
+            features: Rodzaj wektorów ("movie", "factors" lub None, gdy nieznany)
+
+        Returns:
+            LSHIndex: Zbudowany indeks
+        """
+        vectors = _normalize(np.asarray(vectors, dtype=np.float32))
+        rng = np.random.default_rng(seed)
+        planes = rng.normal(size=(n_tables, n_bits, vectors.shape[1])).astype(np.float32)
+        powers = 1 << np.arange(n_bits, dtype=np.int64)
+
+        sorted_codes = np.empty((n_tables, len(vectors)), dtype=np.int64)
+        bucket_order = np.empty((n_tables, len(vectors)), dtype=np.int32)
+
+        for table in range(n_tables):
+            codes = (vectors @ planes[table].T > 0) @ powers
+            order = np.argsort(codes, kind="stable")
+            sorted_codes[table] = codes[order]
+            bucket_order[table] = order
+
+        return cls(np.asarray(movie_ids, dtype=np.int64), vectors, planes, sorted_codes, bucket_order, features)
+
+    @classmethod
+    def from_movies(cls, movies, **kwargs) -> "LSHIndex":
+        """
+        Buduje indeks na wektorach cech filmów (gatunki, rok, ocena)
+
+        Args:
+            movies: Lista lub generator obiektów Movie
+            **kwargs: Parametry przekazywane do build
+
+        Returns:
+            LSHIndex: Zbudowany indeks
+        """
+        movie_ids, vectors = movie_features(movies)
+        return cls.build(movie_ids, vectors, features="movie", **kwargs)
+
+    @classmethod
+    def from_factors(cls, mf_model, **kwargs) -> "LSHIndex":
+        """
+        Buduje indeks na czynnikach ukrytych filmów z modelu faktoryzacji
+
+        Args:
+            mf_model: Obiekt MatrixFactorization
+            **kwargs: Parametry przekazywane do build
+
+        Returns:
+            LSHIndex: Zbudowany indeks
+        """
+        movie_ids, vectors = factor_features(mf_model)
+        return cls.build(movie_ids, vectors, features="factors", **kwargs)
+
+    def __len__(self) -> int:
+        """Zwraca liczbę filmów w indeksie"""
+        return len(self.movie_ids)
+
+    def save(self, path: str = ANN_INDEX_FILE) -> None:
+        """
+        Zapisuje indeks do pliku .npz
+
+        Args:
+            path: Ścieżka do pliku indeksu
+        """
+        np.savez(path, movie_ids=self.movie_ids, vectors=self.vectors, planes=self.planes,
+                 sorted_codes=self.sorted_codes, bucket_order=self.bucket_order,
+                 features=np.array(self.features or ""))
+
+    @classmethod
+    def load(cls, path: str = ANN_INDEX_FILE) -> "LSHIndex":
+        """
+        Wczytuje indeks z pliku .npz
+
+        Args:
+            path: Ścieżka do pliku indeksu
+
+        Returns:
+            LSHIndex: Wczytany indeks lub None w przypadku błędu
+        """
+        try:
+            with np.load(path) as data:
+                # Indeksy zapisane przed dodaniem rodzaju wektorów mają rodzaj nieznany
+                features = str(data["features"]) if "features" in data.files else ""
+                return cls(data["movie_ids"], data["vectors"], data["planes"],
+                           data["sorted_codes"], data["bucket_order"], features or None)
+        except FileNotFoundError:
+            print(f"Plik nie istnieje: {path}")
+            return None
+        except (KeyError, ValueError, OSError) as e:
+            print(f"Błąd podczas wczytywania indeksu: {e}")
+            return None
+
+    def vector_for(self, movie_id: int) -> np.ndarray:
+        """
+        Zwraca wektor filmu zapisany w indeksie
+
+        Args:
+            movie_id: ID filmu z TMDb
+
+        Returns:
+            np.ndarray: Wektor filmu lub None, jeśli filmu nie ma w indeksie
+        """
+        position = self._positions.get(int(movie_id))
+        return self.vectors[position] if position is not None else None
+
+    def query(self, vector: np.ndarray, k: int = 10, probes: int = 2,
+              exclude_id: int = None) -> List[Tuple[int, float]]:
+        """
+        Wyszukuje k filmów najbardziej podobnych do wektora
+
+        Args:
+            vector: Wektor zapytania
+            k: Liczba wyników
+            probes: Liczba dodatkowych kubełków sprawdzanych w każdej tablicy
+                    (0 - najszybciej, więcej - wyższa trafność kosztem czasu)
+            exclude_id: ID filmu pomijanego w wynikach
+
+        Returns:
+            List[Tuple[int, float]]: Lista par (movie_id, podobieństwo kosinusowe) malejąco
+        """
+        vector = _normalize(np.asarray(vector, dtype=np.float32))
+        projections = self.planes @ vector  # (tablice x bity)
+        powers = 1 << np.arange(self.planes.shape[1], dtype=np.int64)
+        codes = (projections > 0) @ powers
+
+        buckets = []
+        for table, code in enumerate(codes.tolist()):
+            # Dodatkowe kubełki: zmiana bitów o najmniejszym marginesie rzutu
+            flips = np.argsort(np.abs(projections[table]))[:probes]
+            for probe_code in [code] + [code ^ int(powers[bit]) for bit in flips]:
+                start = np.searchsorted(self.sorted_codes[table], probe_code, side="left")
+                end = np.searchsorted(self.sorted_codes[table], probe_code, side="right")
+                buckets.append(self.bucket_order[table, start:end])
+
+        candidates = np.unique(np.concatenate(buckets)) if buckets else np.zeros(0, dtype=np.int32)
+        if exclude_id is not None:
+            candidates = candidates[self.movie_ids[candidates] != exclude_id]
+
+        # Dokładne podobieństwo tylko dla kandydatów z kubełków
+        similarities = self.vectors[candidates] @ vector
+        best = top_k(similarities, k)
+        return list(zip(self.movie_ids[candidates[best]].tolist(), similarities[best].tolist()))
+
+    def brute_force(self, vector: np.ndarray, k: int = 10, exclude_id: int = None) -> List[Tuple[int, float]]:
+        """
+        Dokładne wyszukiwanie k najbliższych sąsiadów (punkt odniesienia dla query)
+
+        Args:
+            vector: Wektor zapytania
+            k: Liczba wyników
+            exclude_id: ID filmu pomijanego w wynikach
+
+        Returns:
+            List[Tuple[int, float]]: Lista par (movie_id, podobieństwo kosinusowe) malejąco
+        """
+        similarities = self.vectors @ _normalize(np.asarray(vector, dtype=np.float32))
+        if exclude_id is not None:
+            similarities[self.movie_ids == exclude_id] = -np.inf
+        best = top_k(similarities, k)
+        return list(zip(self.movie_ids[best].tolist(), similarities[best].tolist()))
+
+
+def benchmark(index: LSHIndex, n_queries: int = 100, k: int = 10, probes_values=(0, 1, 2, 4, 8),
+              seed: int = 0) -> List[dict]:
+    """
+    Porównuje trafność i czas zapytań LSH z wyszukiwaniem dokładnym
+
+    Args:
+        index: Zbudowany indeks
+        n_queries: Liczba losowych filmów użytych jako zapytania
+        k: Liczba wyników w zapytaniu
+        probes_values: Sprawdzane wartości parametru probes
+        seed: Ziarno generatora liczb losowych
+
+    Returns:
+        List[dict]: Wyniki dla każdej wartości probes (recall, średni czas w ms)
+    """
+    rng = np.random.default_rng(seed)
+    positions = rng.choice(len(index), size=min(n_queries, len(index)), replace=False)
+
+    # Wyniki dokładne jako punkt odniesienia
+    start = time.perf_counter()
+    exact = [
+        {movie_id for movie_id, _ in index.brute_force(index.vectors[p], k, exclude_id=index.movie_ids[p])}
+        for p in positions
+    ]
+    brute_ms = (time.perf_counter() - start) * 1000 / len(positions)
+
+    results = []
+    for probes in probes_values:
+        start = time.perf_counter()
+        found = [
+            {movie_id for movie_id, _ in index.query(index.vectors[p], k, probes=probes, exclude_id=index.movie_ids[p])}
+            for p in positions
+        ]
+        query_ms = (time.perf_counter() - start) * 1000 / len(positions)
+        recall = np.mean([len(f & e) / max(len(e), 1) for f, e in zip(found, exact)])
+        results.append({"probes": probes, "recall": float(recall), "query_ms": query_ms, "brute_force_ms": brute_ms})
+    return results
+
+
+if __name__ == "__main__":
+    from catalog import load_catalog
+    from models import Movie, GENRE_MAPPING
+
+    catalog = load_catalog()
+    from_catalog = catalog is not None and len(catalog) > 0
+    if from_catalog:
+        movies = list(catalog.iter_movies())
+        print(f"Benchmark na lokalnym katalogu ({len(movies)} filmów)")
+    else:
+        # Dane syntetyczne, gdy katalog nie został zaimportowany
+        rng = np.random.default_rng(0)
+        genre_ids = list(GENRE_MAPPING)
+        movies = [
+            Movie(movie_id, "", int(rng.integers(1920, 2025)), round(float(rng.uniform(1, 10)), 1), 0,
+                  rng.choice(genre_ids, size=int(rng.integers(1, 4)), replace=False).tolist())
+            for movie_id in range(1, 500001)
+        ]
+        print(f"Benchmark na danych syntetycznych ({len(movies)} filmów)")
+
+    start = time.perf_counter()
+    index = LSHIndex.from_movies(movies)
+    print(f"Budowa indeksu: {time.perf_counter() - start:.1f} s")
+
+    # Indeks z katalogu jest zapisywany, żeby rekomender nie budował go przy starcie
+    if from_catalog:
+        index.save()
+        print(f"Zapisano indeks do pliku: {ANN_INDEX_FILE}")
+
+    for result in benchmark(index):
+        print(f"probes={result['probes']}: recall@10 = {result['recall']:.2f}, "
+              f"zapytanie {result['query_ms']:.2f} ms (brute force {result['brute_force_ms']:.2f} ms)")
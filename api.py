@@ -4,14 +4,132 @@ Moduł komunikacji z API filmowym
 Zawiera funkcje do pobierania danych o filmach z The Movie Database API.
 Obsługuje wyszukiwanie filmów, pobieranie szczegółów i czasu trwania.
 Wykorzystuje klucz API z pliku konfiguracyjnego.
+Szczegóły filmów są przechowywane w lokalnej pamięci podręcznej.
+Wszystkie zapytania korzystają ze wspólnej sesji HTTP z pulą połączeń.
+Zapytania są ograniczane limitem TMDb, ponawiane po błędach 429/5xx,
+a jednakowe zapytania wykonywane w tym samym czasie są łączone w jedno.
 """
 
+import threading
+import time
 import requests
-from config import API_KEY, BASE_URL, LANGUAGE
+from concurrent.futures import ThreadPoolExecutor, Future
+from requests.adapters import HTTPAdapter
+from config import API_KEY, BASE_URL, LANGUAGE, MAX_CONCURRENT_REQUESTS
+from config import HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, HTTP_POOL_CONNECTIONS, HTTP_POOL_MAXSIZE
+from config import API_RATE_LIMIT, API_RATE_BURST, HTTP_MAX_RETRIES, MOVIE_DETAIL_APPEND
+from cache import MovieCache
+from rate_limit import TokenBucket, parse_retry_after, backoff_delay
+
+def create_session():
+    """
+    Tworzy sesję HTTP z pulą połączeń utrzymywanych między zapytaniami (keep-alive)
+    Dzięki temu kolejne zapytania nie wymagają nowego połączenia TCP i TLS
+    
+    Returns:
+        requests.Session: Skonfigurowana sesja HTTP
+    """
+    session = requests.Session()
+    
+    # Adapter z pulą połączeń o rozmiarze z pliku konfiguracyjnego
+    adapter = HTTPAdapter(
+        pool_connections=HTTP_POOL_CONNECTIONS,
+        pool_maxsize=HTTP_POOL_MAXSIZE
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    
+    # Nagłówki wspólne dla wszystkich zapytań (kompresja gzip, keep-alive)
+    session.headers.update({
+        "Accept": "application/json",
+        "Accept-Encoding": "gzip, deflate",
+        "Connection": "keep-alive"
+    })
+    return session
+
+# Wspólna sesja HTTP dla wszystkich funkcji modułu
+session = create_session()
+
+# Wspólna pamięć podręczna szczegółów filmów
+movie_cache = MovieCache()
+
+# Licznik zapytań HTTP wysłanych do API (do raportowania kosztu operacji),
+# ponowień po błędach oraz zapytań połączonych z identycznym zapytaniem w toku
+request_stats = {"requests": 0, "retries": 0, "coalesced": 0}
+_stats_lock = threading.Lock()
+
+# Wspólny limit zapytań do TMDb (używany też przez async_api.py)
+rate_limiter = TokenBucket(API_RATE_LIMIT, API_RATE_BURST)
+
+# Zasoby, które TMDb może dołączyć do odpowiedzi /movie/{id} (parametr append_to_response)
+APPENDABLE_FIELDS = frozenset({
+    "alternative_titles", "credits", "external_ids", "images", "keywords", "lists",
+    "recommendations", "release_dates", "reviews", "similar", "translations", "videos", "watch/providers"
+})
+
+# Kody odpowiedzi, po których zapytanie jest ponawiane
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Zapytania w toku: {(endpoint, parametry): Future z wynikiem}
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+def _count(stat):
+    """Zwiększa licznik w request_stats"""
+    with _stats_lock:
+        request_stats[stat] += 1
+
+def _get_with_retry(url, params):
+    """
+    Wysyła zapytanie GET z limitem zapytań i ponowieniami
+    
+    Args:
+        url: Pełny URL zapytania
+        params: Parametry zapytania
+        
+    Returns:
+        dict: Odpowiedź z API jako słownik lub None w przypadku błędu
+    """
+    for attempt in range(HTTP_MAX_RETRIES + 1):
+        time.sleep(rate_limiter.reserve())
+        _count("requests")
+        retry_after = None
+        
+        try:
+            # Wykonanie zapytania HTTP przez wspólną sesję z limitami czasu
+            response = session.get(url, params=params, timeout=(HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT))
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            error = e
+        except requests.exceptions.RequestException as e:
+            print(f"Błąd podczas komunikacji z API: {e}")
+            return None
+        else:
+            if response.status_code not in RETRY_STATUSES:
+                try:
+                    response.raise_for_status()  # Sprawdzenie statusu odpowiedzi
+                    return response.json()  # Konwersja JSON na słownik
+                except requests.exceptions.RequestException as e:
+                    print(f"Błąd podczas komunikacji z API: {e}")
+                    return None
+            
+            error = f"{response.status_code} {response.reason} dla {response.url}"
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            # Przekroczony limit wstrzymuje wszystkie wątki, nie tylko ten jeden
+            if response.status_code == 429 and retry_after is not None:
+                rate_limiter.pause(retry_after)
+        
+        if attempt < HTTP_MAX_RETRIES:
+            _count("retries")
+            time.sleep(backoff_delay(attempt, retry_after))
+    
+    print(f"Błąd podczas komunikacji z API: {error}")
+    return None
 
 def call_api(endpoint, params=None):
     """
     Wykonuje zapytanie HTTP do API TMDb
+    Jeśli identyczne zapytanie jest właśnie wykonywane przez inny wątek,
+    czeka na jego wynik zamiast wysyłać kolejne
     
     Args:
         endpoint: Endpoint API do wywołania (np. "/search/movie")
@@ -31,14 +149,47 @@ def call_api(endpoint, params=None):
     # Kompletny URL zapytania
     url = BASE_URL + endpoint
     
+    key = (endpoint, tuple(sorted(params.items())))
+    with _inflight_lock:
+        future = _inflight.get(key)
+        leader = future is None
+        if leader:
+            future = _inflight[key] = Future()
+    
+    if not leader:
+        _count("coalesced")
+        return future.result()
+    
+    result = None
     try:
-        # Wykonanie zapytania HTTP
-        response = requests.get(url, params=params)
-        response.raise_for_status()  # Sprawdzenie statusu odpowiedzi
-        return response.json()  # Konwersja JSON na słownik
-    except requests.exceptions.RequestException as e:
-        print(f"Błąd podczas komunikacji z API: {e}")
-        return None
+        result = _get_with_retry(url, params)
+        return result
+    finally:
+        with _inflight_lock:
+            del _inflight[key]
+        future.set_result(result)
+    
+def fetch_concurrently(func, items, max_workers=MAX_CONCURRENT_REQUESTS):
+    """
+    Wywołuje funkcję dla każdego elementu równolegle w puli wątków
+    Wyniki są zwracane w kolejności elementów wejściowych, niezależnie od kolejności odpowiedzi
+    
+    Args:
+        func: Funkcja wywoływana dla każdego elementu
+        items: Elementy do przetworzenia
+        max_workers: Maksymalna liczba równoległych zapytań
+        
+    Returns:
+        list: Wyniki func w kolejności elementów
+    """
+    items = list(items)
+    
+    # Dla jednego elementu nie ma sensu tworzyć puli wątków
+    if len(items) <= 1 or max_workers <= 1:
+        return [func(item) for item in items]
+    
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        return list(executor.map(func, items))
     
 def search_movies(query):
     """
@@ -62,6 +213,151 @@ def search_movies(query):
     else:
         return []
     
+def iter_pages(endpoint, params=None, max_results=None, stats=None):
+    """
+    Generator zwracający wyniki z kolejnych stron odpowiedzi API
+    Kolejna strona jest pobierana w tle, gdy wywołujący przetwarza bieżącą.
+    Strony są pobierane tylko do momentu, w którym wywołujący przestanie pobierać wyniki
+    lub zostanie osiągnięty limit max_results.
+    
+    Args:
+        endpoint: Endpoint API ze stronicowaniem (np. "/search/movie")
+        params: Parametry zapytania bez numeru strony
+        max_results: Maksymalna liczba zwróconych wyników (None - wszystkie strony)
+        stats: Opcjonalny słownik, do którego zostaną zapisane total_results i total_pages,
+               liczba pobranych stron (requests) oraz failed=True, gdy pobranie strony się nie powiodło
+        
+    Yields:
+        dict: Surowe dane jednego wyniku z API
+    """
+    params = dict(params or {})
+    yielded = 0
+    
+    def fetch_page(page):
+        # Licznik tego wywołania, niezależny od zapytań innych wątków w request_stats
+        if stats is not None:
+            stats['requests'] = stats.get('requests', 0) + 1
+        return call_api(endpoint, dict(params, page=page))
+    
+    executor = ThreadPoolExecutor(max_workers=1)
+    try:
+        page = 1
+        future = executor.submit(fetch_page, page)
+        
+        while future is not None:
+            results = future.result()
+            if not results or 'results' not in results:
+                if results is None and stats is not None:
+                    stats['failed'] = True
+                break
+            
+            if stats is not None and page == 1:
+                stats['total_results'] = results.get('total_results', len(results['results']))
+                stats['total_pages'] = results.get('total_pages', 1)
+            
+            # Pobieranie następnej strony w tle, jeśli jeszcze będzie potrzebna
+            future = None
+            enough = max_results is not None and yielded + len(results['results']) >= max_results
+            if page < results.get('total_pages', page) and not enough:
+                future = executor.submit(fetch_page, page + 1)
+            
+            for item in results['results']:
+                yield item
+                yielded += 1
+                if max_results is not None and yielded >= max_results:
+                    return
+            page += 1
+    finally:
+        # Przy wcześniejszym zakończeniu przez wywołującego nie czekamy na pobieraną stronę
+        executor.shutdown(wait=False, cancel_futures=True)
+    
+def iter_search_movies(query, limit=None, stats=None):
+    """
+    Generator wyszukujący filmy na wszystkich stronach wyników
+    Obiekty Movie są tworzone dopiero przy pobraniu ich przez wywołującego,
+    a czas trwania jest pobierany dopiero przy pierwszym odczycie
+    
+    Args:
+        query: Tekst do wyszukania (tytuł filmu)
+        limit: Maksymalna liczba filmów (None - wszystkie wyniki)
+        stats: Opcjonalny słownik, do którego zostaną zapisane total_results i total_pages
+        
+    Yields:
+        Movie: Kolejny znaleziony film
+    """
+    from models import Movie
+    
+    for movie_data in iter_pages("/search/movie", {"query": query}, max_results=limit, stats=stats):
+        yield Movie.from_api_data(movie_data)
+    
+def detail_fields(append=None):
+    """
+    Zwraca listę dodatkowych zasobów do pobrania razem ze szczegółami filmu
+    
+    Args:
+        append: Nazwy zasobów (np. ["credits", "keywords"]) lub None dla ustawienia z config.py
+        
+    Returns:
+        tuple: Posortowane nazwy znanych zasobów
+    """
+    fields = set(MOVIE_DETAIL_APPEND if append is None else append)
+    unknown = fields - APPENDABLE_FIELDS
+    if unknown:
+        print(f"Pominięto nieznane zasoby append_to_response: {', '.join(sorted(unknown))}")
+    return tuple(sorted(fields & APPENDABLE_FIELDS))
+
+def details_params(cached, fields):
+    """
+    Buduje parametry zapytania /movie/{id} z dołączonymi zasobami
+    Zasoby zapisane już w pamięci podręcznej są pobierane ponownie, żeby nowa odpowiedź ich nie zgubiła
+    
+    Args:
+        cached: Dane filmu z pamięci podręcznej lub None
+        fields: Potrzebne zasoby
+        
+    Returns:
+        dict: Parametry zapytania
+    """
+    fields = set(fields)
+    if cached:
+        fields |= APPENDABLE_FIELDS.intersection(cached)
+    return {"append_to_response": ",".join(sorted(fields))} if fields else {}
+
+def movie_details(id, append=None):
+    """
+    Pobiera surowe dane filmu z endpointu /movie/{id} razem z dodatkowymi zasobami
+    (np. obsadą i słowami kluczowymi) w jednym zapytaniu
+    Najpierw sprawdza pamięć podręczną, dopiero potem wywołuje API
+    
+    Args:
+        id: ID filmu z TMDb
+        append: Dodatkowe zasoby (None - ustawienie MOVIE_DETAIL_APPEND z config.py)
+        
+    Returns:
+        dict: Dane filmu lub None w przypadku błędu
+    """
+    try:
+        movie_id = int(id)
+    except (TypeError, ValueError):
+        print(f"Nieprawidłowe ID filmu: {id}")
+        return None
+    
+    fields = detail_fields(append)
+    
+    # Sprawdzenie pamięci podręcznej (dane muszą zawierać wszystkie potrzebne zasoby)
+    cached = movie_cache.get("/movie", movie_id, LANGUAGE)
+    if cached is not None and all(field in cached for field in fields):
+        return cached
+    
+    details = call_api(f"/movie/{movie_id}", params=details_params(cached, fields))
+    
+    # Zapisujemy tylko poprawne odpowiedzi
+    if details and 'id' in details:
+        movie_cache.set("/movie", movie_id, LANGUAGE, details)
+        return details
+    # Przy błędzie lepsze są dane bez dodatkowych zasobów niż żadne
+    return cached
+    
 def runtime(id):
     """
     Pobiera czas trwania filmu na podstawie jego ID
@@ -72,35 +368,70 @@ def runtime(id):
     Returns:
         int: Czas trwania w minutach lub 0 w przypadku błędu
     """
-    endpoint = f"/movie/{id}"
+    result = movie_details(id)
     
-    result = call_api(endpoint, params={})
-    
-    if result and 'runtime' in result:
+    if result and result.get('runtime'):
         return result['runtime']
     else:
         return 0
     
-def movie_for_id(id):
+def movie_for_id(id, append=None):
     """
     Pobiera pełne dane filmu na podstawie jego ID
     Tworzy obiekt Movie z danych z API
     
     Args:
         id: ID filmu z TMDb
+        append: Dodatkowe zasoby pobierane w tym samym zapytaniu
         
     Returns:
         Movie: Obiekt filmu lub None w przypadku błędu
     """
     from models import Movie
-    endpoint = f"/movie/{id}"  # Endpoint do pobierania szczegółów filmu
     
-    # Pobranie wyników z API
-    results = call_api(endpoint, params={})
+    # Pobranie wyników z pamięci podręcznej lub API
+    results = movie_details(id, append)
     
     # Ekstrakcja danych filmu i utworzenie obiektu
     if results and 'id' in results:
             movie = Movie.from_api_data(results)
             return movie
     else:
-        return None
\ No newline at end of file
+        return None
+        
+def details_for_ids(ids, append=None):
+    """
+    Pobiera równolegle szczegóły wielu filmów, po jednym zapytaniu na film
+    (szczegóły i dodatkowe zasoby przychodzą w tej samej odpowiedzi)
+    Każde ID jest pobierane tylko raz, nawet jeśli występuje na liście wielokrotnie
+    
+    Args:
+        ids: Lista ID filmów z TMDb
+        append: Dodatkowe zasoby (None - ustawienie MOVIE_DETAIL_APPEND z config.py)
+        
+    Returns:
+        list: Lista słowników z danymi filmów (lub None) w kolejności ID
+    """
+    ids = list(ids)
+    unique_ids = list(dict.fromkeys(ids))
+    details = dict(zip(unique_ids, fetch_concurrently(lambda movie_id: movie_details(movie_id, append), unique_ids)))
+    return [details[movie_id] for movie_id in ids]
+        
+def movies_for_ids(ids, append=None):
+    """
+    Pobiera równolegle filmy dla listy ID
+    Każde ID jest pobierane tylko raz, nawet jeśli występuje na liście wielokrotnie
+    
+    Args:
+        ids: Lista ID filmów z TMDb
+        append: Dodatkowe zasoby pobierane w tym samym zapytaniu
+        
+    Returns:
+        list: Lista obiektów Movie (lub None) w kolejności ID
+    """
+    from models import Movie
+    
+    return [
+        Movie.from_api_data(details) if details and 'id' in details else None
+        for details in details_for_ids(ids, append)
+    ]
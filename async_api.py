@@ -0,0 +1,317 @@
+"""
+Moduł asynchronicznej komunikacji z API filmowym
+
+Odpowiednik modułu api.py dla kodu działającego w pętli zdarzeń asyncio.
+Zawiera:
+- Wspólną asynchroniczną pulę połączeń HTTP (aiohttp)
+- Semafor ograniczający liczbę równoległych zapytań
+- Ten sam limit zapytań, ponowienia i łączenie identycznych zapytań co w api.py
+- Asynchroniczne wersje funkcji call_api, search_movies, runtime i movie_for_id
+- Funkcje do pobierania wielu filmów naraz
+
+Korzysta z tej samej pamięci podręcznej szczegółów filmów co api.py; odczyty i zapisy
+tej pamięci (SQLite) są wykonywane w osobnym wątku, żeby nie blokować pętli zdarzeń.
+"""
+
+import asyncio
+import aiohttp
+from config import API_KEY, BASE_URL, LANGUAGE, MAX_CONCURRENT_REQUESTS
+from config import HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, HTTP_POOL_MAXSIZE, HTTP_MAX_RETRIES
+from api import movie_cache, rate_limiter, RETRY_STATUSES, _count, detail_fields, details_params
+from rate_limit import parse_retry_after, backoff_delay
+
+# Sesja, semafor i zapytania w toku są tworzone osobno dla każdej pętli zdarzeń
+_session = None
+_semaphore = None
+_loop = None
+_inflight = {}
+_closer = None  # Generator asynchroniczny zamykający sesję przy zamykaniu jej pętli zdarzeń
+
+async def _close_on_shutdown(session):
+    """
+    Zamyka sesję, gdy pętla zdarzeń kończy generatory asynchroniczne
+    (asyncio.run robi to przed zamknięciem pętli, więc połączenia nie wyciekają)
+    """
+    try:
+        yield
+    finally:
+        await session.close()
+
+def _release_session(session, loop):
+    """
+    Zwalnia sesję należącą do innej pętli zdarzeń przed utworzeniem nowej
+
+    Args:
+        session: Poprzednia sesja aiohttp
+        loop: Pętla zdarzeń, w której sesja została utworzona
+    """
+    if session is None or session.closed:
+        return
+    if loop is not None and loop.is_running() and not loop.is_closed():
+        # Pętla działa w innym wątku - sesja jest zamykana w niej
+        asyncio.run_coroutine_threadsafe(session.close(), loop)
+    else:
+        # Pętla została zatrzymana bez zamknięcia sesji - odłączamy konektor,
+        # żeby sesji nie dało się już użyć
+        session.detach()
+
+def get_session():
+    """
+    Zwraca wspólną sesję aiohttp dla bieżącej pętli zdarzeń
+    Tworzy ją przy pierwszym użyciu razem z semaforem ograniczającym zapytania
+
+    Returns:
+        aiohttp.ClientSession: Sesja z pulą połączeń keep-alive
+    """
+    global _session, _semaphore, _loop, _inflight, _closer
+
+    loop = asyncio.get_running_loop()
+    if _session is None or _session.closed or _loop is not loop:
+        if _loop is not loop:
+            _release_session(_session, _loop)
+        connector = aiohttp.TCPConnector(limit=HTTP_POOL_MAXSIZE, ttl_dns_cache=300)
+        timeout = aiohttp.ClientTimeout(sock_connect=HTTP_CONNECT_TIMEOUT, sock_read=HTTP_READ_TIMEOUT)
+        _session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=timeout,
+            headers={"Accept": "application/json", "Accept-Encoding": "gzip, deflate"}
+        )
+        _semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        _inflight = {}
+        _loop = loop
+        # Pierwszy krok generatora rejestruje go w pętli (loop.shutdown_asyncgens zamknie sesję);
+        # wykonywany synchronicznie, bo dochodzi tylko do yield i nie czeka na nic
+        _closer = _close_on_shutdown(_session)
+        try:
+            _closer.asend(None).send(None)
+        except StopIteration:
+            pass
+    return _session
+
+async def close_session():
+    """
+    Zamyka wspólną sesję HTTP
+    Należy ją wywołać przy zamykaniu aplikacji
+    """
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+
+async def _get_with_retry(session, url, params):
+    """
+    Wysyła zapytanie GET z limitem zapytań i ponowieniami
+
+    Args:
+        session: Sesja aiohttp
+        url: Pełny URL zapytania
+        params: Parametry zapytania
+
+    Returns:
+        dict: Odpowiedź z API jako słownik lub None w przypadku błędu
+    """
+    for attempt in range(HTTP_MAX_RETRIES + 1):
+        await asyncio.sleep(rate_limiter.reserve())
+        retry_after = None
+
+        try:
+            # Semafor ogranicza liczbę zapytań wykonywanych jednocześnie
+            async with _semaphore:
+                _count("requests")
+                async with session.get(url, params=params) as response:
+                    if response.status not in RETRY_STATUSES:
+                        response.raise_for_status()  # Sprawdzenie statusu odpowiedzi
+                        return await response.json()  # Konwersja JSON na słownik
+
+                    error = f"{response.status} {response.reason} dla {response.url}"
+                    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                    # Przekroczony limit wstrzymuje wszystkie zapytania, nie tylko to jedno
+                    if response.status == 429 and retry_after is not None:
+                        rate_limiter.pause(retry_after)
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+            error = e
+        except aiohttp.ClientError as e:
+            print(f"Błąd podczas komunikacji z API: {e}")
+            return None
+
+        if attempt < HTTP_MAX_RETRIES:
+            _count("retries")
+            await asyncio.sleep(backoff_delay(attempt, retry_after))
+
+    print(f"Błąd podczas komunikacji z API: {error}")
+    return None
+
+async def call_api(endpoint, params=None):
+    """
+    Wykonuje asynchroniczne zapytanie HTTP do API TMDb
+    Jeśli identyczne zapytanie jest już w toku, czeka na jego wynik zamiast wysyłać kolejne
+
+    Args:
+        endpoint: Endpoint API do wywołania (np. "/search/movie")
+        params: Parametry zapytania jako słownik
+
+    Returns:
+        dict: Odpowiedź z API jako słownik lub None w przypadku błędu
+    """
+    # Inicjalizacja parametrów
+    if params is None:
+        params = {}
+
+    # Dodanie wymaganych parametrów autoryzacji
+    params['api_key'] = API_KEY
+    params['language'] = LANGUAGE
+
+    # Kompletny URL zapytania
+    url = BASE_URL + endpoint
+
+    session = get_session()
+    key = (endpoint, tuple(sorted(params.items())))
+
+    task = _inflight.get(key)
+    if task is not None:
+        _count("coalesced")
+    else:
+        task = asyncio.ensure_future(_get_with_retry(session, url, params))
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+
+    # shield: anulowanie jednego z oczekujących nie przerywa zapytania pozostałym
+    return await asyncio.shield(task)
+
+async def search_movies(query):
+    """
+    Wyszukuje filmy na podstawie zapytania tekstowego
+
+    Args:
+        query: Tekst do wyszukania (tytuł filmu)
+
+    Returns:
+        list: Lista filmów pasujących do zapytania lub pusta lista
+    """
+    results = await call_api("/search/movie", {"query": query})
+
+    if results and 'results' in results:
+        return results['results']
+    else:
+        return []
+
+async def discover_movies(genre_ids, sort_by="popularity.desc", pages=1, start_page=1, stats=None):
+    """
+    Pobiera filmy z określonych gatunków przez endpoint /discover/movie
+    Wszystkie strony są pobierane równolegle
+
+    Args:
+        genre_ids: Lista ID gatunków z TMDb (film musi należeć do wszystkich)
+        sort_by: Kryterium sortowania TMDb
+        pages: Liczba kolejnych stron wyników do pobrania
+        start_page: Numer pierwszej pobieranej strony
+        stats: Opcjonalny słownik, do którego zostanie zapisana liczba pobranych stron (requests)
+               oraz failed=True, gdy pobranie strony się nie powiodło
+
+    Returns:
+        list: Lista filmów z pobranych stron lub pusta lista
+    """
+    with_genres = ",".join(str(genre_id) for genre_id in genre_ids)
+
+    responses = await asyncio.gather(*(
+        call_api("/discover/movie", {"with_genres": with_genres, "sort_by": sort_by, "page": page})
+        for page in range(start_page, start_page + pages)
+    ))
+
+    if stats is not None:
+        stats['requests'] = stats.get('requests', 0) + len(responses)
+
+    movies = []
+    for results in responses:
+        if not results or 'results' not in results:
+            if results is None and stats is not None:
+                stats['failed'] = True
+            break
+        movies.extend(results['results'])
+    return movies
+
+async def movie_details(id, append=None):
+    """
+    Pobiera surowe dane filmu z endpointu /movie/{id} razem z dodatkowymi zasobami
+    Najpierw sprawdza pamięć podręczną, dopiero potem wywołuje API
+
+    Args:
+        id: ID filmu z TMDb
+        append: Dodatkowe zasoby (None - ustawienie MOVIE_DETAIL_APPEND z config.py)
+
+    Returns:
+        dict: Dane filmu lub None w przypadku błędu
+    """
+    try:
+        movie_id = int(id)
+    except (TypeError, ValueError):
+        print(f"Nieprawidłowe ID filmu: {id}")
+        return None
+
+    fields = detail_fields(append)
+
+    # Pamięć podręczna korzysta z SQLite i blokady, więc działa poza pętlą zdarzeń
+    cached = await asyncio.to_thread(movie_cache.get, "/movie", movie_id, LANGUAGE)
+    if cached is not None and all(field in cached for field in fields):
+        return cached
+
+    details = await call_api(f"/movie/{movie_id}", params=details_params(cached, fields))
+
+    if details and 'id' in details:
+        await asyncio.to_thread(movie_cache.set, "/movie", movie_id, LANGUAGE, details)
+        return details
+    return cached
+
+async def runtime(id):
+    """
+    Pobiera czas trwania filmu na podstawie jego ID
+
+    Args:
+        id: ID filmu z TMDb
+
+    Returns:
+        int: Czas trwania w minutach lub 0 w przypadku błędu
+    """
+    result = await movie_details(id)
+
+    if result and result.get('runtime'):
+        return result['runtime']
+    else:
+        return 0
+
+async def movie_for_id(id, append=None):
+    """
+    Pobiera pełne dane filmu na podstawie jego ID
+
+    Args:
+        id: ID filmu z TMDb
+        append: Dodatkowe zasoby pobierane w tym samym zapytaniu
+
+    Returns:
+        Movie: Obiekt filmu lub None w przypadku błędu
+    """
+    from models import Movie
+
+    results = await movie_details(id, append)
+
+    if results and 'id' in results:
+        return Movie.from_api_data(results)
+    else:
+        return None
+
+async def movies_for_ids(ids, append=None):
+    """
+    Pobiera równolegle filmy dla listy ID
+    Każde ID jest pobierane tylko raz, nawet jeśli występuje na liście wielokrotnie
+
+    Args:
+        ids: Lista ID filmów z TMDb
+        append: Dodatkowe zasoby pobierane w tym samym zapytaniu
+
+    Returns:
+        list: Lista obiektów Movie (lub None) w kolejności ID
+    """
+    ids = list(ids)
+    unique_ids = list(dict.fromkeys(ids))
+    movies = dict(zip(unique_ids, await asyncio.gather(*(movie_for_id(movie_id, append) for movie_id in unique_ids))))
+    return [movies[movie_id] for movie_id in ids]
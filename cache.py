@@ -0,0 +1,283 @@
+"""
+Moduł pamięci podręcznej danych filmów
+
+Zawiera:
+- Klasę MovieCache przechowującą odpowiedzi API w lokalnej bazie SQLite
+- Warstwę LRU w pamięci operacyjnej przed bazą danych
+- Obsługę czasu ważności wpisów (TTL)
+- Liczniki trafień i chybień pamięci podręcznej
+- Klasę RecommendationCache przechowującą gotowe rekomendacje użytkowników
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from config import CACHE_FILE, CACHE_TTL, CACHE_MEMORY_SIZE
+from config import RECOMMENDATION_CACHE_SIZE, RECOMMENDATION_CACHE_TTL
+
+
+class MovieCache:
+    """
+    Dwupoziomowa pamięć podręczna odpowiedzi API
+    Klucz wpisu to krotka (endpoint, movie_id, language)
+    """
+
+    def __init__(self, path: str = CACHE_FILE, ttl: int = CACHE_TTL, memory_size: int = CACHE_MEMORY_SIZE):
+        """
+        Inicjalizacja pamięci podręcznej
+
+        Args:
+            path: Ścieżka do pliku bazy SQLite (":memory:" dla bazy w pamięci)
+            ttl: Czas ważności wpisów w sekundach
+            memory_size: Maksymalna liczba wpisów w warstwie LRU
+        """
+        self.path = path
+        self.ttl = ttl
+        self.memory_size = memory_size
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+        self._memory = OrderedDict()  # Słownik {klucz: (czas_zapisu, dane)}
+        self._lock = threading.Lock()
+        self._connection = None
+        self._disk_enabled = True
+
+    def _connect(self):
+        """
+        Otwiera połączenie z bazą przy pierwszym użyciu
+        W przypadku błędu wyłącza warstwę dyskową
+
+        Returns:
+            sqlite3.Connection: Połączenie z bazą lub None
+        """
+        if self._connection is None and self._disk_enabled:
+            try:
+                self._connection = sqlite3.connect(self.path, check_same_thread=False)
+                self._connection.execute(
+                    "CREATE TABLE IF NOT EXISTS cache ("
+                    "endpoint TEXT NOT NULL, "
+                    "movie_id INTEGER NOT NULL, "
+                    "language TEXT NOT NULL, "
+                    "payload TEXT NOT NULL, "
+                    "stored_at REAL NOT NULL, "
+                    "PRIMARY KEY (endpoint, movie_id, language))"
+                )
+                self._connection.commit()
+            except sqlite3.Error as e:
+                print(f"Błąd podczas otwierania pamięci podręcznej: {e}")
+                self._connection = None
+                self._disk_enabled = False
+        return self._connection
+
+    def _is_fresh(self, stored_at: float) -> bool:
+        """Sprawdza czy wpis zapisany w danym czasie jest nadal ważny"""
+        return time.time() - stored_at < self.ttl
+
+    def _remember(self, key, stored_at, data) -> None:
+        """Dodaje wpis do warstwy LRU i usuwa najstarsze wpisy"""
+        self._memory[key] = (stored_at, data)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def get(self, endpoint: str, movie_id: int, language: str):
+        """
+        Pobiera dane z pamięci podręcznej
+
+        Args:
+            endpoint: Nazwa endpointu API (np. "/movie")
+            movie_id: ID filmu z TMDb
+            language: Język odpowiedzi
+
+        Returns:
+            dict: Zapisane dane lub None gdy brak ważnego wpisu
+        """
+        key = (endpoint, int(movie_id), language)
+
+        with self._lock:
+            # Warstwa 1: pamięć operacyjna
+            entry = self._memory.get(key)
+            if entry is not None:
+                if self._is_fresh(entry[0]):
+                    self._memory.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    return entry[1]
+                del self._memory[key]
+
+            # Warstwa 2: baza SQLite
+            connection = self._connect()
+            if connection is not None:
+                try:
+                    row = connection.execute(
+                        "SELECT payload, stored_at FROM cache "
+                        "WHERE endpoint = ? AND movie_id = ? AND language = ?",
+                        key
+                    ).fetchone()
+                    if row is not None and self._is_fresh(row[1]):
+                        data = json.loads(row[0])
+                        self._remember(key, row[1], data)
+                        self.stats["disk_hits"] += 1
+                        return data
+                except (sqlite3.Error, json.JSONDecodeError) as e:
+                    print(f"Błąd podczas odczytu pamięci podręcznej: {e}")
+
+            self.stats["misses"] += 1
+            return None
+
+    def set(self, endpoint: str, movie_id: int, language: str, data) -> None:
+        """
+        Zapisuje dane w obu warstwach pamięci podręcznej
+
+        Args:
+            endpoint: Nazwa endpointu API (np. "/movie")
+            movie_id: ID filmu z TMDb
+            language: Język odpowiedzi
+            data: Dane do zapisania (słownik serializowalny do JSON)
+        """
+        key = (endpoint, int(movie_id), language)
+        stored_at = time.time()
+
+        with self._lock:
+            self._remember(key, stored_at, data)
+
+            connection = self._connect()
+            if connection is None:
+                return
+            try:
+                connection.execute(
+                    "INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?)",
+                    (*key, json.dumps(data), stored_at)
+                )
+                connection.commit()
+            except (sqlite3.Error, TypeError) as e:
+                print(f"Błąd podczas zapisu pamięci podręcznej: {e}")
+
+    def clear(self) -> None:
+        """Usuwa wszystkie wpisy z obu warstw i zeruje liczniki"""
+        with self._lock:
+            self._memory.clear()
+            self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+            connection = self._connect()
+            if connection is not None:
+                try:
+                    connection.execute("DELETE FROM cache")
+                    connection.commit()
+                except sqlite3.Error as e:
+                    print(f"Błąd podczas czyszczenia pamięci podręcznej: {e}")
+
+    def hit_ratio(self) -> float:
+        """
+        Oblicza odsetek zapytań obsłużonych z pamięci podręcznej
+
+        Returns:
+            float: Wartość od 0 do 1
+        """
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        total = hits + self.stats["misses"]
+        return hits / total if total else 0.0
+
+
+
+class RecommendationCache:
+    """
+    Pamięć podręczna gotowych rekomendacji (LRU w pamięci operacyjnej)
+    Klucz wpisu to krotka (user_id, rodzaj_rekomendera, źródła_danych, limit), gdzie źródła danych
+    to znaczniki katalogu i modeli z source_token. Każdy wpis pamięta wersję danych użytkownika,
+    z której powstał - po zmianie ocen lub historii wpis przestaje pasować.
+    """
+
+    def __init__(self, max_size: int = RECOMMENDATION_CACHE_SIZE, ttl: int = RECOMMENDATION_CACHE_TTL):
+        """
+        Inicjalizacja pamięci podręcznej
+
+        Args:
+            max_size: Maksymalna liczba przechowywanych wyników
+            ttl: Czas ważności wyniku w sekundach (np. ze względu na zmiany popularności w TMDb)
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0}
+        self._entries = OrderedDict()  # Słownik {klucz: (wersja, czas_zapisu, wynik)}
+        self._tokens = weakref.WeakKeyDictionary()  # Słownik {źródło danych: znacznik}
+        self._next_token = 1
+        self._lock = threading.Lock()
+
+    def source_token(self, source) -> int:
+        """
+        Zwraca znacznik źródła danych (katalogu, modelu) do klucza wpisu
+        Znacznik jest unikalny przez cały czas życia obiektu, w przeciwieństwie do id(),
+        które po usunięciu obiektu może zostać użyte ponownie
+
+        Args:
+            source: Obiekt źródła danych lub None
+
+        Returns:
+            int: Znacznik źródła (0 dla None)
+        """
+        if source is None:
+            return 0
+        with self._lock:
+            token = self._tokens.get(source)
+            if token is None:
+                token = self._next_token
+                self._next_token += 1
+                self._tokens[source] = token
+            return token
+
+    def get(self, key, version: int):
+        """
+        Pobiera wynik zapisany dla danej wersji danych użytkownika
+
+        Args:
+            key: Krotka (user_id, rodzaj_rekomendera, źródła_danych, limit)
+            version: Aktualna wersja danych użytkownika
+
+        Returns:
+            list: Kopia zapisanej listy rekomendacji lub None gdy brak aktualnego wpisu
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] == version and time.time() - entry[1] < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return list(entry[2])
+                del self._entries[key]
+
+            self.stats["misses"] += 1
+            return None
+
+    def set(self, key, version: int, result) -> None:
+        """
+        Zapisuje wynik obliczony dla danej wersji danych użytkownika
+
+        Args:
+            key: Krotka (user_id, rodzaj_rekomendera, źródła_danych, limit)
+            version: Wersja danych użytkownika, z której obliczono wynik
+            result: Lista rekomendacji
+        """
+        with self._lock:
+            self._entries[key] = (version, time.time(), list(result))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id) -> None:
+        """
+        Usuwa wszystkie wyniki danego użytkownika
+
+        Args:
+            user_id: ID użytkownika
+        """
+        with self._lock:
+            stale = [key for key in self._entries if key[0] == user_id]
+            for key in stale:
+                del self._entries[key]
+            self.stats["invalidations"] += len(stale)
+
+    def clear(self) -> None:
+        """Usuwa wszystkie wpisy i zeruje liczniki"""
+        with self._lock:
+            self._entries.clear()
+            self.stats = {"hits": 0, "misses": 0, "invalidations": 0}
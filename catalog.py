@@ -0,0 +1,354 @@
+"""
+Moduł lokalnego katalogu filmów
+
+Zawiera:
+- Klasę MovieCatalog przechowującą filmy w bazie SQLite
+- Indeksy po gatunku, roku, średniej ocenie i ocenie ważonej liczbą głosów
+- Masowy import filmów z plików JSONL w formacie odpowiedzi TMDb
+- Zapytania zwracające kandydatów do rekomendacji bez połączenia z API
+
+Import z linii poleceń:
+    python catalog.py filmy.jsonl
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import threading
+from typing import List, Optional, Generator
+from config import CATALOG_FILE
+from models import Movie
+
+# Ocena ważona: średnia filmu przyciągana do PRIOR_RATING tym silniej, im mniej ma głosów
+# (film z kilkoma głosami i oceną 10.0 nie wyprzedza klasyków z tysiącami głosów)
+PRIOR_RATING = 6.0
+PRIOR_VOTES = 100
+
+
+def weighted_rating(avg_rating: float, vote_count: int) -> float:
+    """
+    Oblicza ocenę ważoną liczbą głosów (średnia bayesowska)
+
+    Args:
+        avg_rating: Średnia ocena filmu w TMDb
+        vote_count: Liczba głosów
+
+    Returns:
+        float: Ocena ważona
+    """
+    return (avg_rating * vote_count + PRIOR_RATING * PRIOR_VOTES) / (vote_count + PRIOR_VOTES)
+
+
+class MovieCatalog:
+    """
+    Lokalny katalog filmów w bazie SQLite
+    Pozwala generować rekomendacje niezależnie od dostępności API
+    """
+
+    def __init__(self, path: str = CATALOG_FILE):
+        """
+        Inicjalizacja katalogu i utworzenie tabel, jeśli nie istnieją
+
+        Args:
+            path: Ścieżka do pliku bazy SQLite (":memory:" dla bazy w pamięci)
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.executescript(
+            "CREATE TABLE IF NOT EXISTS movies ("
+            "movie_id INTEGER PRIMARY KEY, "
+            "title TEXT NOT NULL, "
+            "year INTEGER NOT NULL, "
+            "avg_rating REAL NOT NULL, "
+            "vote_count INTEGER NOT NULL, "
+            "popularity REAL NOT NULL, "
+            "runtime INTEGER, "
+            "genre_ids TEXT NOT NULL, "
+            "genre_mask INTEGER NOT NULL, "
+            "weighted_rating REAL NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS movie_genres ("
+            "genre_id INTEGER NOT NULL, "
+            "movie_id INTEGER NOT NULL, "
+            "PRIMARY KEY (genre_id, movie_id)) WITHOUT ROWID;"
+            "CREATE INDEX IF NOT EXISTS idx_movies_year ON movies (year);"
+            "CREATE INDEX IF NOT EXISTS idx_movies_rating ON movies (avg_rating);"
+        )
+        self._add_weighted_rating_column()
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_movies_weighted ON movies (weighted_rating DESC, vote_count DESC, movie_id)"
+        )
+        self._connection.commit()
+
+    def _add_weighted_rating_column(self) -> None:
+        """Dodaje kolumnę oceny ważonej do katalogów utworzonych przed jej wprowadzeniem"""
+        columns = [row[1] for row in self._connection.execute("PRAGMA table_info(movies)")]
+        if "weighted_rating" in columns:
+            return
+        self._connection.execute("ALTER TABLE movies ADD COLUMN weighted_rating REAL NOT NULL DEFAULT 0")
+        self._connection.execute(
+            "UPDATE movies SET weighted_rating = (avg_rating * vote_count + ? * ?) / (vote_count + ?)",
+            (PRIOR_RATING, PRIOR_VOTES, PRIOR_VOTES)
+        )
+
+    def __len__(self) -> int:
+        """Zwraca liczbę filmów w katalogu"""
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM movies").fetchone()[0]
+
+    @staticmethod
+    def _row_from_api_data(api_data) -> tuple:
+        """
+        Zamienia dane filmu z API na wiersz tabeli movies
+
+        Args:
+            api_data: Słownik z danymi filmu z API
+
+        Returns:
+            tuple: Wartości kolumn tabeli movies
+
+        Raises:
+            ValueError, TypeError, AttributeError: Gdy dane filmu są nieprawidłowe
+        """
+        movie = Movie.from_api_data(api_data)
+        runtime = api_data.get('runtime')
+        avg_rating = movie.avg_rating or 0.0
+        vote_count = int(api_data.get('vote_count') or 0)
+        return (
+            movie.movie_id,
+            movie.title,
+            movie.year,
+            avg_rating,
+            vote_count,
+            float(api_data.get('popularity') or 0.0),
+            int(runtime) if runtime is not None else None,
+            ",".join(str(genre_id) for genre_id in movie.genre_ids),
+            movie.genre_mask,
+            weighted_rating(avg_rating, vote_count)
+        )
+
+    def add_movies(self, movies_data) -> int:
+        """
+        Dodaje lub aktualizuje filmy w katalogu w jednej transakcji
+
+        Args:
+            movies_data: Lista słowników z danymi filmów z API
+
+        Returns:
+            int: Liczba zapisanych filmów
+        """
+        return self._write_rows([self._row_from_api_data(api_data) for api_data in movies_data if api_data.get('id')])
+
+    def _write_rows(self, rows: List[tuple]) -> int:
+        """
+        Zapisuje gotowe wiersze tabeli movies razem z indeksem gatunków w jednej transakcji
+
+        Args:
+            rows: Wiersze utworzone przez _row_from_api_data
+
+        Returns:
+            int: Liczba zapisanych filmów
+        """
+        genre_rows = [
+            (int(genre_id), row[0])
+            for row in rows if row[7]
+            for genre_id in row[7].split(",")
+        ]
+
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "DELETE FROM movie_genres WHERE movie_id = ?",
+                [(row[0],) for row in rows]
+            )
+            self._connection.executemany("INSERT OR REPLACE INTO movies VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self._connection.executemany("INSERT OR IGNORE INTO movie_genres VALUES (?, ?)", genre_rows)
+        return len(rows)
+
+    def import_jsonl(self, path: str, batch_size: int = 5000) -> int:
+        """
+        Importuje filmy z pliku JSONL (jeden obiekt filmu TMDb w każdej linii)
+        Błędne linie (nieprawidłowy JSON, brak ID, złe wartości pól) są pomijane
+
+        Args:
+            path: Ścieżka do pliku JSONL
+            batch_size: Liczba filmów zapisywanych w jednej transakcji
+
+        Returns:
+            int: Liczba zaimportowanych filmów
+        """
+        imported = 0
+        skipped = 0
+        batch = []
+
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    # Każda linia jest sprawdzana osobno, żeby jeden zły film nie przerwał importu
+                    try:
+                        api_data = json.loads(line)
+                        if not api_data.get('id'):
+                            raise ValueError("brak ID filmu")
+                        batch.append(self._row_from_api_data(api_data))
+                    except (json.JSONDecodeError, TypeError, ValueError, AttributeError):
+                        skipped += 1
+                        continue
+
+                    if len(batch) >= batch_size:
+                        imported += self._write_rows(batch)
+                        batch = []
+
+            imported += self._write_rows(batch)
+        except FileNotFoundError:
+            print(f"Plik nie istnieje: {path}")
+        except sqlite3.Error as e:
+            print(f"Błąd podczas importu katalogu: {e}")
+
+        if skipped:
+            print(f"Pominięto {skipped} nieprawidłowych linii.")
+        return imported
+
+    @staticmethod
+    def _movie_from_row(row) -> Movie:
+        """
+        Tworzy obiekt Movie z wiersza tabeli movies
+
+        Args:
+            row: Krotka (movie_id, title, year, avg_rating, runtime, genre_ids)
+
+        Returns:
+            Movie: Obiekt filmu
+        """
+        movie_id, title, year, avg_rating, runtime, genre_ids = row
+        return Movie(
+            movie_id=movie_id,
+            title=title,
+            year=year,
+            avg_rating=avg_rating,
+            runtime=runtime,
+            genre_ids=[int(genre_id) for genre_id in genre_ids.split(",")] if genre_ids else []
+        )
+
+    def get_movie(self, movie_id: int) -> Optional[Movie]:
+        """
+        Pobiera film z katalogu po ID
+
+        Args:
+            movie_id: ID filmu z TMDb
+
+        Returns:
+            Movie: Obiekt filmu lub None, jeśli filmu nie ma w katalogu
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT movie_id, title, year, avg_rating, runtime, genre_ids FROM movies WHERE movie_id = ?",
+                (int(movie_id),)
+            ).fetchone()
+        return self._movie_from_row(row) if row else None
+
+    def find_movies(self, genre_id: int = None, min_year: int = None, max_year: int = None,
+                    min_rating: float = None, limit: int = 20) -> List[Movie]:
+        """
+        Wyszukuje filmy korzystając z indeksów katalogu
+        Wyniki są posortowane malejąco według oceny ważonej liczbą głosów (weighted_rating),
+        więc filmy z kilkoma wysokimi ocenami nie wypierają popularnych, dobrze ocenianych
+
+        Args:
+            genre_id: ID gatunku z TMDb (None - wszystkie gatunki)
+            min_year: Najwcześniejszy rok produkcji
+            max_year: Najpóźniejszy rok produkcji
+            min_rating: Minimalna średnia ocena
+            limit: Maksymalna liczba wyników
+
+        Returns:
+            List[Movie]: Lista pasujących filmów
+        """
+        query = "SELECT m.movie_id, m.title, m.year, m.avg_rating, m.runtime, m.genre_ids FROM movies m"
+        conditions = []
+        params = []
+
+        if genre_id is not None:
+            query += " JOIN movie_genres g ON g.movie_id = m.movie_id"
+            conditions.append("g.genre_id = ?")
+            params.append(genre_id)
+        if min_year is not None:
+            conditions.append("m.year >= ?")
+            params.append(min_year)
+        if max_year is not None:
+            conditions.append("m.year <= ?")
+            params.append(max_year)
+        if min_rating is not None:
+            conditions.append("m.avg_rating >= ?")
+            params.append(min_rating)
+
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY m.weighted_rating DESC, m.vote_count DESC, m.movie_id LIMIT ?"
+        params.append(limit)
+
+        with self._lock:
+            rows = self._connection.execute(query, params).fetchall()
+        return [self._movie_from_row(row) for row in rows]
+
+    def iter_movies(self, batch_size: int = 10000) -> Generator[Movie, None, None]:
+        """
+        Generator zwracający wszystkie filmy z katalogu partiami
+
+        Args:
+            batch_size: Liczba filmów pobieranych z bazy w jednej partii
+
+        Yields:
+            Movie: Kolejny film z katalogu
+        """
+        last_id = -1
+        while True:
+            with self._lock:
+                rows = self._connection.execute(
+                    "SELECT movie_id, title, year, avg_rating, runtime, genre_ids FROM movies "
+                    "WHERE movie_id > ? ORDER BY movie_id LIMIT ?",
+                    (last_id, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield self._movie_from_row(row)
+            last_id = rows[-1][0]
+
+    def close(self) -> None:
+        """Zamyka połączenie z bazą katalogu"""
+        with self._lock:
+            self._connection.close()
+
+
+def load_catalog(path: str = CATALOG_FILE) -> Optional[MovieCatalog]:
+    """
+    Otwiera lokalny katalog filmów, jeśli plik bazy istnieje
+
+    Args:
+        path: Ścieżka do pliku bazy katalogu
+
+    Returns:
+        MovieCatalog: Katalog filmów lub None, jeśli katalog nie został utworzony
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        return MovieCatalog(path)
+    except sqlite3.Error as e:
+        print(f"Błąd podczas otwierania katalogu filmów: {e}")
+        return None
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Użycie: python catalog.py plik.jsonl [plik2.jsonl ...]")
+        sys.exit(1)
+
+    catalog = MovieCatalog()
+    for dump_path in sys.argv[1:]:
+        count = catalog.import_jsonl(dump_path)
+        print(f"Zaimportowano {count} filmów z pliku {dump_path}.")
+    print(f"Katalog zawiera {len(catalog)} filmów.")
+    catalog.close()
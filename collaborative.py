@@ -0,0 +1,281 @@
+"""
+Moduł filtrowania kolaboratywnego item-item
+
+Zawiera:
+- Budowę rzadkiej macierzy ocen użytkownik x film (format CSR w NumPy)
+- Obliczanie podobieństw kosinusowych między filmami (skorygowanych o średnią użytkownika)
+  jako rzadkiego iloczynu macierzy, blokami filmów o ograniczonej liczbie par
+- Przechowywanie tylko k najbardziej podobnych sąsiadów każdego filmu
+- Zapisywanie i wczytywanie modelu w kompaktowym formacie .npz
+- Przewidywanie ocen dla filmów, których użytkownik jeszcze nie ocenił
+"""
+
+import numpy as np
+from typing import Dict, List, Tuple, Iterable, Generator
+from config import CF_MODEL_FILE
+
+# Maksymalna liczba par (film, film) przetwarzanych naraz podczas trenowania - ogranicza zużycie pamięci
+PAIR_BLOCK_SIZE = 2_000_000
+
+
+def ratings_from_users(users) -> Generator[Tuple[int, int, float], None, None]:
+    """
+    Generator zamieniający oceny użytkowników na trójki (user_id, movie_id, rating)
+
+    Args:
+        users: Lista obiektów User
+
+    Yields:
+        Tuple[int, int, float]: Ocena jednego filmu przez jednego użytkownika
+    """
+    for user in users:
+        for movie_id, rating in user.user_ratings.items():
+            yield int(user.user_id), int(movie_id), float(rating)
+
+
+def build_rating_matrix(ratings: Iterable[Tuple[int, int, float]]):
+    """
+    Buduje rzadką macierz ocen w formacie CSR (wiersze to użytkownicy)
+    Oceny są pomniejszone o średnią ocenę danego użytkownika.
+    Jeśli użytkownik ocenił ten sam film kilka razy, liczy się ostatnia ocena.
+
+    Args:
+        ratings: Trójki (user_id, movie_id, rating)
+
+    Returns:
+        tuple: (item_ids, indptr, indices, data) - posortowane ID filmów oraz tablice CSR,
+        w których indices wskazują pozycje w item_ids
+    """
+    triples = np.array(list(ratings), dtype=float).reshape(-1, 3)
+    user_ids, user_rows = np.unique(triples[:, 0].astype(np.int64), return_inverse=True)
+    item_ids, item_columns = np.unique(triples[:, 1].astype(np.int64), return_inverse=True)
+    values = triples[:, 2]
+
+    # Usunięcie powtórzonych par (użytkownik, film) - unique na odwróconych tablicach wskazuje ostatnie wystąpienia
+    pair_keys = user_rows.astype(np.int64) * len(item_ids) + item_columns
+    _, last = np.unique(pair_keys[::-1], return_index=True)
+    keep = np.sort(len(pair_keys) - 1 - last)
+    user_rows, item_columns, values = user_rows[keep], item_columns[keep], values[keep]
+
+    # Skorygowanie ocen o średnią użytkownika (adjusted cosine)
+    user_sums = np.bincount(user_rows, weights=values, minlength=len(user_ids))
+    user_counts = np.bincount(user_rows, minlength=len(user_ids))
+    values = values - (user_sums / user_counts)[user_rows]
+
+    # Sortowanie po użytkowniku daje kolejne wiersze macierzy CSR
+    order = np.lexsort((item_columns, user_rows))
+    indptr = np.concatenate(([0], np.cumsum(user_counts)))
+    return item_ids, indptr, item_columns[order].astype(np.int32), values[order]
+
+
+def _gather_rows(indptr: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    """
+    Zwraca pozycje wszystkich elementów z wybranych wierszy macierzy CSR
+
+    Args:
+        indptr: Tablica początków wierszy CSR
+        rows: Numery wybranych wierszy
+
+    Returns:
+        np.ndarray: Pozycje elementów w tablicach indices i data
+    """
+    starts = indptr[rows]
+    lengths = indptr[rows + 1] - starts
+    offsets = np.repeat(starts - np.concatenate(([0], np.cumsum(lengths)[:-1])), lengths)
+    return offsets + np.arange(lengths.sum())
+
+
+class ItemItemCF:
+    """
+    Model filtrowania kolaboratywnego item-item
+    Dla każdego filmu przechowuje k najbardziej podobnych filmów
+    """
+
+    def __init__(self, item_ids: np.ndarray, neighbors: np.ndarray, similarities: np.ndarray):
+        """
+        Inicjalizacja modelu z gotowych tablic
+
+        Args:
+            item_ids: Posortowane ID filmów z TMDb
+            neighbors: Macierz (filmy x k) pozycji sąsiadów w item_ids (-1 gdy brak sąsiada)
+            similarities: Macierz (filmy x k) podobieństw do sąsiadów
+        """
+        self.item_ids = item_ids
+        self.neighbors = neighbors
+        self.similarities = similarities
+
+    @classmethod
+    def fit(cls, ratings: Iterable[Tuple[int, int, float]], k: int = 20) -> "ItemItemCF":
+        """
+        Trenuje model na ocenach wielu użytkowników
+
+        Args:
+            ratings: Trójki (user_id, movie_id, rating)
+            k: Liczba sąsiadów zapamiętywanych dla każdego filmu
+
+        Returns:
+            ItemItemCF: Wytrenowany model
+        """
+        item_ids, user_indptr, user_indices, user_data = build_rating_matrix(ratings)
+        n_items = len(item_ids)
+
+        # Transpozycja do macierzy film x użytkownik (CSR po filmach)
+        user_of_entry = np.repeat(np.arange(len(user_indptr) - 1), np.diff(user_indptr))
+        order = np.argsort(user_indices, kind="stable")
+        item_lengths = np.bincount(user_indices, minlength=n_items)
+        item_indptr = np.concatenate(([0], np.cumsum(item_lengths)))
+        item_users = user_of_entry[order]
+        item_data = user_data[order]
+
+        user_lengths = np.diff(user_indptr)
+        norms = np.sqrt(np.bincount(user_indices, weights=user_data ** 2, minlength=n_items))
+
+        neighbors = np.full((n_items, k), -1, dtype=np.int32)
+        similarities = np.zeros((n_items, k), dtype=np.float32)
+
+        # Liczba par (film, film) generowanych przez każdy film - podstawa podziału na bloki
+        item_pairs = np.bincount(item_users, weights=user_lengths[item_users], minlength=n_items)
+        pair_ends = np.cumsum(item_pairs)
+
+        start = 0
+        while start < n_items:
+            # Blok kolejnych filmów mieszczący się w PAIR_BLOCK_SIZE (co najmniej jeden film)
+            offset = pair_ends[start - 1] if start else 0
+            end = max(start + 1, int(np.searchsorted(pair_ends, offset + PAIR_BLOCK_SIZE, side="right")))
+            cls._fit_block(start, min(end, n_items), item_indptr, item_users, item_data,
+                           user_indptr, user_indices, user_data, norms, neighbors, similarities)
+            start = end
+
+        return cls(item_ids, neighbors, similarities)
+
+    @staticmethod
+    def _fit_block(start: int, end: int, item_indptr: np.ndarray, item_users: np.ndarray, item_data: np.ndarray,
+                   user_indptr: np.ndarray, user_indices: np.ndarray, user_data: np.ndarray,
+                   norms: np.ndarray, neighbors: np.ndarray, similarities: np.ndarray) -> None:
+        """
+        Oblicza sąsiadów filmów start..end-1 (wiersze rzadkiego iloczynu macierzy film x film)
+        Iloczyny skalarne powstają tylko dla par filmów ocenionych przez wspólnego użytkownika,
+        więc koszt zależy od liczby ocen, a nie od kwadratu liczby filmów
+
+        Args:
+            start: Pierwszy film bloku (pozycja w item_ids)
+            end: Pozycja za ostatnim filmem bloku
+            item_indptr, item_users, item_data: Macierz film x użytkownik w formacie CSR
+            user_indptr, user_indices, user_data: Macierz użytkownik x film w formacie CSR
+            norms: Normy wektorów ocen filmów
+            neighbors: Macierz sąsiadów uzupełniana w miejscu
+            similarities: Macierz podobieństw uzupełniana w miejscu
+        """
+        n_items, k = neighbors.shape
+        first, last = item_indptr[start], item_indptr[end]
+        users = item_users[first:last]
+        entry_items = np.repeat(np.arange(start, end), np.diff(item_indptr[start:end + 1]))
+
+        # Każda ocena filmu z bloku łączy się ze wszystkimi ocenami tego samego użytkownika
+        repeats = np.diff(user_indptr)[users]
+        positions = _gather_rows(user_indptr, users)
+        left = np.repeat(entry_items, repeats)
+        right = user_indices[positions].astype(np.int64)
+        weights = np.repeat(item_data[first:last], repeats) * user_data[positions]
+
+        different = left != right
+        pairs, inverse = np.unique(left[different] * n_items + right[different], return_inverse=True)
+        dots = np.bincount(inverse, weights=weights[different], minlength=len(pairs))
+        items, others = pairs // n_items, pairs % n_items
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sims = dots / (norms[items] * norms[others])
+
+        # Zachowanie tylko k sąsiadów o dodatnim podobieństwie dla każdego filmu
+        positive = sims > 0
+        items, others, sims = items[positive], others[positive], sims[positive]
+        order = np.lexsort((-sims, items))
+        items, others, sims = items[order], others[order], sims[order]
+        ranks = np.arange(len(items)) - np.searchsorted(items, items)
+        top = ranks < k
+
+        neighbors[items[top], ranks[top]] = others[top]
+        similarities[items[top], ranks[top]] = sims[top]
+
+    def save(self, path: str = CF_MODEL_FILE) -> None:
+        """
+        Zapisuje model do pliku .npz
+
+        Args:
+            path: Ścieżka do pliku modelu
+        """
+        np.savez_compressed(path, item_ids=self.item_ids, neighbors=self.neighbors, similarities=self.similarities)
+
+    @classmethod
+    def load(cls, path: str = CF_MODEL_FILE) -> "ItemItemCF":
+        """
+        Wczytuje model z pliku .npz
+
+        Args:
+            path: Ścieżka do pliku modelu
+
+        Returns:
+            ItemItemCF: Wczytany model lub None w przypadku błędu
+        """
+        try:
+            with np.load(path) as data:
+                return cls(data["item_ids"], data["neighbors"], data["similarities"])
+        except FileNotFoundError:
+            print(f"Plik nie istnieje: {path}")
+            return None
+        except (KeyError, ValueError, OSError) as e:
+            print(f"Błąd podczas wczytywania modelu: {e}")
+            return None
+
+    def recommend(self, user_ratings: Dict, limit: int = 10) -> List[Tuple[int, float]]:
+        """
+        Przewiduje oceny filmów podobnych do filmów ocenionych przez użytkownika
+
+        Przewidywana ocena to średnia użytkownika powiększona o ważoną podobieństwem
+        sumę odchyleń jego ocen od średniej.
+
+        Args:
+            user_ratings: Słownik {movie_id: rating} z ocenami użytkownika
+            limit: Maksymalna liczba rekomendacji
+
+        Returns:
+            List[Tuple[int, float]]: Lista par (movie_id, przewidywana ocena) malejąco
+        """
+        if not user_ratings:
+            return []
+
+        rated_ids = np.array([int(movie_id) for movie_id in user_ratings], dtype=np.int64)
+        rated_values = np.array(list(user_ratings.values()), dtype=float)
+        user_mean = rated_values.mean()
+
+        # Tylko filmy znane modelowi mają sąsiadów
+        positions = np.searchsorted(self.item_ids, rated_ids)
+        positions = np.minimum(positions, len(self.item_ids) - 1)
+        known = self.item_ids[positions] == rated_ids if len(self.item_ids) else np.zeros(0, dtype=bool)
+        if not known.any():
+            return []
+        positions, deviations = positions[known], rated_values[known] - user_mean
+
+        neighbors = self.neighbors[positions]
+        sims = self.similarities[positions].astype(float)
+        valid = neighbors >= 0
+
+        # Sumowanie wkładu wszystkich ocenionych filmów do ich sąsiadów
+        targets = neighbors[valid]
+        weighted = np.bincount(targets, weights=(sims * deviations[:, None])[valid], minlength=len(self.item_ids))
+        total_sims = np.bincount(targets, weights=np.abs(sims)[valid], minlength=len(self.item_ids))
+
+        total_sims[positions] = 0  # Wykluczenie filmów już ocenionych
+        candidates = np.flatnonzero(total_sims > 0)
+        scores = user_mean + weighted[candidates] / total_sims[candidates]
+
+        order = np.lexsort((self.item_ids[candidates], -scores))[:limit]
+        return list(zip(self.item_ids[candidates][order].tolist(), scores[order].tolist()))
+
+
+if __name__ == "__main__":
+    from models import load_persisted_ratings
+
+    model = ItemItemCF.fit(load_persisted_ratings())
+    model.save()
+    print(f"Zapisano model dla {len(model.item_ids)} filmów.")
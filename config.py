@@ -22,8 +22,55 @@ API_KEY = os.getenv("API_KEY")
 BASE_URL = os.getenv("BASE_URL", "https://api.themoviedb.org/3")
 # Język odpowiedzi (możesz ustawić 'pl' dla polskiego)
 LANGUAGE = os.getenv("LANGUAGE", "pl")
+# Limity czasu połączenia i odczytu odpowiedzi HTTP (w sekundach)
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 3.05))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", 10))
+# Liczba pul połączeń i maksymalna liczba połączeń utrzymywanych w puli
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", 4))
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", 16))
+# Dodatkowe zasoby pobierane razem ze szczegółami filmu (append_to_response), np. "credits,keywords"
+MOVIE_DETAIL_APPEND = tuple(field.strip() for field in os.getenv("MOVIE_DETAIL_APPEND", "").split(",") if field.strip())
+# Plik bazy SQLite z lokalnym katalogiem filmów
+CATALOG_FILE = os.getenv("CATALOG_FILE", "movie_catalog.db")
+# Plik z modelem filtrowania kolaboratywnego (podobieństwa item-item)
+CF_MODEL_FILE = os.getenv("CF_MODEL_FILE", "cf_model.npz")
+# Katalog z macierzami czynników modelu faktoryzacji (pliki .npy)
+MF_MODEL_DIR = os.getenv("MF_MODEL_DIR", "mf_model")
+# Plik z indeksem przybliżonego wyszukiwania podobnych filmów (LSH)
+ANN_INDEX_FILE = os.getenv("ANN_INDEX_FILE", "ann_index.npz")
+# Maksymalna liczba zapytań do API wykonywanych równolegle
+MAX_CONCURRENT_REQUESTS = int(os.getenv("MAX_CONCURRENT_REQUESTS", 8))
+# Limit zapytań do TMDb: liczba zapytań na sekundę i maksymalna liczba zapytań wysłanych naraz
+API_RATE_LIMIT = float(os.getenv("API_RATE_LIMIT", 40))
+API_RATE_BURST = int(os.getenv("API_RATE_BURST", 20))
+# Liczba ponowień zapytania po błędzie 429/5xx lub zerwanym połączeniu
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", 3))
+# Podstawa i górny limit czasu oczekiwania między ponowieniami (w sekundach)
+HTTP_BACKOFF_BASE = float(os.getenv("HTTP_BACKOFF_BASE", 0.5))
+HTTP_BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", 30))
 # Ścieżka do zapisywania danych użytkownika
 USER_DATA_FILE = "user_data.json"
+# Backend danych użytkowników: "sqlite" (wielu użytkowników), "journal" (dziennik zdarzeń)
+# lub "json" (dawny plik user_data.json)
+USER_STORAGE = os.getenv("USER_STORAGE", "sqlite")
+# Plik bazy SQLite z danymi użytkowników (oceny i historia oglądania)
+USER_DB_FILE = os.getenv("USER_DB_FILE", "users.db")
+# Katalog z dziennikami zdarzeń i migawkami użytkowników (backend "journal")
+JOURNAL_DIR = os.getenv("JOURNAL_DIR", "user_journal")
+# Co ile sekund dzienniki są zapisywane na dysk (fsync) oraz po ilu zdarzeniach są kompaktowane
+JOURNAL_FSYNC_INTERVAL = float(os.getenv("JOURNAL_FSYNC_INTERVAL", 1.0))
+JOURNAL_COMPACT_EVERY = int(os.getenv("JOURNAL_COMPACT_EVERY", 1000))
+# Liczba wyników rekomendacji przechowywanych w pamięci i ich czas ważności w sekundach
+RECOMMENDATION_CACHE_SIZE = int(os.getenv("RECOMMENDATION_CACHE_SIZE", 1024))
+RECOMMENDATION_CACHE_TTL = int(os.getenv("RECOMMENDATION_CACHE_TTL", 60 * 60))
+# Czy po zmianie ocen rekomendacje mają być przeliczane od razu w tle ("1" - tak)
+RECOMMENDATION_BACKGROUND_REFRESH = os.getenv("RECOMMENDATION_BACKGROUND_REFRESH", "0") == "1"
+# Plik bazy SQLite z pamięcią podręczną danych filmów
+CACHE_FILE = os.getenv("CACHE_FILE", "movie_cache.db")
+# Czas ważności danych w pamięci podręcznej w sekundach (domyślnie 7 dni)
+CACHE_TTL = int(os.getenv("CACHE_TTL", 7 * 24 * 60 * 60))
+# Liczba filmów przechowywanych w pamięci operacyjnej (warstwa LRU)
+CACHE_MEMORY_SIZE = int(os.getenv("CACHE_MEMORY_SIZE", 512))
 
 # Sprawdzenie czy klucz API jest dostępny
 if not API_KEY:
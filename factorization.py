@@ -0,0 +1,238 @@
+"""
+Moduł rekomendacji opartych na faktoryzacji macierzy ocen
+
+Zawiera:
+- Trening modelu czynników ukrytych metodą ALS (naprzemienne najmniejsze kwadraty) w NumPy
+- Zapisywanie macierzy czynników użytkowników i filmów do plików .npy
+- Wczytywanie macierzy z mapowaniem pliku do pamięci (mmap)
+- Szybkie ocenianie kandydatów jednym iloczynem skalarnym na film
+
+Trening offline z linii poleceń:
+    python factorization.py
+"""
+
+import os
+import numpy as np
+from typing import Dict, List, Tuple, Iterable
+from config import MF_MODEL_DIR
+from scoring import top_k
+
+
+class MatrixFactorization:
+    """
+    Model czynników ukrytych: ocena(u, i) ~ średnia + p_u . q_i
+    """
+
+    def __init__(self, user_ids: np.ndarray, item_ids: np.ndarray, user_factors: np.ndarray,
+                 item_factors: np.ndarray, global_mean: float, reg: float = 0.1):
+        """
+        Inicjalizacja modelu z gotowych macierzy
+
+        Args:
+            user_ids: Posortowane ID użytkowników
+            item_ids: Posortowane ID filmów z TMDb
+            user_factors: Macierz (użytkownicy x czynniki)
+            item_factors: Macierz (filmy x czynniki)
+            global_mean: Średnia wszystkich ocen ze zbioru treningowego
+            reg: Współczynnik regularyzacji (używany też przy dopasowaniu nowych użytkowników)
+        """
+        self.user_ids = user_ids
+        self.item_ids = item_ids
+        self.user_factors = user_factors
+        self.item_factors = item_factors
+        self.global_mean = global_mean
+        self.reg = reg
+
+    @classmethod
+    def train(cls, ratings: Iterable[Tuple[int, int, float]], factors: int = 16, reg: float = 0.1,
+              iterations: int = 10, seed: int = 0) -> "MatrixFactorization":
+        """
+        Trenuje model metodą ALS
+
+        Args:
+            ratings: Trójki (user_id, movie_id, rating)
+            factors: Liczba czynników ukrytych
+            reg: Współczynnik regularyzacji L2
+            iterations: Liczba iteracji ALS
+            seed: Ziarno generatora liczb losowych
+
+        Returns:
+            MatrixFactorization: Wytrenowany model
+        """
+        triples = np.array(list(ratings), dtype=float).reshape(-1, 3)
+        user_ids, user_rows = np.unique(triples[:, 0].astype(np.int64), return_inverse=True)
+        item_ids, item_columns = np.unique(triples[:, 1].astype(np.int64), return_inverse=True)
+        global_mean = float(triples[:, 2].mean()) if len(triples) else 0.0
+        values = triples[:, 2] - global_mean
+
+        rng = np.random.default_rng(seed)
+        user_factors = rng.normal(scale=0.1, size=(len(user_ids), factors))
+        item_factors = rng.normal(scale=0.1, size=(len(item_ids), factors))
+
+        # Grupowanie ocen po użytkownikach i po filmach (raz, przed iteracjami)
+        by_user = _group(user_rows, item_columns, values, len(user_ids))
+        by_item = _group(item_columns, user_rows, values, len(item_ids))
+
+        for _ in range(iterations):
+            _solve(user_factors, item_factors, by_user, reg)
+            _solve(item_factors, user_factors, by_item, reg)
+
+        return cls(user_ids, item_ids, user_factors, item_factors, global_mean, reg)
+
+    def save(self, directory: str = MF_MODEL_DIR) -> None:
+        """
+        Zapisuje macierze modelu jako pliki .npy w podanym katalogu
+
+        Args:
+            directory: Katalog docelowy
+        """
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, "user_ids.npy"), self.user_ids)
+        np.save(os.path.join(directory, "item_ids.npy"), self.item_ids)
+        np.save(os.path.join(directory, "user_factors.npy"), self.user_factors)
+        np.save(os.path.join(directory, "item_factors.npy"), self.item_factors)
+        np.save(os.path.join(directory, "params.npy"), np.array([self.global_mean, self.reg]))
+
+    @classmethod
+    def load(cls, directory: str = MF_MODEL_DIR) -> "MatrixFactorization":
+        """
+        Wczytuje model z katalogu
+        Macierze czynników są mapowane do pamięci, więc nie są kopiowane przy starcie
+
+        Args:
+            directory: Katalog z plikami modelu
+
+        Returns:
+            MatrixFactorization: Wczytany model lub None w przypadku błędu
+        """
+        try:
+            global_mean, reg = np.load(os.path.join(directory, "params.npy"))
+            return cls(
+                user_ids=np.load(os.path.join(directory, "user_ids.npy")),
+                item_ids=np.load(os.path.join(directory, "item_ids.npy")),
+                user_factors=np.load(os.path.join(directory, "user_factors.npy"), mmap_mode="r"),
+                item_factors=np.load(os.path.join(directory, "item_factors.npy"), mmap_mode="r"),
+                global_mean=float(global_mean),
+                reg=float(reg)
+            )
+        except FileNotFoundError:
+            print(f"Nie znaleziono modelu w katalogu: {directory}")
+            return None
+        except (ValueError, OSError) as e:
+            print(f"Błąd podczas wczytywania modelu: {e}")
+            return None
+
+    def _item_positions(self, movie_ids) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Zamienia ID filmów na pozycje w macierzy czynników
+
+        Args:
+            movie_ids: Lista ID filmów
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Pozycje znanych filmów oraz maska, które ID są znane
+        """
+        movie_ids = np.array([int(movie_id) for movie_id in movie_ids], dtype=np.int64)
+        if len(self.item_ids) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(len(movie_ids), dtype=bool)
+        positions = np.minimum(np.searchsorted(self.item_ids, movie_ids), len(self.item_ids) - 1)
+        known = self.item_ids[positions] == movie_ids
+        return positions[known], known
+
+    def user_vector(self, user_id: int, user_ratings: Dict) -> np.ndarray:
+        """
+        Zwraca wektor czynników użytkownika
+        Użytkownik spoza zbioru treningowego jest dopasowywany do jego obecnych ocen
+
+        Args:
+            user_id: ID użytkownika
+            user_ratings: Słownik {movie_id: rating} z ocenami użytkownika
+
+        Returns:
+            np.ndarray: Wektor czynników lub None, gdy brak danych o użytkowniku
+        """
+        position = np.searchsorted(self.user_ids, user_id)
+        if position < len(self.user_ids) and self.user_ids[position] == user_id:
+            return np.asarray(self.user_factors[position])
+
+        # Dopasowanie nowego użytkownika: jeden krok ALS przy stałych czynnikach filmów
+        positions, known = self._item_positions(user_ratings.keys())
+        if not known.any():
+            return None
+        values = np.array(list(user_ratings.values()), dtype=float)[known] - self.global_mean
+        factors = np.asarray(self.item_factors[positions])
+        gram = factors.T @ factors + self.reg * len(positions) * np.eye(factors.shape[1])
+        return np.linalg.solve(gram, factors.T @ values)
+
+    def recommend(self, user_id: int, user_ratings: Dict, limit: int = 10) -> List[Tuple[int, float]]:
+        """
+        Zwraca filmy z najwyższą przewidywaną oceną, pomijając filmy już ocenione
+
+        Args:
+            user_id: ID użytkownika
+            user_ratings: Słownik {movie_id: rating} z ocenami użytkownika
+            limit: Maksymalna liczba rekomendacji
+
+        Returns:
+            List[Tuple[int, float]]: Lista par (movie_id, przewidywana ocena) malejąco
+        """
+        vector = self.user_vector(user_id, user_ratings)
+        if vector is None:
+            return []
+
+        # Jeden iloczyn skalarny na każdego kandydata
+        scores = self.global_mean + np.asarray(self.item_factors) @ vector
+
+        rated_positions, _ = self._item_positions(user_ratings.keys())
+        scores[rated_positions] = -np.inf
+
+        best = [index for index in top_k(scores, limit) if np.isfinite(scores[index])]
+        return [(int(self.item_ids[index]), float(scores[index])) for index in best]
+
+
+def _group(rows: np.ndarray, columns: np.ndarray, values: np.ndarray, n_rows: int):
+    """
+    Grupuje oceny według wierszy (format CSR)
+
+    Args:
+        rows: Numery wierszy ocen
+        columns: Numery kolumn ocen
+        values: Wartości ocen
+        n_rows: Liczba wierszy
+
+    Returns:
+        tuple: (indptr, columns, values) posortowane według wierszy
+    """
+    order = np.argsort(rows, kind="stable")
+    indptr = np.concatenate(([0], np.cumsum(np.bincount(rows, minlength=n_rows))))
+    return indptr, columns[order], values[order]
+
+
+def _solve(targets: np.ndarray, fixed: np.ndarray, grouped, reg: float) -> None:
+    """
+    Jeden krok ALS: wyznacza na nowo wiersze targets przy stałej macierzy fixed
+
+    Args:
+        targets: Aktualizowana macierz czynników
+        fixed: Macierz czynników drugiej strony (stała w tym kroku)
+        grouped: Oceny pogrupowane według wierszy targets (wynik _group)
+        reg: Współczynnik regularyzacji L2
+    """
+    indptr, columns, values = grouped
+    identity = np.eye(fixed.shape[1])
+
+    for row in range(len(targets)):
+        start, end = indptr[row], indptr[row + 1]
+        if start == end:
+            continue
+        factors = fixed[columns[start:end]]
+        gram = factors.T @ factors + reg * (end - start) * identity
+        targets[row] = np.linalg.solve(gram, factors.T @ values[start:end])
+
+
+if __name__ == "__main__":
+    from models import load_persisted_ratings
+
+    model = MatrixFactorization.train(load_persisted_ratings())
+    model.save()
+    print(f"Zapisano model: {len(model.user_ids)} użytkowników, {len(model.item_ids)} filmów.")
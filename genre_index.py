@@ -0,0 +1,115 @@
+"""
+Moduł odwróconego indeksu gatunków
+
+Zawiera:
+- Klasę GenreIndex mapującą ID gatunku na posortowaną listę ID filmów
+- Wyszukiwanie podobnych filmów jako sumę list z indeksu
+- Liczenie wspólnych gatunków jednym przebiegiem, bez zapytań do API
+"""
+
+import numpy as np
+from typing import Dict, List, Tuple, Optional
+from models import Movie
+
+
+class GenreIndex:
+    """
+    Odwrócony indeks: ID gatunku -> tablica ID filmów z tego gatunku
+    Budowany raz dla znanej puli filmów (np. lokalnego katalogu)
+    """
+
+    def __init__(self, postings: Dict[int, np.ndarray], movie_ids: np.ndarray, ratings: np.ndarray,
+                 movies: Optional[Dict[int, Movie]] = None):
+        """
+        Inicjalizacja indeksu z gotowych tablic
+
+        Args:
+            postings: Słownik {genre_id: posortowana tablica ID filmów}
+            movie_ids: Posortowana tablica ID wszystkich filmów w indeksie
+            ratings: Średnie oceny filmów w kolejności movie_ids
+            movies: Opcjonalny słownik {movie_id: Movie} z obiektami filmów
+        """
+        self.postings = postings
+        self.movie_ids = movie_ids
+        self.ratings = ratings
+        self.movies = movies if movies is not None else {}
+
+    @classmethod
+    def build(cls, movies, keep_movies: bool = True) -> "GenreIndex":
+        """
+        Buduje indeks dla puli filmów
+
+        Args:
+            movies: Lista lub generator obiektów Movie
+            keep_movies: Czy przechowywać obiekty Movie w indeksie
+
+        Returns:
+            GenreIndex: Zbudowany indeks
+        """
+        genre_lists = {}  # Słownik {genre_id: lista ID filmów}
+        ratings = {}  # Słownik {movie_id: średnia ocena}
+        kept = {}
+
+        for movie in movies:
+            ratings[movie.movie_id] = movie.avg_rating or 0.0
+            if keep_movies:
+                kept[movie.movie_id] = movie
+            for genre_id in set(movie.genre_ids):
+                genre_lists.setdefault(genre_id, []).append(movie.movie_id)
+
+        movie_ids = np.array(sorted(ratings), dtype=np.int64)
+        postings = {
+            genre_id: np.unique(np.array(ids, dtype=np.int64))
+            for genre_id, ids in genre_lists.items()
+        }
+        rating_array = np.array([ratings[movie_id] for movie_id in movie_ids.tolist()], dtype=float)
+
+        return cls(postings, movie_ids, rating_array, kept)
+
+    @classmethod
+    def from_catalog(cls, catalog) -> "GenreIndex":
+        """
+        Buduje indeks dla wszystkich filmów z lokalnego katalogu
+        Obiekty filmów nie są przechowywane, tylko ich ID i oceny
+
+        Args:
+            catalog: Obiekt MovieCatalog
+
+        Returns:
+            GenreIndex: Zbudowany indeks
+        """
+        return cls.build(catalog.iter_movies(), keep_movies=False)
+
+    def __len__(self) -> int:
+        """Zwraca liczbę filmów w indeksie"""
+        return len(self.movie_ids)
+
+    def similar_ids(self, genre_ids, limit: int, exclude_id: int = None) -> List[Tuple[int, int]]:
+        """
+        Znajduje filmy o największej liczbie wspólnych gatunków
+        Przy równej liczbie wspólnych gatunków decyduje średnia ocena
+
+        Args:
+            genre_ids: ID gatunków filmu referencyjnego
+            limit: Maksymalna liczba wyników
+            exclude_id: ID filmu pomijanego w wynikach (zwykle filmu referencyjnego)
+
+        Returns:
+            List[Tuple[int, int]]: Lista par (movie_id, liczba wspólnych gatunków)
+        """
+        lists = [self.postings[genre_id] for genre_id in set(genre_ids) if genre_id in self.postings]
+        if not lists:
+            return []
+
+        # Suma list z indeksu - każde wystąpienie filmu to jeden wspólny gatunek
+        candidate_ids, overlaps = np.unique(np.concatenate(lists), return_counts=True)
+
+        if exclude_id is not None:
+            keep = candidate_ids != exclude_id
+            candidate_ids, overlaps = candidate_ids[keep], overlaps[keep]
+
+        ratings = self.ratings[np.searchsorted(self.movie_ids, candidate_ids)]
+
+        # Sortowanie: wspólne gatunki malejąco, ocena malejąco, ID rosnąco
+        order = np.lexsort((candidate_ids, -ratings, -overlaps))[:limit]
+        return list(zip(candidate_ids[order].tolist(), overlaps[order].tolist()))
@@ -7,16 +7,18 @@ Odpowiada za:
 - Integrację wszystkich modułów systemu
 - Integrację algorytmu rekomendacji z interfejsem użytkownika
 """
-from api import search_movies, movie_for_id
+from api import iter_search_movies, movies_for_ids
 from models import User
 from models import Movie
 from recommender import create_recommender
+from catalog import load_catalog
 
 
 class MovieRecomenderApp:
     def __init__(self):
         self.user = User(1, "Kacper")
-        self.recommender = create_recommender(self.user)
+        # Lokalny katalog filmów jest używany, jeśli został wcześniej zaimportowany
+        self.recommender = create_recommender(self.user, catalog=load_catalog())
     
     
     # Funkcje do wyświetalnia menu.
@@ -178,13 +180,8 @@ class MovieRecomenderApp:
             print("Nie masz jeszcze filmów w historii oglądania.")
             return []
         
-        # Znajdź tylko nieocenione filmy z historii
-        unrated_movies = []
-        for movie_id in self.user.user_watch_history:
-            if str(movie_id) not in self.user.user_ratings:  # Konwertuj na string dla porównania
-                movie = movie_for_id(movie_id)
-                if movie:
-                    unrated_movies.append(movie)
+        # Nieocenione filmy są utrzymywane w indeksie historii, pobierane są tylko one
+        unrated_movies = [movie for movie in movies_for_ids(self.user.user_watch_history.unrated()) if movie]
         
         if not unrated_movies:
             print("Wszystkie filmy z historii zostały już ocenione!")
@@ -210,11 +207,7 @@ class MovieRecomenderApp:
             print("Nie oceniłeś jeszcze żadnego filmu.")
             return []
         
-        rated_movies = []
-        for movie_id, rating in self.user.user_ratings.items():
-            movie = movie_for_id(int(movie_id))
-            if movie:
-                rated_movies.append((movie, rating))
+        rated_movies = [(movie, rating) for movie, rating in self.user.iter_rated_movies() if movie]
         
         print(f"Oceniłeś {len(rated_movies)} filmów:\n")
         
@@ -252,9 +245,8 @@ class MovieRecomenderApp:
                         selected_movie = unrated_movies[choice - 1]
                         print(f"\nOceniasz film: {selected_movie.title}")
                         
+                        # Rekomender aktualizuje preferencje automatycznie po dodaniu oceny
                         self.user.rate_movie(selected_movie.movie_id)
-                        # Aktualizuj rekomender po dodaniu oceny
-                        self.recommender = create_recommender(self.user)
                         print("Film został oceniony i usunięty z listy nieocenionych!")
                     else:
                         print("Nieprawidłowy wybór!")
@@ -282,9 +274,8 @@ class MovieRecomenderApp:
                         print(f"\nZmieniasz ocenę filmu: {selected_movie.title}")
                         
                         # Użyj nowej funkcji do zmiany oceny
+                        # Rekomender aktualizuje preferencje automatycznie po zmianie oceny
                         self.user.change_movie_rating(selected_movie.movie_id)
-                        # Aktualizuj rekomender po zmianie oceny
-                        self.recommender = create_recommender(self.user)
                     else:
                         print("Nieprawidłowy wybór!")
                 
@@ -322,13 +313,16 @@ class MovieRecomenderApp:
     # Funkcja do wyszukiwania filmów.
     def handle_movie_serach(self):
         user_movie = self.get_user_input("Podaj nazwę filmu: ", str) # Pobiera od uzytkownika nazwe filmu jako string
-        movies = search_movies(user_movie) # Wykorzystuje funkcję do wyszukiwania filmów, która znajduje się w api.py
+        search_stats = {}
+        # Generator z api.py pobiera tylko tyle wyników, ile zostanie wyświetlonych
+        found_movies = list(iter_search_movies(user_movie, limit=5, stats=search_stats))
         
-        if movies:
-            print(f"\nZnaleziono {len(movies)} filmów, wyświetlam 5 odpowiadających wyszukiwaniu: '{user_movie}'\n")
+        if found_movies:
+            print(f"\nZnaleziono {search_stats.get('total_results', len(found_movies))} filmów, wyświetlam {len(found_movies)} odpowiadających wyszukiwaniu: '{user_movie}'\n")
                     
-            for i, movie_data in enumerate(movies[:5], 1):
-                movie = Movie.from_api_data(movie_data)
+            Movie.hydrate_details(found_movies) # Pobiera szczegóły (czas trwania i zasoby z MOVIE_DETAIL_APPEND) tylko dla wyświetlanych filmów
+                    
+            for i, movie in enumerate(found_movies, 1):
                 print(f"{i}. {movie}")          
             
         else:
@@ -344,7 +338,6 @@ class MovieRecomenderApp:
             if option == 1:
                 self.handle_movie_serach() # Wywołuje funkcję do wyszukiwania filmów.
                 self.handle_movie_menu() # Wywołuje funkcje do obsługi akcji wykonywanych na filmach.
-                self.user.save_user_data() # Zapisuje dane do pliku json.
                     
             elif option == 2:
                 self.user.load_watch_history() # Wyświetla historię obejrzanych filmów.
@@ -364,8 +357,7 @@ class MovieRecomenderApp:
             elif option == 7:
                 self.handle_similar_movies() # Obsługuje wyszukiwanie podobnych filmów
                 
-            elif option == 8: # Zamyka działanie programu
-                self.user.save_user_data()
+            elif option == 8: # Zamyka działanie programu (oceny i historia są zapisywane na bieżąco)
                 print("Do zobaczenie! :)")
                 break
                         
@@ -3,14 +3,28 @@ Moduł definiujący modele danych
 
 Zawiera:
 - Klasę Movie reprezentującą film i jego atrybuty
+- Klasę RatingStore przechowującą oceny w tablicach NumPy z kluczami typu int
+- Klasę WatchHistory przechowującą historię oglądania (uporządkowany zbiór z czasami dodania)
 - Klasę User reprezentującą użytkownika i jego preferencje
 - Metody do zarządzania ocenami filmów
 - Metody do zapisywania i wczytywania danych
 - Mapowanie gatunków filmowych z ID na nazwy polskie
 """
+import itertools
+import time
+import numpy as np
+from collections.abc import MutableMapping
 from api import runtime
 from api import movie_for_id
-import json
+from api import movies_for_ids
+from api import fetch_concurrently
+from api import details_for_ids, APPENDABLE_FIELDS
+from storage import get_storage
+
+# Wersje danych użytkowników {user_id: wersja}, wspólne dla wszystkich obiektów User w procesie
+# Wersja zmienia się przy każdej ocenie i dodaniu do historii - od niej zależą zapisane rekomendacje
+_data_versions = {}
+_version_counter = itertools.count(1)
 
 # Mapowanie ID gatunków z TMDb na polskie nazwy
 GENRE_MAPPING = {
@@ -35,13 +49,23 @@ GENRE_MAPPING = {
     37: "Western"
 }
 
+# Odwrotne mapowanie polskich nazw gatunków na ID z TMDb
+GENRE_IDS = {name: genre_id for genre_id, name in GENRE_MAPPING.items()}
+
+# Bity maski gatunków: każdy znany gatunek ma jeden bit (kolejność jak w GENRE_MAPPING)
+GENRE_BITS = {genre_id: 1 << position for position, genre_id in enumerate(GENRE_MAPPING)}
+
 class Movie:
     """
     Klasa reprezentująca film z jego podstawowymi atrybutami
     Zawiera metody do porównywania filmów i sprawdzania gatunków
     """
     
-    def __init__(self, movie_id: int, title: str, year: int, avg_rating: float, runtime: int, genres: str):
+    # Stały zestaw atrybutów zmniejsza zużycie pamięci przy dużej liczbie filmów
+    __slots__ = ('movie_id', 'title', 'year', 'avg_rating', '_runtime', 'genre_ids', 'genre_mask', '_genres', 'extras')
+    
+    def __init__(self, movie_id: int, title: str, year: int, avg_rating: float, runtime: int, genre_ids: tuple,
+                 extras: dict = None):
         """
         Inicjalizacja obiektu filmu
         
@@ -50,15 +74,88 @@ class Movie:
             title: Tytuł filmu
             year: Rok produkcji filmu
             avg_rating: Średnia ocena filmu z TMDb
-            runtime: Czas trwania filmu w minutach
-            genres: Gatunki filmu jako string oddzielone przecinkami
+            runtime: Czas trwania filmu w minutach (None - pobierany przy pierwszym użyciu)
+            genre_ids: ID gatunków filmu z TMDb
+            extras: Dodatkowe zasoby z TMDb (np. {"credits": ..., "keywords": ...});
+                    None, dopóki żaden zasób nie został pobrany
         """
         self.movie_id = movie_id
         self.title = title
         self.avg_rating = avg_rating
         self.year = year
-        self.runtime = runtime
-        self.genres = genres
+        self._runtime = runtime
+        self.genre_ids = tuple(genre_ids)
+        self._genres = None
+        self.extras = extras or None  # Słownik tworzony tylko dla filmów z pobranymi zasobami
+        
+        # Maska bitowa gatunków do szybkiego porównywania filmów
+        self.genre_mask = 0
+        for genre_id in self.genre_ids:
+            self.genre_mask |= GENRE_BITS.get(genre_id, 0)
+
+    @property
+    def genre_names(self) -> tuple:
+        """
+        Polskie nazwy gatunków filmu
+        
+        Returns:
+            tuple: Nazwy gatunków w kolejności z API ("Nieznany" dla gatunków spoza mapowania)
+        """
+        return tuple(GENRE_MAPPING.get(genre_id, "Nieznany") for genre_id in self.genre_ids)
+
+    @property
+    def genres(self) -> str:
+        """
+        Gatunki filmu jako string oddzielony przecinkami (do wyświetlania)
+        Tworzony przy pierwszym odczycie na podstawie GENRE_MAPPING
+        
+        Returns:
+            str: Nazwy gatunków oddzielone przecinkami
+        """
+        if self._genres is None:
+            self._genres = ', '.join(self.genre_names)
+        return self._genres
+
+    @property
+    def runtime(self) -> int:
+        """
+        Czas trwania filmu w minutach
+        Jeśli nie był znany przy tworzeniu obiektu, jest pobierany z API przy pierwszym odczycie
+        
+        Returns:
+            int: Czas trwania w minutach lub 0 gdy brak danych
+        """
+        if self._runtime is None:
+            self._runtime = runtime(self.movie_id)
+        return self._runtime
+
+    @runtime.setter
+    def runtime(self, value: int) -> None:
+        self._runtime = value
+
+    @property
+    def cast(self) -> tuple:
+        """
+        Aktorzy filmu w kolejności z TMDb (dostępni, gdy pobrano zasób "credits")
+        
+        Returns:
+            tuple: Imiona i nazwiska aktorów
+        """
+        if not self.extras:
+            return ()
+        return tuple(person['name'] for person in self.extras.get('credits', {}).get('cast', []))
+
+    @property
+    def keywords(self) -> tuple:
+        """
+        Słowa kluczowe filmu (dostępne, gdy pobrano zasób "keywords")
+        
+        Returns:
+            tuple: Słowa kluczowe
+        """
+        if not self.extras:
+            return ()
+        return tuple(keyword['name'] for keyword in self.extras.get('keywords', {}).get('keywords', []))
 
     def __str__(self):
         """
@@ -76,7 +173,7 @@ class Movie:
         Returns:
             str: Reprezentacja techniczna obiektu
         """
-        return f"Movie({self.movie_id}, '{self.title}', {self.year}, {self.avg_rating}, '{self.runtime}', '{self.genres}')"
+        return f"Movie({self.movie_id}, '{self.title}', {self.year}, {self.avg_rating}, '{self._runtime}', '{self.genres}')"
 
     @classmethod
     def from_api_data(cls, api_data):
@@ -93,17 +190,9 @@ class Movie:
         release_date = api_data.get('release_date', '')
         year = int(release_date[:4]) if release_date else 0
         
-        movie_id = api_data.get('id', 0)
-        movie_runtime = runtime(movie_id)
-        
-        # Pobieramy gatunki jako string
-        genre_ids = api_data.get('genre_ids', [])
-    
-        if not genre_ids and 'genres' in api_data:
-            genre_ids = [genre['id'] for genre in api_data['genres']]
-        
-        # Mapowanie ID gatunków na polskie nazwy
-        genres = ', '.join(GENRE_MAPPING.get(genre_id, "Nieznany") for genre_id in genre_ids)
+        # Czas trwania jest dostępny tylko w pełnej odpowiedzi /movie/{id}
+        # Dla wyników wyszukiwania zostanie pobrany przy pierwszym odczycie
+        movie_runtime = (api_data.get('runtime') or 0) if 'runtime' in api_data else None
         
         return cls(
             movie_id=api_data.get('id', 0),
@@ -111,20 +200,85 @@ class Movie:
             year=year,
             avg_rating=api_data.get('vote_average', 0.0),
             runtime=movie_runtime,
-            genres=genres
+            genre_ids=cls.genre_ids_from_api_data(api_data),
+            extras={field: api_data[field] for field in APPENDABLE_FIELDS.intersection(api_data)} or None
         )
 
-    def is_in_genres(self, genre: str) -> bool:
+    @staticmethod
+    def genre_ids_from_api_data(api_data) -> list:
+        """
+        Odczytuje ID gatunków z surowych danych API bez tworzenia obiektu Movie
+        Wyniki wyszukiwania zawierają 'genre_ids', a szczegóły filmu listę 'genres'
+        
+        Args:
+            api_data: Słownik z danymi filmu z API
+            
+        Returns:
+            list: Lista ID gatunków
+        """
+        genre_ids = api_data.get('genre_ids', [])
+    
+        if not genre_ids and 'genres' in api_data:
+            genre_ids = [genre['id'] for genre in api_data['genres']]
+        return genre_ids
+
+    @staticmethod
+    def hydrate_runtimes(movies) -> None:
+        """
+        Uzupełnia czas trwania dla listy filmów jednym równoległym przebiegiem
+        Każde ID jest pobierane tylko raz, nawet jeśli występuje na liście wielokrotnie
+        
+        Args:
+            movies: Lista obiektów Movie
+        """
+        # Słownik {movie_id: lista filmów bez znanego czasu trwania}
+        missing = {}
+        for movie in movies:
+            if movie._runtime is None:
+                missing.setdefault(movie.movie_id, []).append(movie)
+        
+        # Równoległe pobranie czasu trwania dla wszystkich brakujących ID
+        runtimes = fetch_concurrently(runtime, missing.keys())
+        
+        for same_movies, movie_runtime in zip(missing.values(), runtimes):
+            for movie in same_movies:
+                movie._runtime = movie_runtime
+
+    @staticmethod
+    def hydrate_details(movies, append=None) -> None:
+        """
+        Uzupełnia czas trwania i dodatkowe zasoby (np. obsadę, słowa kluczowe) dla listy filmów
+        Każdy film to jedno zapytanie z append_to_response, wykonywane równolegle
+        
+        Args:
+            movies: Lista obiektów Movie
+            append: Dodatkowe zasoby (None - ustawienie MOVIE_DETAIL_APPEND z config.py)
+        """
+        movies = list(movies)
+        
+        for movie, details in zip(movies, details_for_ids((movie.movie_id for movie in movies), append)):
+            if not details:
+                continue
+            if movie._runtime is None:
+                movie._runtime = details.get('runtime') or 0
+            fields = APPENDABLE_FIELDS.intersection(details)
+            if fields:
+                if movie.extras is None:
+                    movie.extras = {}
+                movie.extras.update((field, details[field]) for field in fields)
+
+    def is_in_genres(self, genre) -> bool:
         """
         Sprawdza czy film należy do określonego gatunku
         
         Args:
-            genre: Nazwa gatunku do sprawdzenia
+            genre: Nazwa gatunku lub ID gatunku z TMDb
             
         Returns:
             bool: True jeśli film należy do gatunku, False w przeciwnym razie
         """
-        return genre in self.genres      
+        genre_id = GENRE_IDS.get(genre) if isinstance(genre, str) else genre
+        return genre_id in self.genre_ids
     
     def has_similar_genres(self, other_movie):
         """
@@ -136,7 +290,229 @@ class Movie:
         Returns:
             bool: True jeśli filmy mają identyczne gatunki
         """
-        return self.genres.split(', ') == other_movie.genres.split(', ')
+        return set(self.genre_ids) == set(other_movie.genre_ids)
+    
+    def genre_overlap(self, other_movie) -> int:
+        """
+        Liczy wspólne gatunki dwóch filmów jedną operacją AND na maskach bitowych
+        
+        Args:
+            other_movie: Inny obiekt Movie do porównania
+            
+        Returns:
+            int: Liczba wspólnych gatunków
+        """
+        return (self.genre_mask & other_movie.genre_mask).bit_count()
+
+
+class RatingStore(MutableMapping):
+    """
+    Oceny użytkownika przechowywane w parze tablic NumPy (ID filmów i oceny)
+    ze słownikiem {movie_id: pozycja w tablicach}
+    
+    Kluczami zawsze są ID filmów typu int. ID zapisane jako tekst (dawny format JSON)
+    są zamieniane na int, dlatego wyszukiwanie działa tak samo dla 550 i "550".
+    Kolejność ocen jest kolejnością ich dodania.
+    """
+    
+    def __init__(self, ratings=None) -> None:
+        """
+        Inicjalizacja magazynu ocen
+        
+        Args:
+            ratings: Opcjonalny słownik {movie_id: rating} (klucze mogą być tekstem)
+        """
+        self._ids = np.zeros(8, dtype=np.int64)
+        self._values = np.zeros(8, dtype=float)
+        self._index = {}  # Słownik {movie_id: pozycja w tablicach}
+        
+        for movie_id, rating in (ratings or {}).items():
+            try:
+                self[movie_id] = rating
+            except (TypeError, ValueError):
+                print(f"Pominięto nieprawidłową ocenę: {movie_id} -> {rating}")
+    
+    @staticmethod
+    def _key(movie_id) -> int:
+        """Zamienia ID filmu (int lub tekst) na int"""
+        return int(movie_id)
+    
+    def __getitem__(self, movie_id) -> float:
+        try:
+            position = self._index[self._key(movie_id)]
+        except (TypeError, ValueError):
+            raise KeyError(movie_id)
+        return float(self._values[position])
+    
+    def __setitem__(self, movie_id, rating) -> None:
+        movie_id = self._key(movie_id)
+        rating = float(rating)
+        
+        position = self._index.get(movie_id)
+        if position is None:
+            position = len(self._index)
+            # Podwajanie pojemności tablic, gdy się zapełnią
+            if position == len(self._ids):
+                self._ids = np.resize(self._ids, 2 * position)
+                self._values = np.resize(self._values, 2 * position)
+            self._ids[position] = movie_id
+            self._index[movie_id] = position
+        self._values[position] = rating
+    
+    def __delitem__(self, movie_id) -> None:
+        try:
+            position = self._index.pop(self._key(movie_id))
+        except (TypeError, ValueError):
+            raise KeyError(movie_id)
+        
+        # Przesunięcie kolejnych ocen, żeby zachować kolejność dodania
+        size = len(self._index)
+        self._ids[position:size] = self._ids[position + 1:size + 1]
+        self._values[position:size] = self._values[position + 1:size + 1]
+        for moved_id in self._ids[position:size].tolist():
+            self._index[moved_id] -= 1
+    
+    def __contains__(self, movie_id) -> bool:
+        try:
+            return self._key(movie_id) in self._index
+        except (TypeError, ValueError):
+            return False
+    
+    def __iter__(self):
+        return iter(self._index)
+    
+    def __len__(self) -> int:
+        return len(self._index)
+    
+    @property
+    def id_array(self) -> np.ndarray:
+        """Tablica ID ocenionych filmów w kolejności dodania (widok, bez kopiowania)"""
+        return self._ids[:len(self._index)]
+    
+    @property
+    def rating_array(self) -> np.ndarray:
+        """Tablica ocen w kolejności id_array (widok, bez kopiowania)"""
+        return self._values[:len(self._index)]
+    
+    def to_dict(self) -> dict:
+        """Zwraca oceny w formacie zapisu danych {movie_id jako tekst: rating}"""
+        return {str(movie_id): rating for movie_id, rating in zip(self.id_array.tolist(), self.rating_array.tolist())}
+    
+    def __repr__(self):
+        return f"RatingStore({dict(zip(self.id_array.tolist(), self.rating_array.tolist()))})"
+
+
+class WatchHistory:
+    """
+    Historia oglądania jako uporządkowany zbiór ID filmów
+    Sprawdzenie czy film jest w historii działa w czasie O(1), a kolejność dodawania jest zachowana.
+    Dodatkowo utrzymywany jest indeks filmów, które nie zostały jeszcze ocenione.
+    """
+    
+    def __init__(self, movie_ids=(), watched_at: dict = None, rated_ids=()) -> None:
+        """
+        Inicjalizacja historii
+        
+        Args:
+            movie_ids: ID obejrzanych filmów w kolejności dodania
+            watched_at: Słownik {movie_id: czas dodania}, klucze mogą być tekstem
+            rated_ids: ID filmów ocenionych przez użytkownika
+        """
+        watched_at = {int(movie_id): added_at for movie_id, added_at in (watched_at or {}).items()}
+        rated = {int(movie_id) for movie_id in rated_ids}
+        
+        self._watched_at = {}  # Słownik {movie_id: czas dodania}, kolejność kluczy to kolejność historii
+        self._unrated = {}  # Uporządkowany zbiór ID nieocenionych filmów (słownik z wartościami None)
+        
+        for movie_id in movie_ids:
+            movie_id = int(movie_id)
+            if movie_id not in self._watched_at:
+                self._watched_at[movie_id] = watched_at.get(movie_id)
+                if movie_id not in rated:
+                    self._unrated[movie_id] = None
+    
+    def add(self, movie_id, watched_at: float = None, rated: bool = False) -> bool:
+        """
+        Dodaje film na koniec historii
+        
+        Args:
+            movie_id: ID filmu
+            watched_at: Czas dodania (domyślnie bieżący)
+            rated: Czy film jest już oceniony
+            
+        Returns:
+            bool: True jeśli film został dodany, False jeśli już był w historii
+        """
+        movie_id = int(movie_id)
+        if movie_id in self._watched_at:
+            return False
+        self._watched_at[movie_id] = watched_at if watched_at is not None else time.time()
+        if not rated:
+            self._unrated[movie_id] = None
+        return True
+    
+    def mark_rated(self, movie_id) -> None:
+        """
+        Usuwa film z indeksu nieocenionych filmów
+        
+        Args:
+            movie_id: ID ocenionego filmu
+        """
+        self._unrated.pop(int(movie_id), None)
+    
+    def reset_rated(self, rated_ids) -> None:
+        """
+        Odbudowuje indeks nieocenionych filmów po podmianie wszystkich ocen
+        
+        Args:
+            rated_ids: ID filmów ocenionych przez użytkownika
+        """
+        rated = {int(movie_id) for movie_id in rated_ids}
+        self._unrated = {movie_id: None for movie_id in self._watched_at if movie_id not in rated}
+    
+    def unrated(self) -> list:
+        """
+        Zwraca nieocenione filmy z historii bez przeglądania całej historii
+        
+        Returns:
+            list: ID nieocenionych filmów w kolejności dodania do historii
+        """
+        return list(self._unrated)
+    
+    def watched_at(self, movie_id) -> float:
+        """
+        Zwraca czas dodania filmu do historii
+        
+        Args:
+            movie_id: ID filmu
+            
+        Returns:
+            float: Znacznik czasu lub None, gdy nie jest znany (dane w starym formacie)
+        """
+        return self._watched_at.get(int(movie_id))
+    
+    def to_list(self) -> list:
+        """Zwraca ID filmów z historii w kolejności dodania"""
+        return list(self._watched_at)
+    
+    def timestamps(self) -> dict:
+        """Zwraca słownik {movie_id jako tekst: czas dodania} w formacie zapisu danych"""
+        return {str(movie_id): added_at for movie_id, added_at in self._watched_at.items() if added_at is not None}
+    
+    def __contains__(self, movie_id) -> bool:
+        try:
+            return int(movie_id) in self._watched_at
+        except (TypeError, ValueError):
+            return False
+    
+    def __iter__(self):
+        return iter(self._watched_at)
+    
+    def __len__(self) -> int:
+        return len(self._watched_at)
+    
+    def __repr__(self):
+        return f"WatchHistory({self.to_list()})"
 
 
 class User:
@@ -145,68 +521,172 @@ class User:
     Zawiera metody do zarządzania ocenami, historią oglądania i danymi użytkownika
     """
     
-    def __init__(self, user_id: int, user_name: str) -> None:
+    def __init__(self, user_id: int, user_name: str, storage=None) -> None:
         """
         Inicjalizacja użytkownika
         
         Args:
             user_id: Unikalny identyfikator użytkownika
             user_name: Nazwa użytkownika
+            storage: Backend danych użytkowników (domyślnie wybrany w config.py)
         """
         self.user_id = user_id
         self.user_name = user_name
-        self.user_ratings = {}  # Słownik {movie_id: rating}
-        self.user_watch_history = []  # Lista ID obejrzanych filmów
-        self.load_ratings()  # Wczytanie danych przy inicjalizacji
+        self.storage = storage if storage is not None else get_storage()
+        self._rating_listeners = []  # Funkcje wywoływane po zmianie oceny
+        self._change_listeners = []  # Funkcje wywoływane po każdej zmianie danych
+        self.user_watch_history = WatchHistory()  # Obejrzane filmy w kolejności dodania
+        self._set_ratings(RatingStore())  # Oceny {movie_id: rating} z kluczami typu int
+        self._read_user_data()  # Wczytanie samych danych, bez pobierania filmów z API
+        
+    @property
+    def user_ratings(self) -> RatingStore:
+        """Oceny użytkownika"""
+        return self._user_ratings
+    
+    @user_ratings.setter
+    def user_ratings(self, ratings) -> None:
+        # Podmiana wszystkich ocen z zewnątrz unieważnia rekomendacje i wymaga ponownej analizy preferencji
+        self._set_ratings(ratings)
+        self._mark_changed(ratings_replaced=True)
+        
+    def _set_ratings(self, ratings) -> None:
+        # Przypisanie zwykłego słownika (np. ze starego pliku JSON) zamienia go na RatingStore
+        self._user_ratings = ratings if isinstance(ratings, RatingStore) else RatingStore(ratings)
+        # Indeks nieocenionych filmów w historii musi odpowiadać nowym ocenom
+        self.user_watch_history.reset_rated(self._user_ratings)
+        
+    def add_rating_listener(self, listener) -> None:
+        """
+        Rejestruje funkcję wywoływaną po dodaniu lub zmianie oceny
+        
+        Args:
+            listener: Funkcja przyjmująca (movie_id, stara_ocena, nowa_ocena),
+                      stara ocena to None dla nowo ocenionego filmu
+        """
+        self._rating_listeners.append(listener)
+        
+    def remove_rating_listener(self, listener) -> None:
+        """
+        Wyrejestrowuje funkcję dodaną przez add_rating_listener
+        
+        Args:
+            listener: Wcześniej zarejestrowana funkcja
+        """
+        if listener in self._rating_listeners:
+            self._rating_listeners.remove(listener)
+        
+    def _notify_rating_changed(self, movie_id, old_rating, new_rating) -> None:
+        """
+        Powiadamia zarejestrowane funkcje o zmianie oceny
+        """
+        for listener in self._rating_listeners:
+            listener(movie_id, old_rating, new_rating)
+        self._mark_changed()
+        
+    @property
+    def data_version(self) -> int:
+        """Wersja ocen i historii oglądania użytkownika (0 - brak zmian od uruchomienia)"""
+        return _data_versions.get(self.user_id, 0)
+        
+    def add_change_listener(self, listener) -> None:
+        """
+        Rejestruje funkcję wywoływaną po zmianie ocen lub historii oglądania
+        
+        Args:
+            listener: Funkcja przyjmująca (użytkownik, ratings_replaced), gdzie ratings_replaced
+                      oznacza podmianę wszystkich ocen (a nie zmianę jednej oceny lub historii)
+        """
+        self._change_listeners.append(listener)
+        
+    def remove_change_listener(self, listener) -> None:
+        """
+        Wyrejestrowuje funkcję dodaną przez add_change_listener
+        
+        Args:
+            listener: Wcześniej zarejestrowana funkcja
+        """
+        if listener in self._change_listeners:
+            self._change_listeners.remove(listener)
+        
+    def _mark_changed(self, ratings_replaced: bool = False) -> None:
+        """
+        Podnosi wersję danych użytkownika i powiadamia zarejestrowane funkcje
+        
+        Args:
+            ratings_replaced: Czy wszystkie oceny zostały podmienione (przypisanie lub ponowne wczytanie)
+        """
+        _data_versions[self.user_id] = next(_version_counter)
+        for listener in self._change_listeners:
+            listener(self, ratings_replaced)
         
     def save_user_data(self):
         """
-        Zapisuje dane użytkownika do pliku JSON
-        Obsługuje błędy serializacji i zapisu
+        Zapisuje wszystkie dane użytkownika w backendzie danych
+        Obsługuje błędy zapisu
         """
         try:
             user_data = {
                 "user_id": self.user_id,
                 "user_name": self.user_name,
-                "ratings": self.user_ratings,
-                "watch_history": self.user_watch_history
+                "ratings": self.user_ratings.to_dict(),
+                "watch_history": self.user_watch_history.to_list(),
+                "watched_at": self.user_watch_history.timestamps()
             }
 
-            with open("user_data.json","w") as f:
-                json.dump(user_data, f)
+            self.storage.save_user(user_data)
                 
             print("Zapisano dane.")
-        except TypeError as e:
-            print(f"Błąd podczas serializacji danych do JSON: {e}")
+        except (TypeError, ValueError) as e:
+            print(f"Błąd podczas zapisu danych: {e}")
         except Exception as e:
             print(f"Nieoczekiwany błąd: {e}")
 
     def load_user_data(self):
         """
-        Wczytuje dane użytkownika z pliku JSON
-        Obsługuje błędy odczytu i dekodowania
+        Ponownie wczytuje dane użytkownika o tym ID z backendu danych
+        Wczytane oceny i historia zastępują obecne, więc wersja danych jest podnoszona
+        
+        Returns:
+            dict: Dane użytkownika lub None w przypadku błędu
+        """
+        user_data = self._read_user_data()
+        if user_data is not None:
+            self._mark_changed(ratings_replaced=True)
+        return user_data
+
+    def _read_user_data(self):
+        """
+        Wczytuje dane użytkownika o tym ID z backendu danych bez zmiany wersji danych
+        Obsługuje błędy odczytu
         
         Returns:
             dict: Dane użytkownika lub None w przypadku błędu
         """
         try:
-            with open("user_data.json","r") as f:
-                user_data = json.load(f)
+            user_data = self.storage.load_user(self.user_id)
+            if user_data is None:
+                print(f"Nie znaleziono zapisanych danych użytkownika o ID {self.user_id}.")
+                return None
             
-            self.user_id = user_data["user_id"]
             self.user_name = user_data["user_name"]
-            self.user_ratings = user_data["ratings"]
-            self.user_watch_history = user_data["watch_history"]
-        except FileNotFoundError:
-            print(f"Plik nie istnieje: {'user_data.json'}")
-            return None
-        except json.JSONDecodeError as e:
-            print(f"Błąd podczas dekodowania JSON: {e}")
-            return None
+            self.user_watch_history = WatchHistory(user_data["watch_history"], user_data.get("watched_at"))
+            self._set_ratings(user_data["ratings"])
+            return user_data
         except Exception as e:
             print(f"Nieoczekiwany błąd: {e}")
             return None
 
+    def _save_rating(self, movie_id, rating) -> None:
+        """
+        Zapisuje w backendzie tylko jedną, zmienioną ocenę
+        """
+        try:
+            self.storage.save_rating(self.user_id, self.user_name, int(movie_id), rating)
+            print("Zapisano dane.")
+        except Exception as e:
+            print(f"Nieoczekiwany błąd: {e}")
+
     def rate_movie(self, movie_id):
         """
         Pozwala użytkownikowi ocenić film
@@ -228,9 +708,11 @@ class User:
                 if not (1 <= user_rate <= 10) :
                     print(f"\nOcena {user_rate} jest nieprawidłowa.")
                 else:
-                    # Konwertuj movie_id na string dla zapisu w user_ratings
-                    self.user_ratings[str(movie_id)] = user_rate
-                    self.save_user_data()
+                    old_rating = self.user_ratings.get(movie_id)
+                    self.user_ratings[movie_id] = user_rate
+                    self._save_rating(movie_id, user_rate)
+                    self.user_watch_history.mark_rated(movie_id)
+                    self._notify_rating_changed(movie_id, old_rating, user_rate)
                     return f"\nOcena {user_rate} została dodana."
             except ValueError:
                 return "\nNieprawidłowy znak, zeby ocenic wpisz cyfre."
@@ -245,14 +727,11 @@ class User:
         Returns:
             str: Komunikat o wyniku zmiany oceny
         """
-        # Konwertuj movie_id na string dla porównania z user_ratings
-        movie_id_str = str(movie_id)
-        
-        if movie_id_str not in self.user_ratings:
+        if movie_id not in self.user_ratings:
             print("Ten film nie został jeszcze oceniony!")
             return
         
-        current_rating = self.user_ratings[movie_id_str]
+        current_rating = self.user_ratings[movie_id]
         
         while True:
             try:
@@ -261,8 +740,9 @@ class User:
                 if not (1 <= new_rating <= 10):
                     print(f"\nOcena {new_rating} jest nieprawidłowa.")
                 else:
-                    self.user_ratings[movie_id_str] = new_rating
-                    self.save_user_data()
+                    self.user_ratings[movie_id] = new_rating
+                    self._save_rating(movie_id, new_rating)
+                    self._notify_rating_changed(movie_id, current_rating, new_rating)
                     return f"\nOcena została zmieniona z {current_rating} na {new_rating}."
             except ValueError:
                 return "\nNieprawidłowy znak, żeby ocenić wpisz cyfrę."
@@ -283,21 +763,75 @@ class User:
             return "Film nie został jeszcze przez ciebie oceniony."
         
         
-    def load_ratings(self):
+    def iter_rated_movies(self, page_size: int = 20):
+        """
+        Generator zwracający ocenione filmy stronami
+        Filmy z jednej strony są pobierane z API równolegle dopiero wtedy,
+        gdy wywołujący dojdzie do tej strony
+        
+        Args:
+            page_size: Liczba filmów pobieranych naraz
+            
+        Yields:
+            Tuple[Movie, float]: Film (lub None, gdy nie udało się go pobrać) i ocena użytkownika
+        """
+        # Kopia tablic, żeby zmiana ocen w trakcie przeglądania nie zaburzyła stron
+        movie_ids = self.user_ratings.id_array.tolist()
+        ratings = self.user_ratings.rating_array.tolist()
+        
+        for start in range(0, len(movie_ids), page_size):
+            page = movies_for_ids(movie_ids[start:start + page_size])
+            yield from zip(page, ratings[start:start + page_size])
+    
+    def iter_watched_movies(self, page_size: int = 20):
+        """
+        Generator zwracający filmy z historii oglądania stronami
+        
+        Args:
+            page_size: Liczba filmów pobieranych naraz
+            
+        Yields:
+            Movie: Film z historii (lub None, gdy nie udało się go pobrać)
+        """
+        movie_ids = self.user_watch_history.to_list()
+        
+        for start in range(0, len(movie_ids), page_size):
+            yield from movies_for_ids(movie_ids[start:start + page_size])
+    
+    @staticmethod
+    def _show_more(position: int, total: int, page_size: int) -> bool:
+        """
+        Po każdej pełnej stronie pyta, czy wyświetlić kolejną
+        
+        Returns:
+            bool: False jeśli użytkownik chce przerwać wyświetlanie
+        """
+        if position % page_size or position >= total:
+            return True
+        answer = input(f"\nWyświetlono {position} z {total}. Enter - kolejna strona, q - powrót: ")
+        return answer.strip().lower() != "q"
+        
+    def load_ratings(self, page_size: int = 20):
         """
-        Wczytuje i wyświetla wszystkie oceny użytkownika
+        Wyświetla oceny użytkownika stronami
         Pokazuje szczegółowe informacje o ocenionych filmach
+        
+        Args:
+            page_size: Liczba filmów na stronie
         """
-        self.load_user_data()
         print("\nTwoje oceny filmów:\n")
         
         if not self.user_ratings:
             print("\nNie oceniono jeszcze zadnego filmu.")
             
-        for i, rate_id in enumerate(self.user_ratings, 1):            
-            movie = movie_for_id(rate_id)
-            user_rating = self.user_ratings[rate_id]
-            print(f"{i}. {movie.title} ({movie.year}) - twoja ocena: {user_rating}/10 \nŚrednia ocena filmu to: {movie.avg_rating}\n")
+        total = len(self.user_ratings)
+        for i, (movie, user_rating) in enumerate(self.iter_rated_movies(page_size), 1):
+            if movie:
+                print(f"{i}. {movie.title} ({movie.year}) - twoja ocena: {user_rating}/10 \nŚrednia ocena filmu to: {movie.avg_rating}\n")
+            else:
+                print(f"{i}. Brak danych filmu - twoja ocena: {user_rating}/10\n")
+            if not self._show_more(i, total, page_size):
+                break
         
         
     def add_to_history(self, movie_id):
@@ -310,29 +844,51 @@ class User:
         """
         try:
             
-            if movie_id not in self.user_watch_history:
-                self.user_watch_history.append(movie_id)
-                self.save_user_data()
+            if self.user_watch_history.add(movie_id, rated=movie_id in self.user_ratings):
+                self.storage.add_to_history(
+                    self.user_id, self.user_name, movie_id, self.user_watch_history.watched_at(movie_id)
+                )
+                self._mark_changed()
                 print("Dodano film do historii oglądania.")
             else:
                 print("Taki film jest juz w historii oglądania.")
-        except TypeError as e:
-            print(f"Błąd podczas serializacji danych do JSON: {e}")
+        except (TypeError, ValueError) as e:
+            print(f"Błąd podczas zapisu historii oglądania: {e}")
         except Exception as e:
             print(f"Nieoczekiwany błąd: {e}")
 
-    def load_watch_history(self):
+    def load_watch_history(self, page_size: int = 20):
         """
-        Wczytuje i wyświetla historię oglądania użytkownika
+        Wyświetla historię oglądania użytkownika stronami
         Pokazuje szczegółowe informacje o obejrzanych filmach
+        
+        Args:
+            page_size: Liczba filmów na stronie
         """
-        self.load_user_data()
         print("\nLista obejrzanych filmów:\n")   
         
         if not self.user_watch_history:
             print("Nie ma jeszcze filmów w historii oglądania.")
             return 
         
-        for i, movie_id in enumerate(self.user_watch_history, 1):        
-            movie = movie_for_id(movie_id)
-            print(f"{i}. {movie}")
\ No newline at end of file
+        total = len(self.user_watch_history)
+        for i, movie in enumerate(self.iter_watched_movies(page_size), 1):
+            print(f"{i}. {movie if movie else 'Brak danych filmu'}")
+            if not self._show_more(i, total, page_size):
+                break
+
+
+def load_persisted_ratings():
+    """
+    Generator zwracający zapisane oceny wszystkich użytkowników
+    Dane służą do trenowania modeli rekomendacji (filtrowanie kolaboratywne, faktoryzacja)
+    
+    Yields:
+        tuple: Trójka (user_id, movie_id, rating)
+    """
+    try:
+        for user_id, movie_id, rating in get_storage().iter_all_ratings():
+            yield int(user_id), int(movie_id), float(rating)
+    except Exception as e:
+        print(f"Błąd podczas wczytywania ocen: {e}")
+        return
@@ -0,0 +1,112 @@
+"""
+Moduł ograniczania liczby zapytań do API
+
+Zawiera:
+- Klasę TokenBucket (wiadro żetonów) wspólną dla kodu synchronicznego i asynchronicznego
+- Odczyt nagłówka Retry-After z odpowiedzi HTTP
+- Obliczanie czasu oczekiwania przed ponowieniem zapytania (wykładniczy backoff z losowym rozrzutem)
+
+TokenBucket nie usypia wątku sam - metoda reserve zwraca czas, który wywołujący
+musi odczekać (time.sleep w api.py, asyncio.sleep w async_api.py).
+"""
+
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from config import HTTP_BACKOFF_BASE, HTTP_BACKOFF_MAX
+
+
+class TokenBucket:
+    """
+    Ogranicznik liczby zapytań metodą wiadra żetonów
+    Wiadro napełnia się w tempie rate żetonów na sekundę, do pojemności capacity.
+    Każde zapytanie zużywa jeden żeton; gdy żetonów brakuje, zapytanie czeka na swoją kolej.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        """
+        Args:
+            rate: Liczba zapytań na sekundę
+            capacity: Maksymalna liczba zapytań wysłanych naraz (po okresie bezczynności)
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: int = 1) -> float:
+        """
+        Rezerwuje żetony dla zapytania
+
+        Args:
+            tokens: Liczba potrzebnych żetonów
+
+        Returns:
+            float: Czas w sekundach, który trzeba odczekać przed wysłaniem zapytania
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+            # Żetony mogą spaść poniżej zera - kolejne zapytania ustawiają się w kolejce
+            self.tokens -= tokens
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            return max(wait, self.blocked_until - now)
+
+    def pause(self, seconds: float) -> None:
+        """
+        Wstrzymuje wszystkie zapytania na podany czas (np. po odpowiedzi 429 z Retry-After)
+
+        Args:
+            seconds: Czas wstrzymania w sekundach
+        """
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+def parse_retry_after(value) -> float:
+    """
+    Odczytuje nagłówek Retry-After (liczba sekund lub data HTTP)
+
+    Args:
+        value: Wartość nagłówka lub None
+
+    Returns:
+        float: Liczba sekund do odczekania lub None, gdy nagłówka brak lub jest nieprawidłowy
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def backoff_delay(attempt: int, retry_after: float = None) -> float:
+    """
+    Zwraca czas oczekiwania przed kolejną próbą zapytania
+    Gdy serwer podał Retry-After, czekamy tyle, ile podał. W przeciwnym razie
+    czas rośnie wykładniczo, a losowy rozrzut rozkłada ponowienia wielu wątków w czasie.
+
+    Args:
+        attempt: Numer nieudanej próby (od 0)
+        retry_after: Czas z nagłówka Retry-After lub None
+
+    Returns:
+        float: Czas oczekiwania w sekundach
+    """
+    if retry_after is not None:
+        return min(retry_after, HTTP_BACKOFF_MAX) + random.uniform(0, HTTP_BACKOFF_BASE)
+    return random.uniform(0, min(HTTP_BACKOFF_MAX, HTTP_BACKOFF_BASE * 2 ** attempt))
@@ -7,13 +7,104 @@ Odpowiada za:
 - Generowanie rekomendacji na podstawie preferencji użytkownika
 - Wykorzystanie generatorów i list składanych do filtrowania filmów
 - Implementację algorytmów rekomendacji z wykorzystaniem numpy
+- Przechowywanie gotowych rekomendacji do czasu zmiany ocen lub historii użytkownika
 """
 
+import asyncio
+import os
+import threading
 import numpy as np
 from collections import Counter
 from typing import List, Dict, Tuple, Generator
-from models import User, Movie
-from api import search_movies, movie_for_id
+from models import User, Movie, GENRE_IDS
+from api import iter_pages, movie_for_id, movies_for_ids, fetch_concurrently
+from scoring import score_movies, top_k
+from catalog import MovieCatalog
+from genre_index import GenreIndex
+from collaborative import ItemItemCF
+from factorization import MatrixFactorization
+from ann import LSHIndex, movie_features
+from cache import RecommendationCache
+from config import RECOMMENDATION_BACKGROUND_REFRESH, CF_MODEL_FILE, ANN_INDEX_FILE
+
+# Wspólna pamięć gotowych rekomendacji wszystkich rekomenderów w procesie
+recommendation_cache = RecommendationCache()
+
+
+def _running_loop():
+    """
+    Zwraca pętlę zdarzeń działającą w bieżącym wątku
+    
+    Returns:
+        asyncio.AbstractEventLoop: Działająca pętla lub None poza pętlą zdarzeń
+    """
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+class GenrePreferences:
+    """
+    Przyrostowy model preferencji gatunkowych użytkownika
+    Przechowuje sumy i liczby ocen dla każdego gatunku, dzięki czemu
+    nowa lub zmieniona ocena aktualizuje tylko gatunki danego filmu
+    """
+    
+    def __init__(self):
+        """
+        Inicjalizacja pustego modelu preferencji
+        """
+        self.genre_sums = {}  # Słownik {gatunek: suma ocen}
+        self.genre_counts = {}  # Słownik {gatunek: liczba ocen}
+        self.movie_genres = {}  # Słownik {movie_id: gatunki ocenionego filmu}
+    
+    def add_rating(self, genres: List[str], rating: float) -> None:
+        """
+        Dodaje ocenę filmu do sum wszystkich jego gatunków
+        Gatunki spoza GENRE_MAPPING ("Nieznany") są pomijane - nie da się po nich wyszukać
+        kandydatów, a score_movies nie ma dla nich kolumny
+        
+        Args:
+            genres: Lista gatunków filmu
+            rating: Ocena użytkownika
+        """
+        for genre in genres:
+            if genre not in GENRE_IDS:
+                continue
+            self.genre_sums[genre] = self.genre_sums.get(genre, 0.0) + rating
+            self.genre_counts[genre] = self.genre_counts.get(genre, 0) + 1
+    
+    def remove_rating(self, genres: List[str], rating: float) -> None:
+        """
+        Odejmuje ocenę filmu od sum wszystkich jego gatunków
+        
+        Args:
+            genres: Lista gatunków filmu
+            rating: Poprzednia ocena użytkownika
+        """
+        for genre in genres:
+            if genre not in self.genre_counts:
+                continue
+            self.genre_counts[genre] -= 1
+            self.genre_sums[genre] -= rating
+            
+            # Gatunek bez ocen znika z modelu
+            if self.genre_counts[genre] == 0:
+                del self.genre_counts[genre]
+                del self.genre_sums[genre]
+    
+    def weight(self, genre: str) -> float:
+        """
+        Zwraca średnią ocenę gatunku
+        
+        Args:
+            genre: Nazwa gatunku
+            
+        Returns:
+            float: Średnia ocena filmów z gatunku
+        """
+        return self.genre_sums[genre] / self.genre_counts[genre]
 
 
 class MovieRecommender:
@@ -22,17 +113,74 @@ class MovieRecommender:
     wykorzystująca algorytmy oparte na preferencjach użytkownika
     """
     
-    def __init__(self, user: User):
+    cache_kind = "genre"  # Część klucza w pamięci rekomendacji, odróżnia rodzaje rekomenderów
+    
+    def __init__(self, user: User, catalog: MovieCatalog = None, genre_index: GenreIndex = None,
+                 cf_model: ItemItemCF = None, ann_index: LSHIndex = None,
+                 cache: RecommendationCache = None, background_refresh: bool = None, analyze: bool = True):
         """
         Inicjalizacja systemu rekomendacji
+        Rekomender nasłuchuje zmian ocen użytkownika i na bieżąco aktualizuje preferencje.
+        Analiza ocen pobiera brakujące filmy synchronicznie z API - w aplikacjach asyncio
+        rekomender należy tworzyć przez create_async, żeby nie blokować pętli zdarzeń.
         
         Args:
             user: Obiekt użytkownika z ocenami i historią oglądania
+            catalog: Lokalny katalog filmów; jeśli podany, kandydaci są pobierani z niego zamiast z API
+            genre_index: Odwrócony indeks gatunków do wyszukiwania podobnych filmów
+            cf_model: Model filtrowania kolaboratywnego item-item
+            ann_index: Indeks ANN do wyszukiwania podobnych filmów po wektorach cech
+            cache: Pamięć gotowych rekomendacji (domyślnie wspólna dla modułu)
+            background_refresh: Czy po zmianie danych przeliczać rekomendacje w tle
+                                (None - ustawienie RECOMMENDATION_BACKGROUND_REFRESH z config.py)
+            analyze: Czy od razu przeanalizować oceny użytkownika (False - analizę wykonuje wywołujący)
         """
         self.user = user
+        self.catalog = catalog
+        self.genre_index = genre_index
+        self.cf_model = cf_model
+        self.ann_index = ann_index
         self.genre_weights = {}
         self.favorite_genres = []
-        self._analyze_user_preferences()
+        self.preferences = GenrePreferences()
+        self.last_candidate_stats = {}  # Koszt ostatniego budowania kandydatów
+        self.cache = cache if cache is not None else recommendation_cache
+        self.background_refresh = (RECOMMENDATION_BACKGROUND_REFRESH if background_refresh is None
+                                   else background_refresh)
+        self._cached_limits = set()  # Limity, o które pytano - tylko je warto przeliczać w tle
+        self._pending_movies = set()  # Ocenione filmy pobierane w tle w pętli zdarzeń
+        self._pending_tasks = set()  # Zadania asyncio uzupełniające preferencje
+        if analyze:
+            self._analyze_user_preferences()
+        self.user.add_rating_listener(self._on_rating_changed)
+        self.user.add_change_listener(self._on_user_changed)
+    
+    @classmethod
+    async def create_async(cls, user: User, *args, **kwargs) -> "MovieRecommender":
+        """
+        Tworzy rekomender w aplikacji asyncio
+        Oceny użytkownika są analizowane na filmach pobranych przez async_api, bez blokowania pętli zdarzeń
+        
+        Args:
+            user: Obiekt użytkownika z ocenami i historią oglądania
+            *args, **kwargs: Pozostałe argumenty konstruktora
+            
+        Returns:
+            MovieRecommender: Instancja systemu rekomendacji z przeanalizowanymi preferencjami
+        """
+        recommender = cls(user, *args, analyze=False, **kwargs)
+        await recommender._analyze_user_preferences_async()
+        return recommender
+    
+    def close(self) -> None:
+        """
+        Odłącza rekomender od użytkownika
+        Po wywołaniu rekomender nie aktualizuje preferencji ani nie przelicza rekomendacji w tle,
+        a użytkownik nie przechowuje już odwołań do niego
+        """
+        self.background_refresh = False
+        self.user.remove_rating_listener(self._on_rating_changed)
+        self.user.remove_change_listener(self._on_user_changed)
     
     def _analyze_user_preferences(self) -> None:
         """
@@ -42,41 +190,218 @@ class MovieRecommender:
         if not self.user.user_ratings:
             return
             
-        # Lista składana do wyodrębnienia gatunków z ocenionych filmów
-        rated_movies_genres = [
-            movie_for_id(movie_id).genres.split(', ')
-            for movie_id in self.user.user_ratings.keys()
-            if movie_for_id(movie_id) is not None
-        ]
+        # Jednorazowe pobranie wszystkich ocenionych filmów (z katalogu, a brakujących równolegle z API)
+        movie_ids = list(self.user.user_ratings)
+        self._apply_rated_movies(movie_ids, self._movies_for_ids(movie_ids))
+    
+    async def _analyze_user_preferences_async(self) -> None:
+        """
+        Asynchroniczna wersja _analyze_user_preferences
+        Wynik jest odrzucany, jeśli w trakcie pobierania preferencje zostały zresetowane
+        """
+        if not self.user.user_ratings:
+            return
         
-        # Generator do przetwarzania gatunków z ocenami
-        def genre_rating_generator():
-            for movie_id, rating in self.user.user_ratings.items():
-                movie = movie_for_id(movie_id)
-                if movie and movie.genres:
-                    for genre in movie.genres.split(', '):
-                        yield genre.strip(), rating
-        
-        # Obliczanie wag gatunków na podstawie ocen
-        genre_scores = {}
-        for genre, rating in genre_rating_generator():
-            if genre not in genre_scores:
-                genre_scores[genre] = []
-            genre_scores[genre].append(rating)
+        preferences = self.preferences
+        movie_ids = list(self.user.user_ratings)
+        movies = await self._movies_for_ids_async(movie_ids)
+        if self.preferences is preferences:
+            self._apply_rated_movies(movie_ids, movies)
+            self.cache.invalidate(self.user.user_id)
+    
+    def _apply_rated_movies(self, movie_ids: List[int], movies: List[Movie]) -> None:
+        """
+        Zasila model preferencji gatunkami ocenionych filmów
+        Każdy film jest dodawany tylko raz, z oceną aktualną w chwili dodania - filmy już obecne
+        w modelu zostały uwzględnione wcześniej, a ich późniejsze zmiany obsługuje _on_rating_changed
+        
+        Args:
+            movie_ids: Lista ID ocenionych filmów
+            movies: Obiekty Movie (lub None) w kolejności ID
+        """
+        ratings = self.user.user_ratings
+        for movie_id, movie in zip(movie_ids, movies):
+            if not movie or not movie.genre_ids or movie_id in self.preferences.movie_genres:
+                continue
+            rating = ratings.get(movie_id)
+            if rating is None:
+                continue
+            genres = movie.genre_names
+            self.preferences.movie_genres[movie_id] = genres
+            self.preferences.add_rating(genres, rating)
         
         # Lista składana do obliczania średnich ocen dla gatunków
         self.genre_weights = {
-            genre: np.mean(scores) 
-            for genre, scores in genre_scores.items()
+            genre: self.preferences.weight(genre)
+            for genre in self.preferences.genre_counts
         }
         
-        # Sortowanie gatunków według preferencji
+        self._sort_favorite_genres()
+    
+    def _reset_preferences(self) -> None:
+        """
+        Odrzuca model preferencji i analizuje wszystkie oceny użytkownika od nowa
+        W pętli zdarzeń analiza jest wykonywana jako zadanie asyncio
+        """
+        self.preferences = GenrePreferences()
+        self.genre_weights = {}
+        self.favorite_genres = []
+        self._pending_movies.clear()
+        
+        loop = _running_loop()
+        if loop is not None:
+            self._schedule(loop, self._analyze_user_preferences_async())
+        else:
+            self._analyze_user_preferences()
+    
+    def _schedule(self, loop, coroutine) -> None:
+        """
+        Uruchamia zadanie asyncio i przechowuje do niego odwołanie do czasu zakończenia
+        
+        Args:
+            loop: Działająca pętla zdarzeń
+            coroutine: Korutyna do wykonania
+        """
+        task = loop.create_task(coroutine)
+        self._pending_tasks.add(task)
+        task.add_done_callback(self._pending_tasks.discard)
+    
+    async def _load_rated_movie_async(self, movie_id: int) -> None:
+        """
+        Pobiera nowo oceniony film przez async_api i dodaje jego aktualną ocenę do preferencji
+        
+        Args:
+            movie_id: ID ocenionego filmu
+        """
+        preferences = self.preferences
+        try:
+            movie = (await self._movies_for_ids_async([movie_id]))[0]
+        finally:
+            self._pending_movies.discard(movie_id)
+        
+        if self.preferences is preferences:
+            self._apply_rated_movies([movie_id], [movie])
+            self.cache.invalidate(self.user.user_id)
+    
+    def _sort_favorite_genres(self) -> None:
+        """
+        Sortuje gatunki według preferencji
+        """
         self.favorite_genres = sorted(
             self.genre_weights.keys(),
             key=lambda x: self.genre_weights[x],
             reverse=True
         )
     
+    def _on_rating_changed(self, movie_id, old_rating, new_rating) -> None:
+        """
+        Aktualizuje preferencje po dodaniu lub zmianie oceny filmu
+        Przelicza tylko gatunki ocenionego filmu, bez ponownej analizy wszystkich ocen
+        
+        Args:
+            movie_id: ID ocenionego filmu
+            old_rating: Poprzednia ocena lub None dla nowej oceny
+            new_rating: Nowa ocena
+        """
+        key = int(movie_id)
+        genres = self.preferences.movie_genres.get(key)
+        
+        # Gatunki nowo ocenionego filmu są pobierane tylko raz
+        if genres is None:
+            movie = self._local_movie(key)
+            if movie is None:
+                # W pętli zdarzeń film jest pobierany w tle; zadanie doda ocenę aktualną
+                # w chwili zakończenia, więc kolejne zmiany oceny tego filmu nie są potrzebne
+                loop = _running_loop()
+                if loop is not None:
+                    if key not in self._pending_movies:
+                        self._pending_movies.add(key)
+                        self._schedule(loop, self._load_rated_movie_async(key))
+                    return
+                movie = movie_for_id(key)
+            if not movie or not movie.genre_ids:
+                return
+            genres = movie.genre_names
+            self.preferences.movie_genres[key] = genres
+            old_rating = None
+        
+        if old_rating is not None:
+            self.preferences.remove_rating(genres, old_rating)
+        self.preferences.add_rating(genres, new_rating)
+        
+        # Aktualizacja wag tylko dla gatunków tego filmu
+        for genre in genres:
+            if genre in self.preferences.genre_counts:
+                self.genre_weights[genre] = self.preferences.weight(genre)
+            else:
+                self.genre_weights.pop(genre, None)
+        
+        self._sort_favorite_genres()
+    
+    def _on_user_changed(self, user: User, ratings_replaced: bool = False) -> None:
+        """
+        Usuwa zapisane rekomendacje po zmianie ocen lub historii użytkownika
+        Wywoływana po _on_rating_changed, więc przeliczenie w tle korzysta już z nowych wag.
+        Po podmianie wszystkich ocen preferencje są analizowane od nowa.
+        
+        Args:
+            user: Użytkownik, którego dane się zmieniły
+            ratings_replaced: Czy wszystkie oceny zostały podmienione
+        """
+        if ratings_replaced:
+            self._reset_preferences()
+        
+        self.cache.invalidate(user.user_id)
+        
+        if self.background_refresh and self._cached_limits:
+            threading.Thread(
+                target=self._refresh_recommendations,
+                args=(sorted(self._cached_limits),),
+                daemon=True
+            ).start()
+    
+    def _refresh_recommendations(self, limits: List[int]) -> None:
+        """
+        Przelicza rekomendacje w tle i zapisuje je dla bieżącej wersji danych użytkownika
+        Przerywa pracę, jeśli w międzyczasie dane znów się zmieniły
+        
+        Args:
+            limits: Limity rekomendacji do przeliczenia
+        """
+        version = self.user.data_version
+        for limit in limits:
+            if self.user.data_version != version:
+                return
+            recommendations = self._compute_recommendations(limit)
+            if self._is_cacheable(recommendations):
+                self.cache.set(self._cache_key(limit), version, recommendations)
+    
+    def _is_cacheable(self, recommendations: List[Tuple[Movie, float]]) -> bool:
+        """
+        Sprawdza, czy świeżo obliczony wynik można zapisać w pamięci rekomendacji
+        Pusty wynik lub wynik zbudowany mimo nieudanych zapytań do API (limit, błąd serwera,
+        brak połączenia) jest liczony od nowa przy następnym wywołaniu, zamiast być zwracany przez cały TTL
+        
+        Args:
+            recommendations: Wynik _compute_recommendations
+            
+        Returns:
+            bool: True jeśli wynik jest kompletny
+        """
+        return bool(recommendations) and not self.last_candidate_stats.get('failed')
+    
+    def _cache_sources(self) -> tuple:
+        """Źródła danych, od których zależy wynik get_recommendations"""
+        return (self.catalog,)
+    
+    def _cache_key(self, limit: int) -> tuple:
+        """
+        Klucz wyniku w pamięci rekomendacji
+        Rekomendery tego samego użytkownika z innym katalogiem lub modelem nie dzielą wyników
+        """
+        sources = tuple(self.cache.source_token(source) for source in self._cache_sources())
+        return (self.user.user_id, self.cache_kind, sources, limit)
+    
     def get_user_favorite_movies(self) -> Generator[Movie, None, None]:
         """
         Generator zwracający ulubione filmy użytkownika (ocena >= 7)
@@ -84,41 +409,265 @@ class MovieRecommender:
         Yields:
             Movie: Film z wysoką oceną użytkownika
         """
-        for movie_id, rating in self.user.user_ratings.items():
-            if rating >= 7:
-                movie = movie_for_id(int(movie_id))  # Konwertuj string na int dla API
-                if movie:
-                    yield movie
+        ratings = self.user.user_ratings
+        favorite_ids = ratings.id_array[ratings.rating_array >= 7].tolist()
+        
+        # Pobranie wszystkich ulubionych filmów (z katalogu, a brakujących równolegle z API)
+        for movie in self._movies_for_ids(favorite_ids):
+            if movie:
+                yield movie
     
-    def get_movies_by_genre(self, genre: str, limit: int = 10) -> List[Movie]:
+    def get_movies_by_genre(self, genre: str, limit: int = 10, sort_by: str = "popularity.desc") -> List[Movie]:
         """
-        Wyszukuje filmy z określonego gatunku używając list składanych
+        Pobiera filmy z określonego gatunku przez endpoint /discover/movie
         
         Args:
             genre: Nazwa gatunku do wyszukania
             limit: Maksymalna liczba wyników
+            sort_by: Kryterium sortowania wyników w TMDb
             
         Returns:
             List[Movie]: Lista filmów z danego gatunku
         """
-        # Wyszukiwanie filmów z gatunku
-        search_results = search_movies(genre)
+        movies, self.last_candidate_stats = self._genre_candidates(genre, limit, sort_by)
+        return movies
+    
+    def _genre_candidates(self, genre: str, limit: int,
+                          sort_by: str = "popularity.desc") -> Tuple[List[Movie], Dict[str, int]]:
+        """
+        Pobiera kandydatów z gatunku razem z kosztem ich zbudowania
+        Statystyki są zwracane, a nie zapisywane w obiekcie, więc wywołania z wielu wątków
+        nie nadpisują sobie nawzajem wyników
         
-        # Lista składana do filtrowania filmów z określonym gatunkiem
-        genre_movies = [
-            Movie.from_api_data(movie_data)
-            for movie_data in search_results
-            if Movie.from_api_data(movie_data).is_in_genres(genre)
-        ]
+        Args:
+            genre: Nazwa gatunku do wyszukania
+            limit: Maksymalna liczba wyników
+            sort_by: Kryterium sortowania wyników w TMDb
+            
+        Returns:
+            Tuple[List[Movie], Dict[str, int]]: Lista filmów i statystyki kandydatów
+        """
+        genre_id = GENRE_IDS.get(genre)
+        if genre_id is None:
+            return [], self._candidate_stats()
+        
+        if self.catalog is not None:
+            return self._catalog_genre_candidates(genre_id, limit)
+        
+        # Strumień wyników z kolejnych stron (po 20 filmów), pobierany tylko do pełnych stron pokrywających limit
+        page_stats = {}
+        pages = max(1, -(-limit // 20))
+        search_results = iter_pages(
+            "/discover/movie",
+            {"with_genres": str(genre_id), "sort_by": sort_by},
+            max_results=pages * 20,
+            stats=page_stats
+        )
         
-        # Sortowanie według średniej oceny i zwrócenie top wyników
-        sorted_movies = sorted(
-            genre_movies,
-            key=lambda x: x.avg_rating,
+        movies, stats = self._build_genre_candidates(search_results, genre, limit)
+        stats['requests'] = page_stats.get('requests', 0)
+        stats['failed'] = int(page_stats.get('failed', False))
+        return movies, stats
+    
+    async def get_movies_by_genre_async(self, genre: str, limit: int = 10,
+                                        sort_by: str = "popularity.desc") -> List[Movie]:
+        """
+        Asynchroniczna wersja get_movies_by_genre
+        
+        Args:
+            genre: Nazwa gatunku do wyszukania
+            limit: Maksymalna liczba wyników
+            sort_by: Kryterium sortowania wyników w TMDb
+            
+        Returns:
+            List[Movie]: Lista filmów z danego gatunku
+        """
+        movies, self.last_candidate_stats = await self._genre_candidates_async(genre, limit, sort_by)
+        return movies
+    
+    async def _genre_candidates_async(self, genre: str, limit: int,
+                                      sort_by: str = "popularity.desc") -> Tuple[List[Movie], Dict[str, int]]:
+        """
+        Asynchroniczna wersja _genre_candidates
+        
+        Args:
+            genre: Nazwa gatunku do wyszukania
+            limit: Maksymalna liczba wyników
+            sort_by: Kryterium sortowania wyników w TMDb
+            
+        Returns:
+            Tuple[List[Movie], Dict[str, int]]: Lista filmów i statystyki kandydatów
+        """
+        import async_api
+        
+        genre_id = GENRE_IDS.get(genre)
+        if genre_id is None:
+            return [], self._candidate_stats()
+        
+        if self.catalog is not None:
+            return self._catalog_genre_candidates(genre_id, limit)
+        
+        page_stats = {}
+        pages = max(1, -(-limit // 20))
+        search_results = await async_api.discover_movies([genre_id], sort_by=sort_by, pages=pages, stats=page_stats)
+        
+        movies, stats = self._build_genre_candidates(search_results, genre, limit)
+        stats['requests'] = page_stats.get('requests', 0)
+        stats['failed'] = int(page_stats.get('failed', False))
+        return movies, stats
+    
+    async def _movies_for_ids_async(self, movie_ids: List[int]) -> List[Movie]:
+        """
+        Asynchroniczna wersja _movies_for_ids
+        
+        Args:
+            movie_ids: Lista ID filmów z TMDb
+            
+        Returns:
+            List[Movie]: Lista obiektów Movie (lub None) w kolejności ID
+        """
+        import async_api
+        
+        movies = [self._local_movie(movie_id) for movie_id in movie_ids]
+        missing = [index for index, movie in enumerate(movies) if movie is None]
+        if missing:
+            fetched = await async_api.movies_for_ids(movie_ids[index] for index in missing)
+            for index, movie in zip(missing, fetched):
+                movies[index] = movie
+        return movies
+    
+    async def fetch_movies_async(self, movie_ids: List[int]) -> List[Movie]:
+        """
+        Pobiera asynchronicznie i równolegle filmy dla listy ID
+        
+        Args:
+            movie_ids: Lista ID filmów z TMDb
+            
+        Returns:
+            List[Movie]: Lista znalezionych filmów w kolejności ID
+        """
+        import async_api
+        
+        movies = await async_api.movies_for_ids(movie_ids)
+        return [movie for movie in movies if movie]
+    
+    @staticmethod
+    def _candidate_stats(parsed: int = 0, matched: int = 0, created: int = 0) -> Dict[str, int]:
+        """
+        Tworzy słownik kosztu budowania kandydatów
+        
+        Returns:
+            Dict[str, int]: Liczba przejrzanych, pasujących i utworzonych filmów, zapytań do API
+                            oraz gatunków lub filmów, których nie udało się pobrać (failed)
+        """
+        return {'parsed': parsed, 'matched': matched, 'created': created, 'requests': 0, 'failed': 0}
+    
+    def _catalog_genre_candidates(self, genre_id: int, limit: int) -> Tuple[List[Movie], Dict[str, int]]:
+        """
+        Pobiera kandydatów z lokalnego katalogu zapytaniem po indeksie gatunku
+        
+        Args:
+            genre_id: ID gatunku z TMDb
+            limit: Maksymalna liczba wyników
+            
+        Returns:
+            Tuple[List[Movie], Dict[str, int]]: Lista filmów z danego gatunku posortowana według
+            oceny ważonej liczbą głosów oraz statystyki kandydatów
+        """
+        movies = self.catalog.find_movies(genre_id=genre_id, limit=limit)
+        return movies, self._candidate_stats(len(movies), len(movies), len(movies))
+    
+    def _build_genre_candidates(self, search_results, genre: str,
+                                limit: int) -> Tuple[List[Movie], Dict[str, int]]:
+        """
+        Buduje kandydatów z surowych wyników wyszukiwania w jednym przebiegu
+        Filtruje i sortuje słowniki z API, a obiekty Movie tworzy tylko dla top wyników
+        
+        Args:
+            search_results: Surowe wyniki wyszukiwania z API (lista lub generator)
+            genre: Nazwa gatunku do filtrowania
+            limit: Maksymalna liczba tworzonych obiektów
+            
+        Returns:
+            Tuple[List[Movie], Dict[str, int]]: Lista filmów z danego gatunku i statystyki kandydatów
+            (liczbę zapytań uzupełnia wywołujący)
+        """
+        genre_id = GENRE_IDS.get(genre)
+        
+        # Filtrowanie po ID gatunków bez tworzenia obiektów (wyniki mogą napływać strumieniowo)
+        parsed = 0
+        genre_results = []
+        for movie_data in search_results:
+            parsed += 1
+            if genre_id in Movie.genre_ids_from_api_data(movie_data):
+                genre_results.append(movie_data)
+        
+        # Sortowanie według średniej oceny na surowych danych
+        sorted_results = sorted(
+            genre_results,
+            key=lambda x: x.get('vote_average', 0.0),
             reverse=True
         )
         
-        return sorted_movies[:limit]
+        # Obiekty Movie powstają tylko dla wyników, które zostaną zwrócone
+        movies = [Movie.from_api_data(movie_data) for movie_data in sorted_results[:limit]]
+        
+        return movies, self._candidate_stats(parsed, len(genre_results), len(movies))
+    
+    def _fetch_genres_concurrently(self, genres: List[str], limit: int) -> List[Movie]:
+        """
+        Pobiera równolegle filmy z kilku gatunków i scala je w jedną listę
+        Scalanie jest deterministyczne: kolejność gatunków, a w nich kolejność wyników,
+        przy czym film występujący w kilku gatunkach pojawia się tylko raz
+        
+        Args:
+            genres: Lista nazw gatunków
+            limit: Maksymalna liczba filmów z jednego gatunku
+            
+        Returns:
+            List[Movie]: Scalona lista filmów bez duplikatów
+        """
+        results = fetch_concurrently(
+            lambda genre: self._genre_candidates(genre, limit=limit),
+            genres
+        )
+        
+        self.last_candidate_stats = self._sum_candidate_stats(stats for _, stats in results)
+        return self._merge_genre_results(movies for movies, _ in results)
+    
+    def _sum_candidate_stats(self, stats_list) -> Dict[str, int]:
+        """
+        Sumuje statystyki kandydatów z kilku gatunków
+        
+        Args:
+            stats_list: Statystyki poszczególnych gatunków
+            
+        Returns:
+            Dict[str, int]: Łączne statystyki
+        """
+        total = self._candidate_stats()
+        for stats in stats_list:
+            for key in total:
+                total[key] += stats.get(key, 0)
+        return total
+    
+    @staticmethod
+    def _merge_genre_results(results: List[List[Movie]]) -> List[Movie]:
+        """
+        Scala listy filmów z kolejnych gatunków, pomijając powtórzenia
+        
+        Args:
+            results: Listy filmów w kolejności gatunków
+            
+        Returns:
+            List[Movie]: Scalona lista filmów bez duplikatów
+        """
+        merged = {}
+        for movies in results:
+            for movie in movies:
+                merged.setdefault(movie.movie_id, movie)
+        
+        return list(merged.values())
     
     def calculate_movie_score(self, movie: Movie) -> float:
         """
@@ -130,15 +679,16 @@ class MovieRecommender:
         Returns:
             float: Wynik rekomendacji (wyższy = lepsza rekomendacja)
         """
-        if not movie.genres:
+        if not movie.genre_ids:
             return 0.0
         
-        movie_genres = movie.genres.split(', ')
+        movie_genres = movie.genre_names
         
-        # Obliczanie wyniku na podstawie gatunków
+        # Obliczanie wyniku na podstawie gatunków (gatunki spoza mapowania mają wagę 0, jak w score_movies)
         genre_score = sum(
             self.genre_weights.get(genre, 0) * 0.5
             for genre in movie_genres
+            if genre in GENRE_IDS
         )
         
         # Normalizacja wyniku gatunku
@@ -155,7 +705,9 @@ class MovieRecommender:
     
     def get_recommendations(self, limit: int = 10) -> List[Tuple[Movie, float]]:
         """
-        Generuje rekomendacje filmów na podstawie preferencji użytkownika
+        Zwraca rekomendacje filmów na podstawie preferencji użytkownika
+        Wynik jest obliczany tylko raz dla danej wersji ocen i historii użytkownika,
+        kolejne wywołania korzystają z pamięci rekomendacji
         
         Args:
             limit: Maksymalna liczba rekomendacji
@@ -166,29 +718,119 @@ class MovieRecommender:
         if not self.user.user_ratings:
             return []
         
-        # Generator do pobierania filmów z ulubionych gatunków
-        def recommendation_candidates():
-            for genre in self.favorite_genres[:3]:  # Top 3 gatunki
-                movies = self.get_movies_by_genre(genre, limit=20)
-                for movie in movies:
-                    # Wyklucz filmy już ocenione przez użytkownika
-                    if movie.movie_id not in self.user.user_ratings:
-                        yield movie
-        
-        # Lista składana do obliczania wyników rekomendacji
-        scored_movies = [
-            (movie, self.calculate_movie_score(movie))
-            for movie in recommendation_candidates()
+        self._cached_limits.add(limit)
+        key = self._cache_key(limit)
+        # Wersja odczytana przed obliczeniem - zmiana w trakcie sprawi, że wynik nie zostanie użyty
+        version = self.user.data_version
+        
+        recommendations = self.cache.get(key, version)
+        if recommendations is None:
+            recommendations = self._compute_recommendations(limit)
+            if self._is_cacheable(recommendations):
+                self.cache.set(key, version, recommendations)
+        return recommendations
+    
+    def _compute_recommendations(self, limit: int) -> List[Tuple[Movie, float]]:
+        """
+        Oblicza rekomendacje od nowa, bez korzystania z pamięci rekomendacji
+        
+        Args:
+            limit: Maksymalna liczba rekomendacji
+            
+        Returns:
+            List[Tuple[Movie, float]]: Lista filmów z wynikami rekomendacji
+        """
+        # Równoległe pobranie filmów z ulubionych gatunków (top 3 gatunki)
+        genre_movies = self._fetch_genres_concurrently(self.favorite_genres[:3], limit=20)
+        
+        return self._rank_recommendations(genre_movies, limit)
+    
+    async def get_recommendations_async(self, limit: int = 10) -> List[Tuple[Movie, float]]:
+        """
+        Asynchroniczna wersja get_recommendations dla aplikacji działających w asyncio
+        Nie blokuje pętli zdarzeń podczas pobierania danych z API
+        
+        Args:
+            limit: Maksymalna liczba rekomendacji
+            
+        Returns:
+            List[Tuple[Movie, float]]: Lista filmów z wynikami rekomendacji
+        """
+        if not self.user.user_ratings:
+            return []
+        
+        self._cached_limits.add(limit)
+        key = self._cache_key(limit)
+        version = self.user.data_version
+        
+        recommendations = self.cache.get(key, version)
+        if recommendations is None:
+            recommendations = await self._compute_recommendations_async(limit)
+            if self._is_cacheable(recommendations):
+                self.cache.set(key, version, recommendations)
+        return recommendations
+    
+    async def _compute_recommendations_async(self, limit: int) -> List[Tuple[Movie, float]]:
+        """
+        Asynchroniczna wersja _compute_recommendations
+        
+        Args:
+            limit: Maksymalna liczba rekomendacji
+            
+        Returns:
+            List[Tuple[Movie, float]]: Lista filmów z wynikami rekomendacji
+        """
+        results = await asyncio.gather(*(
+            self._genre_candidates_async(genre, limit=20)
+            for genre in self.favorite_genres[:3]
+        ))
+        
+        self.last_candidate_stats = self._sum_candidate_stats(stats for _, stats in results)
+        return self._rank_recommendations(self._merge_genre_results(movies for movies, _ in results), limit)
+    
+    def _rank_recommendations(self, genre_movies: List[Movie], limit: int) -> List[Tuple[Movie, float]]:
+        """
+        Ocenia i sortuje kandydatów do rekomendacji
+        
+        Args:
+            genre_movies: Lista kandydatów z ulubionych gatunków
+            limit: Maksymalna liczba rekomendacji
+            
+        Returns:
+            List[Tuple[Movie, float]]: Lista filmów z wynikami rekomendacji
+        """
+        # Lista składana wykluczająca filmy już ocenione przez użytkownika
+        candidates = [
+            movie for movie in genre_movies
+            if movie.movie_id not in self.user.user_ratings
         ]
         
-        # Sortowanie według wyniku rekomendacji
-        sorted_recommendations = sorted(
-            scored_movies,
-            key=lambda x: x[1],
-            reverse=True
-        )
+        # Wektorowe obliczenie wyników wszystkich kandydatów i wybór najlepszych
+        scores = score_movies(candidates, self.genre_weights)
+        
+        return [
+            (candidates[index], float(scores[index]))
+            for index in top_k(scores, limit)
+        ]
+    
+    def get_cf_recommendations(self, user: User = None, limit: int = 10) -> List[Tuple[Movie, float]]:
+        """
+        Generuje rekomendacje metodą filtrowania kolaboratywnego item-item
+        (filmy podobne do ocenionych na podstawie ocen wielu użytkowników)
+        
+        Args:
+            user: Użytkownik, dla którego generowane są rekomendacje (domyślnie self.user)
+            limit: Maksymalna liczba rekomendacji
+            
+        Returns:
+            List[Tuple[Movie, float]]: Lista filmów z przewidywanymi ocenami
+        """
+        user = user if user is not None else self.user
+        if self.cf_model is None or not user.user_ratings:
+            return []
         
-        return sorted_recommendations[:limit]
+        predictions = self.cf_model.recommend(user.user_ratings, limit=limit)
+        return self._movies_for_predictions(predictions)
     
     def get_rewatch_recommendations(self, limit: int = 5) -> List[Tuple[Movie, float]]:
         """
@@ -206,9 +848,9 @@ class MovieRecommender:
         
         # Lista składana do tworzenia rekomendacji ponownego obejrzenia
         rewatch_candidates = [
-            (movie, self.user.user_ratings[str(movie.movie_id)] / 10.0)
+            (movie, self.user.user_ratings[movie.movie_id] / 10.0)
             for movie in favorite_movies
-            if str(movie.movie_id) in self.user.user_ratings
+            if movie.movie_id in self.user.user_ratings
         ]
         
         # Sortowanie według oceny użytkownika
@@ -220,28 +862,43 @@ class MovieRecommender:
         
         return sorted_rewatch[:limit]
     
-    def get_similar_movies(self, movie_id: int, limit: int = 5) -> List[Movie]:
+    def get_similar_movies(self, movie_id: int, limit: int = 5, mode: str = "genre",
+                           probes: int = 2) -> List[Movie]:
         """
-        Znajduje podobne filmy na podstawie gatunków
+        Znajduje podobne filmy na podstawie gatunków lub wektorów cech
         
         Args:
             movie_id: ID filmu referencyjnego
             limit: Maksymalna liczba podobnych filmów
+            mode: "genre" - liczba wspólnych gatunków, "embedding" - indeks ANN na wektorach filmów
+            probes: Kompromis trafność/czas dla trybu "embedding" (więcej = dokładniej)
             
         Returns:
             List[Movie]: Lista podobnych filmów
         """
-        reference_movie = movie_for_id(movie_id)
-        if not reference_movie or not reference_movie.genres:
+        if mode == "embedding" and self.get_ann_index() is not None:
+            return self._get_similar_by_embedding(movie_id, limit, probes)
+        
+        reference_movie = self._find_known_movie(movie_id)
+        if not reference_movie or not reference_movie.genre_ids:
             return []
         
+        # Z indeksem gatunków kandydaci i liczba wspólnych gatunków pochodzą z list indeksu
+        genre_index = self.get_genre_index()
+        if genre_index is not None:
+            similar_ids = genre_index.similar_ids(reference_movie.genre_ids, limit, exclude_id=movie_id)
+            similar_movies = self._movies_for_ids([similar_id for similar_id, _ in similar_ids])
+            return [movie for movie in similar_movies if movie]
+        
+        # Równoległe pobranie filmów ze wszystkich gatunków filmu referencyjnego
+        genres = list(reference_movie.genre_names)
+        genre_movies = self._fetch_genres_concurrently(genres, limit=10)
+        
         # Generator do wyszukiwania podobnych filmów
         def similar_movies_generator():
-            for genre in reference_movie.genres.split(', '):
-                movies = self.get_movies_by_genre(genre.strip(), limit=10)
-                for movie in movies:
-                    if movie.movie_id != movie_id:
-                        yield movie
+            for movie in genre_movies:
+                if movie.movie_id != movie_id:
+                    yield movie
         
         # Lista składana do filtrowania unikalnych filmów
         similar_movies = list({
@@ -253,7 +910,7 @@ class MovieRecommender:
         sorted_similar = sorted(
             similar_movies,
             key=lambda x: (
-                len(set(x.genres.split(', ')) & set(reference_movie.genres.split(', '))),
+                x.genre_overlap(reference_movie),
                 x.avg_rating
             ),
             reverse=True
@@ -261,6 +918,120 @@ class MovieRecommender:
         
         return sorted_similar[:limit]
     
+    def _get_similar_by_embedding(self, movie_id: int, limit: int, probes: int) -> List[Movie]:
+        """
+        Znajduje podobne filmy przybliżonym wyszukiwaniem w indeksie ANN
+        
+        Args:
+            movie_id: ID filmu referencyjnego
+            limit: Maksymalna liczba podobnych filmów
+            probes: Liczba dodatkowych kubełków sprawdzanych w każdej tablicy indeksu
+            
+        Returns:
+            List[Movie]: Lista podobnych filmów
+        """
+        vector = self.ann_index.vector_for(movie_id)
+        
+        # Film spoza indeksu: wektor cech liczony na bieżąco, ale tylko gdy indeks zbudowano
+        # z movie_features - czynników ukrytych ani wektorów nieznanego rodzaju nie da się odtworzyć
+        if vector is None:
+            if self.ann_index.features != "movie":
+                return []
+            reference_movie = self._find_known_movie(movie_id)
+            if not reference_movie:
+                return []
+            vector = movie_features([reference_movie])[1][0]
+        
+        neighbours = self.ann_index.query(vector, k=limit, probes=probes, exclude_id=movie_id)
+        similar_movies = self._movies_for_ids([neighbour_id for neighbour_id, _ in neighbours])
+        return [movie for movie in similar_movies if movie]
+    
+    def get_ann_index(self) -> LSHIndex:
+        """
+        Zwraca indeks ANN do wyszukiwania podobnych filmów
+        Jeśli nie został podany, jest wczytywany z ANN_INDEX_FILE, a gdy pliku nie ma -
+        budowany raz z lokalnego katalogu
+        
+        Returns:
+            LSHIndex: Indeks lub None, gdy nie ma znanej puli filmów
+        """
+        if self.ann_index is None and os.path.exists(ANN_INDEX_FILE):
+            self.ann_index = LSHIndex.load(ANN_INDEX_FILE)
+        if self.ann_index is None and self.catalog is not None:
+            self.ann_index = LSHIndex.from_movies(self.catalog.iter_movies())
+        return self.ann_index
+    
+    def get_genre_index(self) -> GenreIndex:
+        """
+        Zwraca odwrócony indeks gatunków
+        Jeśli nie został podany, jest budowany raz z lokalnego katalogu
+        
+        Returns:
+            GenreIndex: Indeks gatunków lub None, gdy nie ma znanej puli filmów
+        """
+        if self.genre_index is None and self.catalog is not None:
+            self.genre_index = GenreIndex.from_catalog(self.catalog)
+        return self.genre_index
+    
+    def _find_known_movie(self, movie_id: int) -> Movie:
+        """
+        Szuka filmu kolejno w indeksie gatunków, lokalnym katalogu i API
+        
+        Args:
+            movie_id: ID filmu z TMDb
+            
+        Returns:
+            Movie: Obiekt filmu lub None
+        """
+        return self._local_movie(movie_id) or movie_for_id(movie_id)
+    
+    def _local_movie(self, movie_id: int) -> Movie:
+        """
+        Szuka filmu w indeksie gatunków i lokalnym katalogu, bez zapytań do API
+        
+        Args:
+            movie_id: ID filmu z TMDb
+            
+        Returns:
+            Movie: Obiekt filmu lub None
+        """
+        if self.genre_index is not None and movie_id in self.genre_index.movies:
+            return self.genre_index.movies[movie_id]
+        if self.catalog is not None:
+            return self.catalog.get_movie(movie_id)
+        return None
+    
+    def _movies_for_ids(self, movie_ids: List[int]) -> List[Movie]:
+        """
+        Pobiera filmy dla listy ID, najpierw z indeksu gatunków i lokalnego katalogu
+        Z API pobierane są równolegle tylko filmy, których nie ma lokalnie
+        
+        Args:
+            movie_ids: Lista ID filmów z TMDb
+            
+        Returns:
+            List[Movie]: Lista obiektów Movie (lub None) w kolejności ID
+        """
+        movies = [self._local_movie(movie_id) for movie_id in movie_ids]
+        missing = [index for index, movie in enumerate(movies) if movie is None]
+        if missing:
+            for index, movie in zip(missing, movies_for_ids(movie_ids[index] for index in missing)):
+                movies[index] = movie
+        return movies
+    
+    def _movies_for_predictions(self, predictions: List[Tuple[int, float]]) -> List[Tuple[Movie, float]]:
+        """
+        Łączy przewidywania modelu z obiektami filmów pobranymi jednym wywołaniem _movies_for_ids
+        
+        Args:
+            predictions: Lista krotek (movie_id, przewidywana_ocena)
+            
+        Returns:
+            List[Tuple[Movie, float]]: Filmy z przewidywanymi ocenami, bez filmów, których nie udało się pobrać
+        """
+        movies = self._movies_for_ids([movie_id for movie_id, _ in predictions])
+        return [(movie, score) for movie, (_, score) in zip(movies, predictions) if movie]
+    
     def get_user_statistics(self) -> Dict[str, any]:
         """
         Generuje statystyki użytkownika na podstawie ocen i historii
@@ -276,8 +1047,8 @@ class MovieRecommender:
                 'total_watched': len(self.user.user_watch_history)
             }
         
-        # Lista składana do obliczania statystyk
-        ratings = list(self.user.user_ratings.values())
+        # Oceny jako tablica NumPy (bez kopiowania)
+        ratings = self.user.user_ratings.rating_array
         
         # Obliczanie statystyk z numpy
         stats = {
@@ -292,18 +1063,89 @@ class MovieRecommender:
         return stats
 
 
+class MatrixFactorizationRecommender(MovieRecommender):
+    """
+    Rekomender oceniający filmy modelem czynników ukrytych
+    Nie wymaga wyszukiwania filmów po gatunkach przy każdym zapytaniu
+    """
+    
+    cache_kind = "mf"
+    
+    def __init__(self, user: User, mf_model: MatrixFactorization, **kwargs):
+        """
+        Inicjalizacja rekomendera
+        
+        Args:
+            user: Obiekt użytkownika z ocenami i historią oglądania
+            mf_model: Wytrenowany model faktoryzacji macierzy
+            **kwargs: Pozostałe argumenty MovieRecommender
+        """
+        self.mf_model = mf_model
+        super().__init__(user, **kwargs)
+    
+    def _cache_sources(self) -> tuple:
+        """Źródła danych, od których zależy wynik get_recommendations"""
+        return (self.mf_model, self.catalog)
+    
+    async def _compute_recommendations_async(self, limit: int) -> List[Tuple[Movie, float]]:
+        """
+        Oblicza przewidywania modelu w osobnym wątku, żeby nie blokować pętli zdarzeń
+        
+        Args:
+            limit: Maksymalna liczba rekomendacji
+            
+        Returns:
+            List[Tuple[Movie, float]]: Lista filmów z przewidywanymi ocenami
+        """
+        return await asyncio.to_thread(self._compute_recommendations, limit)
+    
+    def _compute_recommendations(self, limit: int) -> List[Tuple[Movie, float]]:
+        """
+        Oblicza rekomendacje na podstawie przewidywanych ocen z modelu
+        
+        Args:
+            limit: Maksymalna liczba rekomendacji
+            
+        Returns:
+            List[Tuple[Movie, float]]: Lista filmów z przewidywanymi ocenami
+        """
+        predictions = self.mf_model.recommend(self.user.user_id, self.user.user_ratings, limit=limit)
+        
+        recommendations = self._movies_for_predictions(predictions)
+        
+        # Filmy, których nie udało się pobrać, oznaczają niepełny wynik
+        found = len(recommendations)
+        self.last_candidate_stats = self._candidate_stats(len(predictions), found, found)
+        self.last_candidate_stats['failed'] = len(predictions) - found
+        return recommendations
+
+
 # Funkcja pomocnicza do tworzenia instancji rekomendera
-def create_recommender(user: User) -> MovieRecommender:
+def create_recommender(user: User, catalog: MovieCatalog = None, strategy: str = "genre",
+                       mf_model: MatrixFactorization = None, cf_model: ItemItemCF = None) -> MovieRecommender:
     """
     Tworzy instancję systemu rekomendacji dla użytkownika
     
     Args:
         user: Obiekt użytkownika
+        catalog: Opcjonalny lokalny katalog filmów
+        strategy: "genre" - rekomendacje według ulubionych gatunków,
+                  "mf" - rekomendacje z modelu faktoryzacji macierzy
+        mf_model: Model faktoryzacji (domyślnie wczytywany z MF_MODEL_DIR)
+        cf_model: Model filtrowania kolaboratywnego (domyślnie wczytywany z CF_MODEL_FILE, jeśli plik istnieje)
         
     Returns:
         MovieRecommender: Instancja systemu rekomendacji
     """
-    return MovieRecommender(user)
+    # Model CF jest opcjonalny - bez pliku rekomender działa bez rekomendacji kolaboratywnych
+    if cf_model is None and os.path.exists(CF_MODEL_FILE):
+        cf_model = ItemItemCF.load(CF_MODEL_FILE)
     
+    if strategy == "mf":
+        if mf_model is None:
+            mf_model = MatrixFactorization.load()
+        if mf_model is not None:
+            return MatrixFactorizationRecommender(user, mf_model, catalog=catalog, cf_model=cf_model)
+        print("Brak modelu faktoryzacji, używam rekomendacji według gatunków.")
     
-
+    return MovieRecommender(user, catalog=catalog, cf_model=cf_model)
@@ -0,0 +1,116 @@
+"""
+Moduł wektorowego obliczania wyników rekomendacji
+
+Zawiera:
+- Kodowanie gatunków kandydatów jako macierzy multi-hot
+- Obliczanie wyników wszystkich kandydatów jednym iloczynem macierz-wektor
+- Wybór najlepszych wyników z użyciem np.argpartition
+
+Wyniki są zgodne z MovieRecommender.calculate_movie_score
+(70% preferencje gatunkowe użytkownika, 30% ocena TMDb).
+"""
+
+import numpy as np
+from typing import List, Dict, Tuple
+from models import Movie, GENRE_MAPPING
+
+# Kolumny macierzy multi-hot: jedna kolumna na każdy znany gatunek
+# (kolejność kolumn odpowiada bitom Movie.genre_mask)
+GENRE_COLUMNS = {name: column for column, name in enumerate(GENRE_MAPPING.values())}
+
+
+def encode_genres(movies: List[Movie]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Koduje gatunki filmów jako macierz multi-hot na podstawie masek bitowych
+
+    Args:
+        movies: Lista filmów
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Macierz (filmy x gatunki) oraz wektor liczby
+        gatunków każdego filmu (razem z gatunkami spoza mapowania)
+    """
+    masks = np.fromiter((movie.genre_mask for movie in movies), dtype=np.int64, count=len(movies))
+    genre_counts = np.fromiter((len(movie.genre_ids) for movie in movies), dtype=float, count=len(movies))
+
+    # Rozwinięcie masek na bity daje całą macierz jedną operacją
+    matrix = ((masks[:, None] >> np.arange(len(GENRE_COLUMNS))) & 1).astype(float)
+    return matrix, genre_counts
+
+
+def weight_vector(genre_weights: Dict[str, float]) -> np.ndarray:
+    """
+    Zamienia słownik wag gatunków na wektor zgodny z kolumnami macierzy multi-hot
+
+    Args:
+        genre_weights: Słownik {gatunek: średnia ocena użytkownika}
+
+    Returns:
+        np.ndarray: Wektor wag gatunków
+    """
+    weights = np.zeros(len(GENRE_COLUMNS))
+    for genre, weight in genre_weights.items():
+        column = GENRE_COLUMNS.get(genre)
+        if column is not None:
+            weights[column] = weight
+    return weights
+
+
+def score_movies(movies: List[Movie], genre_weights: Dict[str, float]) -> np.ndarray:
+    """
+    Oblicza wyniki rekomendacji dla wszystkich kandydatów naraz
+
+    Args:
+        movies: Lista kandydatów
+        genre_weights: Słownik {gatunek: średnia ocena użytkownika}
+
+    Returns:
+        np.ndarray: Wektor wyników w kolejności kandydatów
+    """
+    if not movies:
+        return np.zeros(0)
+
+    matrix, genre_counts = encode_genres(movies)
+    ratings = np.array([movie.avg_rating for movie in movies], dtype=float)
+
+    # Wynik gatunkowy: suma wag gatunków filmu (z mnożnikiem 0.5) znormalizowana liczbą gatunków
+    genre_scores = matrix @ (weight_vector(genre_weights) * 0.5)
+    has_genres = genre_counts > 0
+    genre_scores = np.divide(genre_scores, genre_counts, out=np.zeros_like(genre_scores), where=has_genres)
+
+    # Kombinacja wyników (70% preferencje użytkownika, 30% ocena TMDb)
+    final_scores = (genre_scores * 0.7) + ((ratings / 10.0) * 0.3)
+
+    # Filmy bez gatunków otrzymują wynik 0, tak jak w calculate_movie_score
+    return np.where(has_genres, final_scores, 0.0)
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Zwraca indeksy k najwyższych wyników posortowane malejąco
+    Przy równych wynikach zachowuje kolejność kandydatów
+
+    Args:
+        scores: Wektor wyników
+        k: Liczba zwracanych indeksów
+
+    Returns:
+        np.ndarray: Indeksy najlepszych wyników
+    """
+    if k <= 0 or len(scores) == 0:
+        return np.zeros(0, dtype=int)
+
+    if k >= len(scores):
+        candidates = np.arange(len(scores))
+    else:
+        # Częściowe sortowanie znajduje k-ty najwyższy wynik w czasie liniowym
+        threshold = scores[np.argpartition(-scores, k - 1)[k - 1]]
+
+        # Wyniki równe progowi są brane w kolejności kandydatów, jak przy sortowaniu stabilnym
+        above = np.flatnonzero(scores > threshold)
+        ties = np.flatnonzero(scores == threshold)[:k - len(above)]
+        candidates = np.concatenate((above, ties))
+
+    # Pełne sortowanie tylko wybranych indeksów (wynik malejąco, potem indeks rosnąco)
+    order = np.lexsort((candidates, -scores[candidates]))
+    return candidates[order]
@@ -0,0 +1,613 @@
+"""
+Moduł przechowywania danych użytkowników
+
+Zawiera:
+- Klasę bazową UserStorage opisującą operacje na danych użytkowników
+- Backend SQLite (tryb WAL) z tabelami ocen i historii oglądania kluczowanymi po user_id
+- Backend dziennika (append-only) z okresowym fsync i kompaktowaniem do migawki
+- Backend JSON zgodny z dotychczasowym plikiem user_data.json
+- Funkcję get_storage zwracającą backend wybrany w pliku konfiguracyjnym
+
+Każda operacja (ocena, dodanie do historii) zapisuje tylko jeden wiersz,
+więc wielu użytkowników może korzystać z jednej bazy bez nadpisywania swoich danych.
+"""
+
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Optional, Generator, Tuple
+from config import USER_STORAGE, USER_DB_FILE, USER_DATA_FILE
+from config import JOURNAL_DIR, JOURNAL_FSYNC_INTERVAL, JOURNAL_COMPACT_EVERY
+
+
+class UserStorage(ABC):
+    """
+    Abstrakcyjna klasa bazowa backendów przechowywania danych użytkowników
+    Nie można utworzyć backendu, który nie implementuje wszystkich metod abstrakcyjnych
+    Dane użytkownika to słownik z kluczami: user_id, user_name, ratings, watch_history
+    oraz opcjonalnie watched_at ({movie_id jako tekst: czas dodania do historii})
+    """
+
+    @abstractmethod
+    def load_user(self, user_id: int) -> Optional[Dict]:
+        """
+        Wczytuje dane użytkownika
+
+        Args:
+            user_id: ID użytkownika
+
+        Returns:
+            dict: Dane użytkownika lub None, jeśli użytkownik nie istnieje
+        """
+
+    @abstractmethod
+    def save_user(self, user_data: Dict) -> None:
+        """
+        Zapisuje wszystkie dane użytkownika (nazwa, oceny, historia)
+
+        Args:
+            user_data: Dane użytkownika
+        """
+
+    @abstractmethod
+    def save_rating(self, user_id: int, user_name: str, movie_id: int, rating: float) -> None:
+        """
+        Zapisuje lub aktualizuje jedną ocenę użytkownika
+
+        Args:
+            user_id: ID użytkownika
+            user_name: Nazwa użytkownika
+            movie_id: ID ocenionego filmu
+            rating: Ocena
+        """
+
+    @abstractmethod
+    def add_to_history(self, user_id: int, user_name: str, movie_id: int, watched_at: float = None) -> None:
+        """
+        Dodaje film na koniec historii oglądania użytkownika
+
+        Args:
+            user_id: ID użytkownika
+            user_name: Nazwa użytkownika
+            movie_id: ID obejrzanego filmu
+            watched_at: Czas dodania do historii (domyślnie bieżący)
+        """
+
+    @abstractmethod
+    def iter_all_ratings(self) -> Generator[Tuple[int, int, float], None, None]:
+        """
+        Generator zwracający oceny wszystkich użytkowników
+
+        Yields:
+            Tuple[int, int, float]: Trójka (user_id, movie_id, rating)
+        """
+
+    def is_empty(self) -> bool:
+        """Sprawdza czy backend nie zawiera jeszcze żadnego użytkownika"""
+        return next(self.iter_all_ratings(), None) is None
+
+
+class SQLiteUserStorage(UserStorage):
+    """
+    Backend SQLite w trybie WAL
+    Każdy wątek ma własne połączenie, dzięki czemu odczyty nie blokują się nawzajem
+    """
+
+    def __init__(self, path: str = USER_DB_FILE):
+        """
+        Inicjalizacja bazy i utworzenie tabel, jeśli nie istnieją
+
+        Args:
+            path: Ścieżka do pliku bazy SQLite
+        """
+        self.path = path
+        self._local = threading.local()
+
+        connection = self._connection()
+        connection.executescript(
+            "CREATE TABLE IF NOT EXISTS users ("
+            "user_id INTEGER PRIMARY KEY, "
+            "user_name TEXT NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS ratings ("
+            "user_id INTEGER NOT NULL, "
+            "movie_id INTEGER NOT NULL, "
+            "rating REAL NOT NULL, "
+            "updated_at REAL NOT NULL, "
+            "PRIMARY KEY (user_id, movie_id));"
+            "CREATE INDEX IF NOT EXISTS idx_ratings_movie ON ratings (movie_id);"
+            "CREATE TABLE IF NOT EXISTS watch_history ("
+            "user_id INTEGER NOT NULL, "
+            "movie_id INTEGER NOT NULL, "
+            "added_at REAL NOT NULL, "
+            "position INTEGER NOT NULL, "
+            "PRIMARY KEY (user_id, movie_id));"
+            "CREATE INDEX IF NOT EXISTS idx_history_order ON watch_history (user_id, position);"
+        )
+        connection.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        Zwraca połączenie z bazą dla bieżącego wątku
+
+        Returns:
+            sqlite3.Connection: Połączenie w trybie WAL
+        """
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=10)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    @staticmethod
+    def _upsert_user(connection, user_id: int, user_name: str) -> None:
+        """Tworzy użytkownika lub aktualizuje jego nazwę"""
+        connection.execute(
+            "INSERT INTO users (user_id, user_name) VALUES (?, ?) "
+            "ON CONFLICT (user_id) DO UPDATE SET user_name = excluded.user_name",
+            (user_id, user_name)
+        )
+
+    def load_user(self, user_id: int) -> Optional[Dict]:
+        connection = self._connection()
+        row = connection.execute("SELECT user_name FROM users WHERE user_id = ?", (user_id,)).fetchone()
+        if row is None:
+            return None
+
+        ratings = connection.execute(
+            "SELECT movie_id, rating FROM ratings WHERE user_id = ? ORDER BY rowid", (user_id,)
+        ).fetchall()
+        history = connection.execute(
+            "SELECT movie_id, added_at FROM watch_history WHERE user_id = ? ORDER BY position", (user_id,)
+        ).fetchall()
+
+        return {
+            "user_id": user_id,
+            "user_name": row[0],
+            "ratings": {str(movie_id): rating for movie_id, rating in ratings},
+            "watch_history": [movie_id for movie_id, _ in history],
+            "watched_at": {str(movie_id): added_at for movie_id, added_at in history}
+        }
+
+    def save_user(self, user_data: Dict) -> None:
+        user_id = user_data["user_id"]
+        watched_at = user_data.get("watched_at") or {}
+        now = time.time()
+
+        connection = self._connection()
+        with connection:
+            self._upsert_user(connection, user_id, user_data["user_name"])
+            connection.execute("DELETE FROM ratings WHERE user_id = ?", (user_id,))
+            connection.executemany(
+                "INSERT INTO ratings VALUES (?, ?, ?, ?)",
+                [(user_id, int(movie_id), rating, now) for movie_id, rating in user_data["ratings"].items()]
+            )
+            connection.execute("DELETE FROM watch_history WHERE user_id = ?", (user_id,))
+            connection.executemany(
+                "INSERT OR IGNORE INTO watch_history VALUES (?, ?, ?, ?)",
+                [(user_id, int(movie_id), watched_at.get(str(movie_id)) or now, position)
+                 for position, movie_id in enumerate(user_data["watch_history"])]
+            )
+
+    def save_rating(self, user_id: int, user_name: str, movie_id: int, rating: float) -> None:
+        connection = self._connection()
+        with connection:
+            self._upsert_user(connection, user_id, user_name)
+            connection.execute(
+                "INSERT INTO ratings VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (user_id, movie_id) DO UPDATE SET rating = excluded.rating, updated_at = excluded.updated_at",
+                (user_id, int(movie_id), rating, time.time())
+            )
+
+    def add_to_history(self, user_id: int, user_name: str, movie_id: int, watched_at: float = None) -> None:
+        connection = self._connection()
+        with connection:
+            self._upsert_user(connection, user_id, user_name)
+            connection.execute(
+                "INSERT OR IGNORE INTO watch_history "
+                "SELECT ?, ?, ?, COALESCE(MAX(position) + 1, 0) FROM watch_history WHERE user_id = ?",
+                (user_id, int(movie_id), watched_at or time.time(), user_id)
+            )
+
+    def iter_all_ratings(self) -> Generator[Tuple[int, int, float], None, None]:
+        yield from self._connection().execute("SELECT user_id, movie_id, rating FROM ratings")
+
+    def is_empty(self) -> bool:
+        """Sprawdza czy w bazie nie ma jeszcze żadnego użytkownika"""
+        return self._connection().execute("SELECT 1 FROM users LIMIT 1").fetchone() is None
+
+
+class JournalUserStorage(UserStorage):
+    """
+    Backend oparty na dzienniku zdarzeń (append-only)
+
+    Każdy użytkownik ma w katalogu dwa pliki:
+    - user_<id>.log - dziennik, do którego każda akcja dopisuje jedną linię JSON
+      (ocena: {"op": "rate"}, historia: {"op": "history"}, zmiana nazwy: {"op": "name"})
+    - user_<id>.json - migawka stanu z numerem ostatniego uwzględnionego zdarzenia
+
+    Zapis to dopisanie jednej linii, a fsync wykonywany jest zbiorczo co fsync_interval sekund.
+    Po compact_every zdarzeniach dziennik jest w tle kompaktowany do migawki.
+    Wczytanie to odtworzenie migawki i zdarzeń z dziennika o większym numerze;
+    nieczytelne linie są pomijane, a niedokończona ostatnia linia (np. po awarii)
+    jest obcinana przed pierwszym kolejnym zapisem.
+    """
+
+    def __init__(self, directory: str = JOURNAL_DIR, fsync_interval: float = JOURNAL_FSYNC_INTERVAL,
+                 compact_every: int = JOURNAL_COMPACT_EVERY):
+        """
+        Args:
+            directory: Katalog z dziennikami i migawkami użytkowników
+            fsync_interval: Co ile sekund wymuszać zapis dzienników na dysk
+            compact_every: Po ilu zdarzeniach w dzienniku wykonać kompaktowanie
+        """
+        self.directory = directory
+        self.fsync_interval = fsync_interval
+        self.compact_every = compact_every
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._files = {}  # Słownik {user_id: deskryptor dziennika czekającego na fsync}
+        self._seq = {}  # Słownik {user_id: numer ostatniego zdarzenia}
+        self._names = {}  # Słownik {user_id: nazwa użytkownika}
+        self._log_lengths = {}  # Słownik {user_id: liczba zdarzeń w dzienniku}
+        self._compacting = set()
+
+        self._stopped = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_periodically, daemon=True)
+        self._flusher.start()
+        atexit.register(self.close)
+
+    def _paths(self, user_id: int) -> Tuple[str, str]:
+        """Zwraca ścieżki migawki i dziennika użytkownika"""
+        base = os.path.join(self.directory, f"user_{int(user_id)}")
+        return base + ".json", base + ".log"
+
+    def _read_state(self, user_id: int) -> Tuple[Optional[Dict], int, int]:
+        """
+        Odtwarza stan użytkownika z migawki i dziennika
+
+        Returns:
+            tuple: (dane użytkownika lub None, numer ostatniego zdarzenia, liczba zdarzeń w dzienniku)
+        """
+        snapshot_path, log_path = self._paths(user_id)
+        state, seq, log_length = None, 0, 0
+
+        try:
+            with open(snapshot_path, "r") as f:
+                snapshot = json.load(f)
+            seq = snapshot.pop("seq", 0)
+            snapshot.setdefault("watched_at", {str(movie_id): None for movie_id in snapshot["watch_history"]})
+            state = snapshot
+        except FileNotFoundError:
+            pass
+
+        try:
+            with open(log_path, "r") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Uszkodzona linia (np. niedokończony zapis sprzed awarii)
+                    if not isinstance(record, dict) or not isinstance(record.get("seq"), int):
+                        continue
+                    log_length += 1
+                    if record["seq"] <= seq:
+                        continue  # Zdarzenie jest już w migawce
+                    if state is None:
+                        state = {"user_id": int(user_id), "user_name": "", "ratings": {},
+                                 "watch_history": [], "watched_at": {}}
+                    _apply_record(state, record)
+                    seq = record["seq"]
+        except FileNotFoundError:
+            pass
+
+        return state, seq, log_length
+
+    @staticmethod
+    def _truncate_partial_line(log_path: str) -> None:
+        """
+        Obcina dziennik do ostatniej pełnej linii
+        Bez tego kolejne zdarzenie zostałoby dopisane do niedokończonej linii i razem z nią utracone
+        """
+        try:
+            with open(log_path, "rb+") as f:
+                data = f.read()
+                if data and not data.endswith(b"\n"):
+                    f.truncate(data.rfind(b"\n") + 1)
+                    f.flush()
+                    os.fsync(f.fileno())
+        except FileNotFoundError:
+            pass
+
+    def _ensure_loaded(self, user_id: int) -> None:
+        """Wczytuje numer ostatniego zdarzenia i nazwę użytkownika przed pierwszym zapisem"""
+        if user_id not in self._seq:
+            self._truncate_partial_line(self._paths(user_id)[1])
+            state, seq, log_length = self._read_state(user_id)
+            self._seq[user_id] = seq
+            self._log_lengths[user_id] = log_length
+            self._names[user_id] = state["user_name"] if state else None
+
+    def _append(self, user_id: int, user_name: str, record: Dict) -> None:
+        """
+        Dopisuje zdarzenie do dziennika użytkownika
+
+        Args:
+            user_id: ID użytkownika
+            user_name: Nazwa użytkownika (zapisywana tylko, gdy się zmieniła)
+            record: Zdarzenie bez numeru kolejnego
+        """
+        with self._lock:
+            self._ensure_loaded(user_id)
+
+            records = [record]
+            if self._names[user_id] != user_name:
+                records.insert(0, {"op": "name", "user_name": user_name})
+                self._names[user_id] = user_name
+
+            lines = []
+            for entry in records:
+                self._seq[user_id] += 1
+                lines.append(json.dumps(dict(entry, seq=self._seq[user_id])) + "\n")
+
+            descriptor = self._files.get(user_id)
+            if descriptor is None:
+                _, log_path = self._paths(user_id)
+                descriptor = os.open(log_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                self._files[user_id] = descriptor
+            os.write(descriptor, "".join(lines).encode("utf-8"))
+
+            self._log_lengths[user_id] += len(lines)
+            if self._log_lengths[user_id] >= self.compact_every and user_id not in self._compacting:
+                self._compacting.add(user_id)
+                threading.Thread(target=self.compact, args=(user_id,), daemon=True).start()
+
+    def _close_file(self, user_id: int) -> None:
+        """Wykonuje fsync i zamyka dziennik użytkownika"""
+        descriptor = self._files.pop(user_id, None)
+        if descriptor is not None:
+            os.fsync(descriptor)
+            os.close(descriptor)
+
+    def flush(self) -> None:
+        """
+        Wymusza zapis na dysk wszystkich dzienników zmienionych od ostatniego wywołania
+        """
+        with self._lock:
+            for user_id in list(self._files):
+                self._close_file(user_id)
+
+    def _flush_periodically(self) -> None:
+        """Wątek w tle wykonujący zbiorczy fsync dzienników"""
+        while not self._stopped.wait(self.fsync_interval):
+            self.flush()
+
+    def _write_snapshot(self, user_id: int, state: Dict, seq: int) -> None:
+        """
+        Zapisuje migawkę stanu i czyści dziennik
+        Migawka jest podmieniana atomowo, więc awaria nie zostawia uszkodzonego pliku
+        """
+        snapshot_path, log_path = self._paths(user_id)
+        temporary_path = snapshot_path + ".tmp"
+
+        with open(temporary_path, "w") as f:
+            json.dump(dict(state, seq=seq), f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary_path, snapshot_path)
+
+        # Zdarzenia z dziennika są już w migawce (a przy awarii zostaną pominięte dzięki seq)
+        self._close_file(user_id)
+        with open(log_path, "w") as f:
+            os.fsync(f.fileno())
+        self._log_lengths[user_id] = 0
+
+    def compact(self, user_id: int) -> None:
+        """
+        Kompaktuje dziennik użytkownika do migawki
+
+        Args:
+            user_id: ID użytkownika
+        """
+        try:
+            with self._lock:
+                self._close_file(user_id)
+                state, seq, _ = self._read_state(user_id)
+                if state is not None:
+                    self._write_snapshot(user_id, state, seq)
+        except OSError as e:
+            print(f"Błąd podczas kompaktowania dziennika użytkownika {user_id}: {e}")
+        finally:
+            self._compacting.discard(user_id)
+
+    def load_user(self, user_id: int) -> Optional[Dict]:
+        with self._lock:
+            state, _, _ = self._read_state(user_id)
+        return state
+
+    def save_user(self, user_data: Dict) -> None:
+        user_id = int(user_data["user_id"])
+        state = {
+            "user_id": user_id,
+            "user_name": user_data["user_name"],
+            "ratings": {str(movie_id): rating for movie_id, rating in user_data["ratings"].items()},
+            "watch_history": list(user_data["watch_history"]),
+            "watched_at": dict(user_data.get("watched_at") or {})
+        }
+
+        with self._lock:
+            self._ensure_loaded(user_id)
+            self._seq[user_id] += 1
+            self._names[user_id] = state["user_name"]
+            self._write_snapshot(user_id, state, self._seq[user_id])
+
+    def save_rating(self, user_id: int, user_name: str, movie_id: int, rating: float) -> None:
+        self._append(int(user_id), user_name, {"op": "rate", "movie_id": int(movie_id), "rating": rating})
+
+    def add_to_history(self, user_id: int, user_name: str, movie_id: int, watched_at: float = None) -> None:
+        self._append(int(user_id), user_name, {"op": "history", "movie_id": int(movie_id), "at": watched_at or time.time()})
+
+    def user_ids(self) -> list:
+        """Zwraca posortowane ID wszystkich użytkowników zapisanych w katalogu"""
+        ids = set()
+        for name in os.listdir(self.directory):
+            stem, extension = os.path.splitext(name)
+            if stem.startswith("user_") and extension in (".json", ".log") and stem[5:].isdigit():
+                ids.add(int(stem[5:]))
+        return sorted(ids)
+
+    def iter_all_ratings(self) -> Generator[Tuple[int, int, float], None, None]:
+        for user_id in self.user_ids():
+            user_data = self.load_user(user_id)
+            if user_data:
+                for movie_id, rating in user_data["ratings"].items():
+                    yield user_id, int(movie_id), float(rating)
+
+    def is_empty(self) -> bool:
+        return not self.user_ids()
+
+    def close(self) -> None:
+        """Zatrzymuje wątek fsync i zapisuje na dysk niezapisane zdarzenia"""
+        self._stopped.set()
+        self.flush()
+
+
+def _apply_record(state: Dict, record: Dict) -> None:
+    """
+    Stosuje jedno zdarzenie z dziennika do stanu użytkownika
+
+    Args:
+        state: Dane użytkownika (modyfikowane w miejscu)
+        record: Zdarzenie z dziennika
+    """
+    op = record.get("op")
+    if op == "rate":
+        state["ratings"][str(record["movie_id"])] = record["rating"]
+    elif op == "history":
+        key = str(record["movie_id"])
+        if key not in state["watched_at"]:
+            state["watch_history"].append(record["movie_id"])
+            state["watched_at"][key] = record.get("at")
+    elif op == "name":
+        state["user_name"] = record["user_name"]
+
+
+class JsonUserStorage(UserStorage):
+    """
+    Backend w pliku JSON zgodny z dotychczasowym formatem user_data.json
+    Plik zawiera jednego użytkownika, a każda zmiana zapisuje cały plik
+    """
+
+    def __init__(self, path: str = USER_DATA_FILE):
+        """
+        Args:
+            path: Ścieżka do pliku JSON
+        """
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _read(self) -> Optional[Dict]:
+        """Wczytuje zawartość pliku lub zwraca None, jeśli plik nie istnieje"""
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _write(self, user_data: Dict) -> None:
+        """Zapisuje dane do pliku tymczasowego i podmienia plik docelowy"""
+        temporary_path = self.path + ".tmp"
+        with open(temporary_path, "w") as f:
+            json.dump(user_data, f)
+        os.replace(temporary_path, self.path)
+
+    def load_user(self, user_id: int) -> Optional[Dict]:
+        with self._lock:
+            user_data = self._read()
+        if user_data is None or user_data.get("user_id") != user_id:
+            return None
+        return user_data
+
+    def save_user(self, user_data: Dict) -> None:
+        with self._lock:
+            self._write(user_data)
+
+    def _update(self, user_id: int, user_name: str, change) -> None:
+        """Wczytuje dane użytkownika, stosuje zmianę i zapisuje cały plik"""
+        with self._lock:
+            user_data = self._read()
+            if user_data is None or user_data.get("user_id") != user_id:
+                user_data = {"user_id": user_id, "user_name": user_name, "ratings": {}, "watch_history": []}
+            change(user_data)
+            self._write(user_data)
+
+    def save_rating(self, user_id: int, user_name: str, movie_id: int, rating: float) -> None:
+        self._update(user_id, user_name, lambda data: data["ratings"].__setitem__(str(movie_id), rating))
+
+    def add_to_history(self, user_id: int, user_name: str, movie_id: int, watched_at: float = None) -> None:
+        def append(data):
+            if movie_id not in data["watch_history"]:
+                data["watch_history"].append(movie_id)
+                data.setdefault("watched_at", {})[str(movie_id)] = watched_at or time.time()
+        self._update(user_id, user_name, append)
+
+    def iter_all_ratings(self) -> Generator[Tuple[int, int, float], None, None]:
+        with self._lock:
+            user_data = self._read()
+        if user_data:
+            for movie_id, rating in user_data.get("ratings", {}).items():
+                yield int(user_data["user_id"]), int(movie_id), float(rating)
+
+
+def import_legacy_json(storage: UserStorage, path: str = USER_DATA_FILE) -> bool:
+    """
+    Przenosi dane z dawnego pliku user_data.json do nowego backendu
+
+    Args:
+        storage: Docelowy backend
+        path: Ścieżka do pliku JSON
+
+    Returns:
+        bool: True jeśli dane zostały zaimportowane
+    """
+    try:
+        with open(path, "r") as f:
+            user_data = json.load(f)
+        storage.save_user(user_data)
+        print(f"Zaimportowano dane użytkownika z pliku {path}.")
+        return True
+    except FileNotFoundError:
+        return False
+    except (json.JSONDecodeError, KeyError, TypeError, ValueError, sqlite3.Error) as e:
+        print(f"Błąd podczas importu danych z {path}: {e}")
+        return False
+
+
+_storage = None
+_storage_lock = threading.Lock()
+
+def get_storage() -> UserStorage:
+    """
+    Zwraca wspólny backend danych użytkowników wybrany w pliku konfiguracyjnym
+    Przy pierwszym utworzeniu pustej bazy SQLite lub dziennika importuje dane z user_data.json
+
+    Returns:
+        UserStorage: Backend danych użytkowników
+    """
+    global _storage
+
+    with _storage_lock:
+        if _storage is None:
+            if USER_STORAGE == "json":
+                _storage = JsonUserStorage()
+            else:
+                _storage = JournalUserStorage() if USER_STORAGE == "journal" else SQLiteUserStorage()
+                if _storage.is_empty():
+                    import_legacy_json(_storage)
+        return _storage
@@ -6,12 +6,34 @@ Zawiera testy jednostkowe dla:
 - Tworzenia obiektów Movie
 - Algorytmu rekomendacji
 - Funkcjonalności użytkownika
+- Pamięci podręcznej danych filmów
+- Filtrowania kolaboratywnego
+- Dziennika zdarzeń użytkowników
+- Pamięci gotowych rekomendacji
+- Limitu zapytań i ponowień zapytań do API
 """
 
+import asyncio
 import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from unittest import mock
+import requests
+import api
 from api import search_movies
-from models import Movie, User
-from recommender import create_recommender
+from cache import MovieCache, RecommendationCache
+from catalog import MovieCatalog
+from collaborative import ItemItemCF
+from models import Movie, User, RatingStore, GENRE_MAPPING
+from rate_limit import TokenBucket, parse_retry_after, backoff_delay
+from config import HTTP_BACKOFF_BASE, HTTP_BACKOFF_MAX
+from recommender import create_recommender, MovieRecommender
+from scoring import score_movies, top_k
+from storage import JournalUserStorage, JsonUserStorage, SQLiteUserStorage
 
 def test_api():
     """
@@ -72,6 +94,30 @@ def test_movie_creation():
     else:
         print("Nie znaleziono filmów do testowania")
 
+def test_movie_details():
+    """
+    Test uzupełniania szczegółów filmów
+    Słownik extras jest tworzony tylko dla filmów z pobranymi dodatkowymi zasobami
+    """
+    print("\n--- Test szczegółów filmów ---")
+    
+    first = Movie.from_api_data({"id": 1, "title": "Film 1", "release_date": "2000-01-01", "genre_ids": [18]})
+    second = Movie.from_api_data({"id": 2, "title": "Film 2", "release_date": "2000-01-01", "genre_ids": [35]})
+    assert first.extras is None and first.cast == () and first.keywords == (), "Film bez zasobów nie ma extras"
+    
+    details = [
+        {"id": 1, "runtime": 136, "credits": {"cast": [{"name": "Keanu Reeves"}]}},
+        {"id": 2, "runtime": 0}
+    ]
+    with mock.patch("models.details_for_ids", return_value=details) as fetch:
+        Movie.hydrate_details([first, second])
+    assert fetch.call_count == 1, "Szczegóły powinny zostać pobrane jednym wywołaniem"
+    
+    assert first.runtime == 136 and first.cast == ("Keanu Reeves",)
+    assert second.runtime == 0 and second.extras is None, "Bez zasobów w odpowiedzi extras pozostaje None"
+    
+    print("Test szczegółów filmów zakończony pomyślnie!")
+
 def test_user_functionality():
     """
     Test funkcjonalności użytkownika
@@ -136,6 +182,454 @@ def test_recommendation_algorithm():
     
     print("Test algorytmu rekomendacji zakończony!")
 
+def test_movie_cache():
+    """
+    Test pamięci podręcznej danych filmów
+    Sprawdza warstwę LRU, warstwę dyskową, czas ważności i liczniki
+    """
+    print("\n--- Test pamięci podręcznej ---")
+    
+    cache = MovieCache(path=":memory:", ttl=60, memory_size=1)
+    
+    assert cache.get("/movie", 550, "pl") is None, "Pusta pamięć nie powinna zwracać danych"
+    
+    cache.set("/movie", 550, "pl", {"id": 550, "runtime": 139})
+    cache.set("/movie", 13, "pl", {"id": 13, "runtime": 142})
+    
+    # Film 550 został wypchnięty z warstwy LRU, ale nadal jest w bazie
+    assert cache.get("/movie", "550", "pl")["runtime"] == 139, "Dane powinny być odczytane z bazy"
+    assert cache.get("/movie", 550, "pl")["runtime"] == 139, "Dane powinny być odczytane z pamięci"
+    assert cache.get("/movie", 550, "en") is None, "Język jest częścią klucza"
+    assert cache.stats == {"memory_hits": 1, "disk_hits": 1, "misses": 2}
+    
+    # Wpisy po upływie czasu ważności są traktowane jak brak danych
+    cache.ttl = 0
+    time.sleep(0.01)
+    assert cache.get("/movie", 550, "pl") is None, "Przeterminowany wpis nie powinien być zwracany"
+    
+    print("Test pamięci podręcznej zakończony pomyślnie!")
+
+def test_collaborative_filtering():
+    """
+    Test filtrowania kolaboratywnego item-item
+    Sprawdza podobieństwa filmów i przewidywanie ocen na małym zbiorze danych
+    """
+    print("\n--- Test filtrowania kolaboratywnego ---")
+    
+    # Użytkownicy 1-3 oceniają filmy 10 i 20 tak samo, film 30 odwrotnie
+    ratings = [
+        (1, 10, 9.0), (1, 20, 9.0), (1, 30, 2.0),
+        (2, 10, 8.0), (2, 20, 8.0), (2, 30, 3.0),
+        (3, 10, 3.0), (3, 20, 2.0), (3, 30, 9.0),
+        (4, 10, 9.0), (4, 30, 2.0)
+    ]
+    model = ItemItemCF.fit(ratings, k=2)
+    
+    # Najbardziej podobnym filmem do filmu 10 jest film 20
+    position = list(model.item_ids).index(10)
+    assert model.item_ids[model.neighbors[position][0]] == 20, "Film 20 powinien być najbliższym sąsiadem"
+    
+    # Użytkownik 4 nie ocenił filmu 20, a lubi podobny film 10
+    recommendations = model.recommend({10: 9.0, 30: 2.0})
+    assert [movie_id for movie_id, _ in recommendations] == [20], "Powinien zostać polecony tylko film 20"
+    assert recommendations[0][1] > 5.5, "Przewidywana ocena powinna być wyższa od średniej użytkownika"
+    
+    # create_recommender wczytuje zapisany model CF
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "cf_model.npz")
+        model.save(path)
+        user = User(4, "Test", storage=SQLiteUserStorage(":memory:"))
+        with mock.patch("recommender.CF_MODEL_FILE", path):
+            recommender = create_recommender(user, catalog=MovieCatalog(":memory:"))
+        assert recommender.cf_model is not None, "Model CF powinien zostać wczytany z pliku"
+        assert list(recommender.cf_model.item_ids) == list(model.item_ids)
+        recommender.close()
+    
+    print("Test filtrowania kolaboratywnego zakończony pomyślnie!")
+
+def test_vectorized_scoring():
+    """
+    Test zgodności wektorowego score_movies i top_k z calculate_movie_score
+    na losowych kandydatach, także z gatunkami spoza mapowania i remisami wyników
+    """
+    print("\n--- Test wektorowego obliczania wyników ---")
+    
+    import numpy as np
+    
+    rng = np.random.default_rng(0)
+    genre_ids = list(GENRE_MAPPING) + [99999]  # 99999 - gatunek spoza mapowania ("Nieznany")
+    
+    # Oceniony film ma gatunek spoza mapowania, który nie powinien trafić do preferencji
+    catalog = MovieCatalog(":memory:")
+    catalog.add_movies([{"id": 7, "title": "Film 7", "release_date": "2000-01-01",
+                         "vote_average": 7.0, "genre_ids": [18, 99999]}])
+    storage = SQLiteUserStorage(":memory:")
+    storage.save_user({"user_id": 1, "user_name": "Test", "ratings": {"7": 8.0}, "watch_history": [7]})
+    
+    user = User(1, "Test", storage=storage)
+    recommender = MovieRecommender(user, catalog=catalog, cache=RecommendationCache(), background_refresh=False)
+    assert recommender.genre_weights == {"Dramat": 8.0}, "Gatunek Nieznany nie powinien mieć wagi"
+    
+    for _ in range(20):
+        movies = [
+            Movie(movie_id, "", 2000, round(float(rng.uniform(0, 10)), 1), 0,
+                  tuple(rng.choice(genre_ids, size=int(rng.integers(0, 4)), replace=False).tolist()))
+            for movie_id in range(int(rng.integers(1, 60)))
+        ]
+        movies += movies[:5]  # Powtórzeni kandydaci dają remisy
+        
+        genres = list(GENRE_MAPPING.values()) + ["Nieznany"]
+        recommender.genre_weights = {
+            genre: float(rng.uniform(1, 10))
+            for genre in rng.choice(genres, size=int(rng.integers(0, len(genres))), replace=False)
+        }
+        
+        expected = [recommender.calculate_movie_score(movie) for movie in movies]
+        scores = score_movies(movies, recommender.genre_weights)
+        assert np.allclose(scores, expected), "Wyniki wektorowe powinny być zgodne z calculate_movie_score"
+        
+        # top_k jak sortowanie stabilne malejąco
+        for k in (1, 5, len(movies), len(movies) + 3):
+            ranked = sorted(range(len(movies)), key=lambda index: -scores[index])[:k]
+            assert top_k(scores, k).tolist() == ranked, "top_k powinno zachować kolejność remisów"
+    
+    recommender.close()
+    print("Test wektorowego obliczania wyników zakończony pomyślnie!")
+
+def test_rating_store():
+    """
+    Test magazynu ocen na tablicach NumPy
+    Sprawdza klucze tekstowe i liczbowe, kolejność po usunięciu, powiększanie tablic
+    oraz wczytanie ocen z dawnego pliku JSON z kluczami tekstowymi
+    """
+    print("\n--- Test magazynu ocen ---")
+    
+    ratings = RatingStore({"550": 9.0, 13: 7.0})
+    assert ratings[550] == ratings["550"] == 9.0, "Wyszukiwanie powinno działać dla 550 i \"550\""
+    assert "13" in ratings and 13 in ratings and "abc" not in ratings
+    ratings["13"] = 6.0
+    assert len(ratings) == 2 and ratings[13] == 6.0, "Klucz tekstowy powinien nadpisać tę samą ocenę"
+    
+    # Więcej ocen niż początkowa pojemność tablic
+    for movie_id in range(100, 120):
+        ratings[movie_id] = movie_id / 20
+    assert len(ratings) == 22 and ratings[119] == 119 / 20
+    assert ratings.id_array.tolist() == [550, 13] + list(range(100, 120))
+    
+    # Usunięcie zachowuje kolejność dodania pozostałych ocen
+    del ratings["13"]
+    del ratings[105]
+    expected_ids = [550] + [movie_id for movie_id in range(100, 120) if movie_id != 105]
+    assert list(ratings) == ratings.id_array.tolist() == expected_ids, "Usunięcie nie powinno zmienić kolejności"
+    assert ratings.rating_array.tolist() == [ratings[movie_id] for movie_id in expected_ids]
+    assert ratings[106] == 106 / 20, "Przesunięte oceny powinny pozostać dostępne"
+    try:
+        del ratings[13]
+        assert False, "Usunięcie nieistniejącej oceny powinno zgłosić KeyError"
+    except KeyError:
+        pass
+    
+    # Dawny format JSON: klucze ocen jako tekst
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "user_data.json")
+        with open(path, "w") as f:
+            json.dump({"user_id": 1, "user_name": "Test", "ratings": {"550": 9.0, "13": 7.0},
+                       "watch_history": [550, 13]}, f)
+        
+        user = User(1, "Test", storage=JsonUserStorage(path))
+        assert isinstance(user.user_ratings, RatingStore)
+        assert user.user_ratings[550] == user.user_ratings["550"] == 9.0
+        assert user.user_ratings.to_dict() == {"550": 9.0, "13": 7.0}, "Zapis powinien zachować dawny format"
+    
+    print("Test magazynu ocen zakończony pomyślnie!")
+
+def test_journal_partial_line():
+    """
+    Test odzyskiwania dziennika po awarii w trakcie zapisu
+    Zdarzenia zapisane po niedokończonej linii nie mogą zostać utracone
+    """
+    print("\n--- Test dziennika zdarzeń ---")
+    
+    with tempfile.TemporaryDirectory() as directory:
+        storage = JournalUserStorage(directory, fsync_interval=60)
+        storage.save_rating(1, "Test", 550, 9.0)
+        storage.close()
+        
+        # Symulacja awarii: niedokończona ostatnia linia
+        with open(os.path.join(directory, "user_1.log"), "a") as f:
+            f.write('{"op": "rate", "movie_id": 13, "rat')
+        
+        storage = JournalUserStorage(directory, fsync_interval=60)
+        storage.save_rating(1, "Test", 12, 7.0)
+        storage.add_to_history(1, "Test", 12, watched_at=100.0)
+        storage.close()
+        
+        user_data = JournalUserStorage(directory, fsync_interval=60).load_user(1)
+        assert user_data["ratings"] == {"550": 9.0, "12": 7.0}, "Oceny zapisane po awarii powinny zostać wczytane"
+        assert user_data["watch_history"] == [12], "Historia zapisana po awarii powinna zostać wczytana"
+    
+    print("Test dziennika zdarzeń zakończony pomyślnie!")
+
+def test_recommendation_cache():
+    """
+    Test pamięci gotowych rekomendacji
+    Sprawdza, że zmiana ocen, historii lub ponowne wczytanie danych unieważnia wynik
+    """
+    print("\n--- Test pamięci rekomendacji ---")
+    
+    # Lokalny katalog i baza w pamięci - test nie korzysta z API
+    catalog = MovieCatalog(":memory:")
+    catalog.add_movies([
+        {"id": movie_id, "title": f"Film {movie_id}", "release_date": "2000-01-01",
+         "vote_average": 7.0, "genre_ids": [18]}
+        for movie_id in range(1, 8)
+    ])
+    storage = SQLiteUserStorage(":memory:")
+    storage.save_user({"user_id": 1, "user_name": "Test", "ratings": {"1": 9.0}, "watch_history": [1]})
+    
+    user = User(1, "Test", storage=storage)
+    cache = RecommendationCache(ttl=60)
+    recommender = MovieRecommender(user, catalog=catalog, cache=cache, background_refresh=False)
+    
+    first = recommender.get_recommendations(limit=3)
+    assert recommender.get_recommendations(limit=3) == first, "Powtórne wywołanie powinno zwrócić ten sam wynik"
+    assert cache.stats["misses"] == 1 and cache.stats["hits"] == 1
+    
+    # Ocena filmu podnosi wersję danych - wynik trzeba obliczyć od nowa
+    version = user.data_version
+    user.add_to_history(2)
+    with mock.patch("builtins.input", return_value="8"):
+        user.rate_movie(2)
+    assert user.data_version != version, "Ocena powinna zmienić wersję danych"
+    
+    second = recommender.get_recommendations(limit=3)
+    assert cache.stats["misses"] == 2, "Po ocenie wynik nie powinien pochodzić z pamięci"
+    assert 2 not in [movie.movie_id for movie, _ in second], "Oceniony film nie powinien być polecany"
+    recommender.get_recommendations(limit=3)
+    assert cache.stats["hits"] == 2, "Kolejne wywołanie powinno korzystać z pamięci"
+    
+    # Ponowne wczytanie danych z backendu również unieważnia wynik
+    user.load_user_data()
+    recommender.get_recommendations(limit=3)
+    assert cache.stats["misses"] == 3, "Po ponownym wczytaniu danych wynik powinien być obliczony od nowa"
+    
+    # Zamknięty rekomender nie jest już powiadamiany o zmianach użytkownika
+    recommender.close()
+    assert not user._rating_listeners and not user._change_listeners, "close() powinno usunąć funkcje nasłuchujące"
+    
+    print("Test pamięci rekomendacji zakończony pomyślnie!")
+
+def test_recommendation_cache_skips_failed():
+    """
+    Test pomijania niepełnych wyników w pamięci rekomendacji
+    Pusty wynik i wynik zbudowany mimo nieudanego pobrania gatunku nie powinny być zapamiętane
+    """
+    print("\n--- Test niepełnych rekomendacji ---")
+    
+    catalog = MovieCatalog(":memory:")
+    catalog.add_movies([
+        {"id": 1, "title": "Film 1", "release_date": "2000-01-01", "vote_average": 7.0, "genre_ids": [18]},
+        {"id": 2, "title": "Film 2", "release_date": "2000-01-01", "vote_average": 7.0, "genre_ids": [18]}
+    ])
+    storage = SQLiteUserStorage(":memory:")
+    storage.save_user({"user_id": 1, "user_name": "Test", "ratings": {"1": 9.0}, "watch_history": [1]})
+    
+    user = User(1, "Test", storage=storage)
+    cache = RecommendationCache(ttl=60)
+    recommender = MovieRecommender(user, catalog=catalog, cache=cache, background_refresh=False)
+    
+    # Gatunek pobrany częściowo (np. błąd 429 na kolejnej stronie)
+    partial = ([catalog.get_movie(2)], recommender._candidate_stats(1, 1, 1))
+    partial[1]['failed'] = 1
+    with mock.patch.object(recommender, "_genre_candidates", return_value=partial):
+        assert len(recommender.get_recommendations(limit=3)) == 1
+        recommender.get_recommendations(limit=3)
+    assert cache.stats["hits"] == 0, "Wynik z nieudanym pobraniem nie powinien być zapamiętany"
+    
+    # Brak kandydatów (np. brak połączenia z API)
+    empty = ([], recommender._candidate_stats())
+    with mock.patch.object(recommender, "_genre_candidates", return_value=empty):
+        assert recommender.get_recommendations(limit=3) == []
+        recommender.get_recommendations(limit=3)
+    assert cache.stats["hits"] == 0, "Pusty wynik nie powinien być zapamiętany"
+    
+    # Pełny wynik trafia do pamięci
+    recommender.get_recommendations(limit=3)
+    recommender.get_recommendations(limit=3)
+    assert cache.stats["hits"] == 1, "Kompletny wynik powinien być zapamiętany"
+    
+    recommender.close()
+    print("Test niepełnych rekomendacji zakończony pomyślnie!")
+
+def test_async_recommender():
+    """
+    Test tworzenia rekomendera w pętli zdarzeń
+    Oceny są analizowane przez async_api, a nowo oceniony film jest pobierany w tle
+    """
+    print("\n--- Test rekomendera asyncio ---")
+    
+    storage = SQLiteUserStorage(":memory:")
+    storage.save_user({"user_id": 1, "user_name": "Test", "ratings": {"1": 9.0}, "watch_history": [1]})
+    user = User(1, "Test", storage=storage)
+    
+    movies = {1: Movie(1, "Dramat", 2000, 7.0, 0, (18,)), 2: Movie(2, "Komedia", 2000, 7.0, 0, (35,))}
+    
+    async def fake_movies_for_ids(ids, append=None):
+        return [movies.get(movie_id) for movie_id in ids]
+    
+    async def scenario():
+        recommender = await MovieRecommender.create_async(user, cache=RecommendationCache(), background_refresh=False)
+        assert recommender.genre_weights == {"Dramat": 9.0}
+        
+        # Dwie zmiany oceny przed pobraniem filmu - liczy się tylko ostatnia
+        user.add_to_history(2)
+        with mock.patch("builtins.input", side_effect=["8", "4"]):
+            user.rate_movie(2)
+            user.change_movie_rating(2)
+        assert "Komedia" not in recommender.genre_weights, "Film powinien być jeszcze pobierany"
+        
+        await asyncio.gather(*list(recommender._pending_tasks))
+        assert recommender.genre_weights == {"Dramat": 9.0, "Komedia": 4.0}
+        recommender.close()
+    
+    # Synchroniczne pobieranie z API zablokowałoby pętlę zdarzeń
+    with mock.patch("async_api.movies_for_ids", new=fake_movies_for_ids), \
+         mock.patch("recommender.movies_for_ids", side_effect=AssertionError("blokujące pobieranie")), \
+         mock.patch("recommender.movie_for_id", side_effect=AssertionError("blokujące pobieranie")):
+        asyncio.run(scenario())
+    
+    print("Test rekomendera asyncio zakończony pomyślnie!")
+
+def test_preferences_after_ratings_replaced():
+    """
+    Test ponownej analizy preferencji po podmianie wszystkich ocen
+    Dotyczy przypisania user_ratings oraz ponownego wczytania danych z backendu
+    """
+    print("\n--- Test podmiany ocen ---")
+    
+    catalog = MovieCatalog(":memory:")
+    catalog.add_movies([
+        {"id": 1, "title": "Dramat", "release_date": "2000-01-01", "vote_average": 7.0, "genre_ids": [18]},
+        {"id": 2, "title": "Komedia", "release_date": "2000-01-01", "vote_average": 7.0, "genre_ids": [35]}
+    ])
+    storage = SQLiteUserStorage(":memory:")
+    storage.save_user({"user_id": 1, "user_name": "Test", "ratings": {"1": 9.0}, "watch_history": [1]})
+    
+    user = User(1, "Test", storage=storage)
+    recommender = MovieRecommender(user, catalog=catalog, cache=RecommendationCache(), background_refresh=False)
+    assert recommender.genre_weights == {"Dramat": 9.0}
+    
+    user.add_to_history(2)
+    assert user.user_watch_history.unrated() == [2]
+    
+    user.user_ratings = {1: 9.0, 2: 2.0}
+    assert recommender.genre_weights == {"Dramat": 9.0, "Komedia": 2.0}, "Przypisanie ocen powinno zmienić wagi"
+    assert user.user_watch_history.unrated() == [], "Oceniony film nie powinien być na liście nieocenionych"
+    
+    # Przypisanie nie zapisuje ocen - po wczytaniu liczy się tylko stan backendu (zmieniony z zewnątrz)
+    storage.save_rating(1, "Test", 1, 3.0)
+    user.load_user_data()
+    assert recommender.genre_weights == {"Dramat": 3.0}, "Wczytanie danych powinno zmienić wagi"
+    assert recommender.favorite_genres == ["Dramat"]
+    assert user.user_watch_history.unrated() == [2], "Po wczytaniu film 2 znów jest nieoceniony"
+    
+    recommender.close()
+    print("Test podmiany ocen zakończony pomyślnie!")
+
+def test_rate_limit():
+    """
+    Test limitu zapytań i czasu oczekiwania przed ponowieniem
+    Sprawdza odczyt nagłówka Retry-After, granice backoffu i kolejkę wiadra żetonów
+    """
+    print("\n--- Test limitu zapytań ---")
+    
+    # Retry-After jako liczba sekund lub data HTTP
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after("-5") == 0.0, "Ujemny czas powinien zostać obcięty do zera"
+    assert parse_retry_after(None) is None and parse_retry_after("wkrótce") is None
+    retry_at = datetime.now(timezone.utc) + timedelta(seconds=30)
+    assert 25 <= parse_retry_after(format_datetime(retry_at, usegmt=True)) <= 30
+    assert parse_retry_after(format_datetime(retry_at - timedelta(hours=1), usegmt=True)) == 0.0
+    
+    # Backoff bez Retry-After rośnie wykładniczo, ale nie przekracza HTTP_BACKOFF_MAX
+    for attempt in range(12):
+        delay = backoff_delay(attempt)
+        assert 0 <= delay <= min(HTTP_BACKOFF_MAX, HTTP_BACKOFF_BASE * 2 ** attempt)
+    # Z Retry-After czekamy tyle, ile podał serwer (plus niewielki rozrzut)
+    assert 2.0 <= backoff_delay(0, retry_after=2.0) <= 2.0 + HTTP_BACKOFF_BASE
+    assert backoff_delay(0, retry_after=10 ** 6) <= HTTP_BACKOFF_MAX + HTTP_BACKOFF_BASE
+    
+    # Po wyczerpaniu pojemności kolejne zapytania czekają 1/rate sekundy dłużej od poprzedniego
+    with mock.patch("rate_limit.time.monotonic", return_value=100.0):
+        bucket = TokenBucket(rate=10, capacity=3)
+        assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0], "Pojemność wiadra powinna przejść od razu"
+        waits = [bucket.reserve() for _ in range(3)]
+        assert all(abs(wait - expected) < 1e-9 for wait, expected in zip(waits, (0.1, 0.2, 0.3)))
+        
+        # Pauza po odpowiedzi 429 wstrzymuje zapytania niezależnie od liczby żetonów
+        bucket = TokenBucket(rate=10, capacity=3)
+        bucket.pause(5)
+        assert bucket.reserve() == 5.0
+    
+    # Po upływie czasu żetony się odnawiają
+    with mock.patch("rate_limit.time.monotonic", return_value=100.0):
+        bucket = TokenBucket(rate=10, capacity=3)
+        for _ in range(4):
+            bucket.reserve()
+    with mock.patch("rate_limit.time.monotonic", return_value=101.0):
+        assert bucket.reserve() == 0.0, "Po sekundzie wiadro powinno być znów pełne"
+    
+    print("Test limitu zapytań zakończony pomyślnie!")
+
+def _response(status_code, payload=None, headers=None):
+    """Tworzy odpowiedź HTTP bez łączenia się z serwerem"""
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = json.dumps(payload or {}).encode()
+    response.headers.update(headers or {})
+    response.url = "http://test"
+    return response
+
+def test_retry_and_coalescing():
+    """
+    Test ponowień i łączenia identycznych zapytań do API
+    Sprawdza ponowienie po 429/503 oraz jedno zapytanie HTTP dla wielu wątków
+    """
+    print("\n--- Test ponowień zapytań ---")
+    
+    responses = [_response(429, headers={"Retry-After": "0"}), _response(503), _response(200, {"id": 1})]
+    retries = api.request_stats["retries"]
+    with mock.patch.object(api.session, "get", side_effect=responses) as get, \
+            mock.patch("api.time.sleep"):
+        assert api.call_api("/movie/1") == {"id": 1}, "Po błędach 429 i 503 zapytanie powinno się udać"
+    assert get.call_count == 3 and api.request_stats["retries"] - retries == 2
+    
+    # Błąd 404 nie jest ponawiany
+    with mock.patch.object(api.session, "get", return_value=_response(404)) as get, \
+            mock.patch("api.time.sleep"):
+        assert api.call_api("/movie/2") is None
+    assert get.call_count == 1
+    
+    # Wątki pytające o to samo czekają na wynik pierwszego zapytania
+    release = threading.Event()
+    def slow_get(*args, **kwargs):
+        release.wait(5)
+        return _response(200, {"id": 3})
+    
+    results = []
+    with mock.patch.object(api.session, "get", side_effect=slow_get) as get:
+        threads = [threading.Thread(target=lambda: results.append(api.call_api("/movie/3"))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.2)
+        release.set()
+        for thread in threads:
+            thread.join()
+    assert get.call_count == 1, "Identyczne zapytania powinny zostać połączone"
+    assert results == [{"id": 3}] * 5
+    
+    print("Test ponowień zapytań zakończony pomyślnie!")
+
 def run_all_tests():
     """
     Uruchamia wszystkie testy w kolejności
@@ -159,6 +653,54 @@ def run_all_tests():
         print("\n4. Test algorytmu rekomendacji...")
         test_recommendation_algorithm()
         
+        # Test 5: Pamięć podręczna
+        print("\n5. Test pamięci podręcznej...")
+        test_movie_cache()
+        
+        # Test 6: Filtrowanie kolaboratywne
+        print("\n6. Test filtrowania kolaboratywnego...")
+        test_collaborative_filtering()
+        
+        # Test 7: Dziennik zdarzeń
+        print("\n7. Test dziennika zdarzeń...")
+        test_journal_partial_line()
+        
+        # Test 8: Pamięć rekomendacji
+        print("\n8. Test pamięci rekomendacji...")
+        test_recommendation_cache()
+        
+        # Test 9: Podmiana ocen
+        print("\n9. Test podmiany ocen...")
+        test_preferences_after_ratings_replaced()
+        
+        # Test 10: Limit zapytań
+        print("\n10. Test limitu zapytań...")
+        test_rate_limit()
+        
+        # Test 11: Ponowienia i łączenie zapytań
+        print("\n11. Test ponowień zapytań...")
+        test_retry_and_coalescing()
+        
+        # Test 12: Niepełne rekomendacje
+        print("\n12. Test niepełnych rekomendacji...")
+        test_recommendation_cache_skips_failed()
+        
+        # Test 13: Rekomender w pętli zdarzeń
+        print("\n13. Test rekomendera asyncio...")
+        test_async_recommender()
+        
+        # Test 14: Wektorowe obliczanie wyników
+        print("\n14. Test wektorowego obliczania wyników...")
+        test_vectorized_scoring()
+        
+        # Test 15: Magazyn ocen
+        print("\n15. Test magazynu ocen...")
+        test_rating_store()
+        
+        # Test 16: Szczegóły filmów
+        print("\n16. Test szczegółów filmów...")
+        test_movie_details()
+        
         print("\n=== WSZYSTKIE TESTY ZAKOŃCZONE POMYŚLNIE ===")
         
     except Exception as e: